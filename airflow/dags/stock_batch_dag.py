@@ -2,6 +2,14 @@
 Airflow DAG: nightly stock batch job.
 Schedule 00:05 daily. Tasks: extract_raw_trades (no-op / placeholder), compute_ohlcv + generate_reports (batch_job).
 SLA 60 minutes.
+
+catchup is off: after downtime only the latest interval is scheduled. Each
+run processes its logical date ({{ ds }}, the UTC day that just ended) plus
+any earlier day in the last INCREMENTAL_LOOKBACK_DAYS whose raw_trades have
+no watermark or changed since they were processed, so that one run backfills
+every missed day in a single pass (batch-processing/tests/test_incremental.py
+covers this). For older gaps run
+`python batch_job.py --start 2025-01-01 --end 2025-01-31` ad hoc.
 """
 from datetime import datetime, timedelta
 from airflow import DAG
@@ -29,8 +37,9 @@ with DAG(
     default_args=default_args,
     description="Nightly OHLCV aggregation and reports",
     schedule_interval="5 0 * * *",  # 00:05 daily
-    start_date=datetime(2025, 1, 1),
+    start_date=datetime(2026, 10, 1),
     catchup=False,
+    max_active_runs=1,
     tags=["stock", "batch"],
 ) as dag:
 
@@ -42,7 +51,7 @@ with DAG(
 
     compute_task = BashOperator(
         task_id="compute_ohlcv",
-        bash_command=f"cd {BATCH_JOB_DIR} && python batch_job.py",
+        bash_command=f"cd {BATCH_JOB_DIR} && python batch_job.py --end {{{{ ds }}}} --incremental",
     )
 
     report_task = BashOperator(
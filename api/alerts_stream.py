@@ -0,0 +1,87 @@
+"""
+Single shared Redis subscriber for live alerts, fanned out to SSE clients.
+
+The stream processor publishes each new alert as JSON on the alerts channel.
+One AlertBroadcaster per API process holds the only subscription and copies
+messages into a bounded queue per connected client; a slow client drops its
+oldest alerts instead of stalling the others.
+"""
+import asyncio
+import json
+import logging
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+CLIENT_QUEUE_SIZE = 256
+RECONNECT_DELAY_MAX = 30.0
+
+
+class AlertBroadcaster:
+    def __init__(self, redis: Redis, channel: str):
+        self.redis = redis
+        self.channel = channel
+        self._clients: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def _fan_out(self, alert: dict):
+        for queue in self._clients:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(alert)
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1.0
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "message" or not msg.get("data"):
+                        continue
+                    try:
+                        alert = json.loads(msg["data"])
+                    except (TypeError, ValueError):
+                        logger.warning("Dropping malformed alert message on %s", self.channel)
+                        continue
+                    self._fan_out(alert)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Alert subscriber error, retrying in %.1fs: %s", delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+
+def alert_matches(alert: dict, ticker: str | None, alert_type: str | None, severity: str | None) -> bool:
+    return (
+        (not ticker or alert.get("ticker") == ticker)
+        and (not alert_type or alert.get("type") == alert_type)
+        and (not severity or alert.get("severity") == severity)
+    )
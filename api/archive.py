@@ -0,0 +1,67 @@
+"""
+Read side of the raw_trades Parquet archive written by batch-processing/archive.py.
+
+Layout: {root}/date=YYYY-MM-DD/symbol=SYM/trades.parquet, one file per UTC
+symbol-day sorted by trade_ts. Files are memory-mapped and the trade_ts range
+is pushed down to row-group statistics, so only the row groups overlapping a
+request are decoded.
+"""
+from datetime import date, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from downsample import BucketAggregator
+
+FILE_NAME = "trades.parquet"
+DAY_MS = 86_400_000
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def symbol_day_path(root: str, day: date, ticker: str) -> Path | None:
+    path = Path(root) / f"date={day.isoformat()}" / f"symbol={ticker}" / FILE_NAME
+    return path if path.is_file() else None
+
+
+def plan_segments(root: str, ticker: str, ts_from: int, ts_to: int) -> list[tuple[int, int, Path | None]]:
+    """Split [ts_from, ts_to) at UTC day boundaries into time-ordered (lo, hi, path) segments.
+
+    path is the archived file for that day, or None where PostgreSQL must be
+    read; adjacent PostgreSQL days are merged into one segment.
+    """
+    if not root:
+        return [(ts_from, ts_to, None)]
+    segments = []
+    lo = ts_from
+    while lo < ts_to:
+        day_idx = lo // DAY_MS
+        hi = min(ts_to, (day_idx + 1) * DAY_MS)
+        path = symbol_day_path(root, EPOCH_DATE + timedelta(days=int(day_idx)), ticker)
+        if path is None and segments and segments[-1][2] is None:
+            segments[-1] = (segments[-1][0], hi, None)
+        else:
+            segments.append((lo, hi, path))
+        lo = hi
+    return segments
+
+
+def fold_archived(agg: BucketAggregator, path: Path, ts_from: int, ts_to: int) -> int:
+    """Feed one archived symbol-day's trades in [ts_from, ts_to) into agg. Returns rows read."""
+    dataset = ds.dataset(str(path), format="parquet", filesystem=fs.LocalFileSystem(use_mmap=True))
+    rows = 0
+    for batch in dataset.to_batches(
+        columns=["trade_ts", "price", "volume"],
+        filter=(ds.field("trade_ts") >= ts_from) & (ds.field("trade_ts") < ts_to),
+    ):
+        if batch.num_rows == 0:
+            continue
+        agg.add(
+            batch.column("trade_ts").to_numpy(),
+            pc.cast(batch.column("price"), pa.float64()).to_numpy(),
+            batch.column("volume").to_numpy(),
+        )
+        rows += batch.num_rows
+    return rows
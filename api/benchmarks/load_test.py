@@ -0,0 +1,253 @@
+"""
+API load test: drives every REST endpoint and N concurrent /ws/live sockets,
+reports p50/p95/p99 latency and req/s, and fails on regression vs a baseline.
+
+Run from api/ against data loaded by benchmarks.seed:
+
+    python -m benchmarks.load_test --start-server --duration 20 --concurrency 32 --ws-clients 200
+    python -m benchmarks.load_test --base-url http://localhost:8000 --update-baseline
+
+Only 2xx responses count as served; anything else is an error. Exit status
+is 1 when any scenario's p95 is more than --tolerance slower, or its req/s
+more than --tolerance lower, than the stored baseline, when a scenario has
+errors, or when there is no baseline (pass --no-baseline to only report).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import websockets
+from redis.asyncio import Redis
+
+from config import settings
+from benchmarks.seed import symbol_universe
+from live_stream import stream_key
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+SERVER_PORT = 8765
+
+
+def rest_scenarios(symbols: list[str]) -> dict:
+    """Scenario name -> callable returning a request path."""
+    live = settings.ticker_list or symbols[:1]
+    return {
+        "health": lambda: "/health",
+        "tickers": lambda: "/api/tickers",
+        "metrics": lambda: f"/api/metrics/{random.choice(symbols)}",
+        "historical": lambda: f"/api/historical/{random.choice(symbols)}?limit=200",
+        "top_movers": lambda: "/api/reports/top-movers",
+        "leaderboard": lambda: "/api/leaderboard/intraday?n=10",
+        "alerts": lambda: "/api/alerts?limit=100",
+        "alerts_ticker": lambda: f"/api/alerts?limit=100&ticker={random.choice(symbols)}",
+        "intraday_ohlcv": lambda: f"/api/intraday/{random.choice(live)}?points=500&mode=ohlcv",
+        "intraday_lttb": lambda: f"/api/intraday/{random.choice(live)}?points=500&mode=lttb",
+    }
+
+
+def summarize(latencies_s: list[float], elapsed_s: float, errors: int) -> dict:
+    ms = np.asarray(latencies_s) * 1000
+    if len(ms) == 0:
+        return {"count": 0, "errors": errors, "rps": 0.0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / elapsed_s, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+async def run_rest(client: httpx.AsyncClient, path_fn, duration: float, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(path_fn())
+                # A 404/422 from a missing or bad seed is fast but not a served request
+                ok = r.is_success
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_websockets(base_url: str, n_clients: int, duration: float, publish_hz: float) -> dict:
+    """Open n_clients /ws/live sockets, XADD timestamped updates to the metrics streams, and time their delivery."""
+    tickers = settings.ticker_list or ["AAPL"]
+    ws_url = base_url.replace("http", "ws", 1) + "/ws/live"
+    connect_latencies = []
+    delivery = []
+    errors = 0
+    stop = asyncio.Event()
+
+    async def client(i: int):
+        nonlocal errors
+        ticker = tickers[i % len(tickers)]
+        t0 = time.perf_counter()
+        try:
+            async with websockets.connect(ws_url, open_timeout=10) as ws:
+                await ws.send(json.dumps({"ticker": ticker}))
+                connect_latencies.append(time.perf_counter() - t0)
+                while not stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    sent = json.loads(raw).get("bench_sent")
+                    if sent:
+                        delivery.append(time.time() - float(sent))
+        except Exception:
+            errors += 1
+
+    async def publisher():
+        redis = Redis.from_url(settings.redis_url, decode_responses=True)
+        try:
+            while not stop.is_set():
+                for ticker in tickers:
+                    await redis.xadd(
+                        stream_key(ticker),
+                        {"price": "100.0", "ts": str(int(time.time() * 1000)), "bench_sent": str(time.time())},
+                        maxlen=2000,
+                        approximate=True,
+                    )
+                await asyncio.sleep(1 / publish_hz)
+        finally:
+            await redis.close()
+
+    clients = [asyncio.create_task(client(i)) for i in range(n_clients)]
+    await asyncio.sleep(2)  # let sockets subscribe before publishing
+    pub = asyncio.create_task(publisher())
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(pub, *clients, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    result = summarize(delivery, elapsed, errors)
+    result["rps"] = round(len(delivery) / elapsed, 1)  # messages delivered per second across sockets
+    result["connect_p95_ms"] = round(float(np.percentile(np.asarray(connect_latencies) * 1000, 95)), 2) if connect_latencies else None
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base or cur.get("p95_ms") is None:
+            continue
+        if base.get("p95_ms") and cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {cur['p95_ms']}ms > baseline {base['p95_ms']}ms (+{tolerance:.0%})")
+        if base.get("rps") and cur["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {cur['rps']} req/s < baseline {base['rps']} req/s (-{tolerance:.0%})")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'scenario':<18}{'count':>9}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        fmt = lambda v: "-" if v is None else f"{v:.2f}"  # noqa: E731
+        print(f"{name:<18}{r['count']:>9}{r['errors']:>6}{r['rps']:>10.1f}{fmt(r['p50_ms']):>10}{fmt(r['p95_ms']):>10}{fmt(r['p99_ms']):>10}")
+
+
+def start_server() -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(SERVER_PORT), "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parents[1],
+        env=os.environ.copy(),
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{SERVER_PORT}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("API server did not become healthy within 30s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="benchmark a running API instead of starting one")
+    parser.add_argument("--start-server", action="store_true", help="start uvicorn on port %d for the run" % SERVER_PORT)
+    parser.add_argument("--symbols", type=int, default=5000, help="symbol universe used by seed")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--ws-clients", type=int, default=100)
+    parser.add_argument("--ws-publish-hz", type=float, default=5.0)
+    parser.add_argument("--only", nargs="*", help="run only these scenarios (ws_live for sockets)")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--no-baseline", action="store_true", help="report only; don't compare against the baseline")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    args = parser.parse_args()
+
+    server = start_server() if args.start_server else None
+    base_url = args.base_url or f"http://127.0.0.1:{SERVER_PORT}"
+    symbols = symbol_universe(args.symbols)
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for name, path_fn in rest_scenarios(symbols).items():
+                if args.only and name not in args.only:
+                    continue
+                results[name] = await run_rest(client, path_fn, args.duration, args.concurrency)
+        if args.ws_clients and (not args.only or "ws_live" in args.only):
+            results["ws_live"] = await run_websockets(base_url, args.ws_clients, args.duration, args.ws_publish_hz)
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()  # live-stream readers can hold graceful shutdown open
+                server.wait()
+
+    print_table(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    failed = [f"{name}: {r['errors']} error(s)" for name, r in results.items() if r["errors"]]
+    for line in failed:
+        print("ERRORS", line)
+    if args.update_baseline:
+        if failed:
+            print("Not writing a baseline from a run with errors; check the seed.")
+            return 1
+        BASELINE_PATH.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    if args.no_baseline:
+        return 1 if failed else 0
+    if not BASELINE_PATH.exists():
+        print(f"No baseline at {BASELINE_PATH}; run with --update-baseline on the reference machine, or pass --no-baseline.")
+        return 1
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    for line in regressions:
+        print("REGRESSION", line)
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
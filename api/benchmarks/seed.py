@@ -0,0 +1,179 @@
+"""
+Seed a local PostgreSQL + Redis with benchmark-sized data.
+
+Defaults mirror a realistic deployment: 5k symbols, 10 years of trading days
+in ohlcv_daily, 1M alerts, one top_movers report, a day of raw_trades for the
+configured tickers, and a metrics hash per symbol plus today's intraday
+leaderboard sorted sets in Redis.
+
+Usage (from api/): python -m benchmarks.seed --symbols 5000 --years 10 --alerts 1000000
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import asyncpg
+import numpy as np
+from redis.asyncio import Redis
+
+from config import settings
+from database import get_pg_url
+from leaderboard import board_key
+
+COPY_BATCH_ROWS = 200_000
+
+
+def symbol_universe(n_symbols: int) -> list[str]:
+    """Configured tickers first (so /ws/live and the dashboard have data), then synthetic ones."""
+    symbols = list(settings.ticker_list)
+    i = 0
+    while len(symbols) < n_symbols:
+        symbols.append(f"S{i:05d}")
+        i += 1
+    return symbols[:n_symbols]
+
+
+def trading_days(years: int, end: date) -> list[date]:
+    start = end - timedelta(days=365 * years)
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    days = days[np.is_busday(days)]
+    return [d.item() for d in days]
+
+
+async def _copy(conn, table: str, columns: list[str], records):
+    batch = []
+    total = 0
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= COPY_BATCH_ROWS:
+            await conn.copy_records_to_table(table, records=batch, columns=columns)
+            total += len(batch)
+            batch = []
+    if batch:
+        await conn.copy_records_to_table(table, records=batch, columns=columns)
+        total += len(batch)
+    return total
+
+
+def _ohlcv_records(symbols, days, rng):
+    n = len(days)
+    for symbol in symbols:
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        open_ = close * np.exp(rng.normal(0, 0.005, n))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n))
+        volume = rng.integers(10_000, 5_000_000, n)
+        for i, d in enumerate(days):
+            yield (symbol, d, round(float(open_[i]), 4), round(float(high[i]), 4), round(float(low[i]), 4), round(float(close[i]), 4), int(volume[i]))
+
+
+def _alert_records(symbols, n_alerts, end_ts, rng):
+    span_s = 365 * 24 * 3600
+    picks = rng.integers(0, len(symbols), n_alerts)
+    # One alert per distinct second, so (ticker, alert_type, ts) stays unique
+    step = max(1, span_s // max(1, n_alerts))
+    offsets = rng.permutation(n_alerts) * step + rng.integers(0, step, n_alerts)
+    values = rng.uniform(2.0, 10.0, n_alerts)
+    severities = np.array(["medium", "high", "critical"])[rng.integers(0, 3, n_alerts)]
+    for i in range(n_alerts):
+        yield (symbols[picks[i]], "volume_spike", str(severities[i]), float(values[i]), end_ts - timedelta(seconds=int(offsets[i])))
+
+
+def _trade_records(symbols, day: date, trades_per_symbol, rng):
+    day_start = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+    for symbol in symbols:
+        ts = np.sort(rng.integers(day_start, day_start + 86_400_000, trades_per_symbol))
+        price = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, trades_per_symbol)))
+        volume = rng.integers(1, 1000, trades_per_symbol)
+        for i in range(trades_per_symbol):
+            yield (symbol, round(float(price[i]), 4), int(volume[i]), int(ts[i]))
+
+
+async def seed_postgres(args, symbols, rng):
+    conn = await asyncpg.connect(get_pg_url())
+    try:
+        if args.truncate:
+            await conn.execute("TRUNCATE ohlcv_daily, alerts, alerts_outbox, top_movers, raw_trades RESTART IDENTITY")
+        today = datetime.now(timezone.utc).date()
+
+        t0 = time.perf_counter()
+        days = trading_days(args.years, today - timedelta(days=1))
+        n = await _copy(conn, "ohlcv_daily", ["symbol", "date", "open", "high", "low", "close", "volume"], _ohlcv_records(symbols, days, rng))
+        print(f"ohlcv_daily: {n:,} rows in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        n = await _copy(conn, "alerts", ["ticker", "alert_type", "severity", "value", "ts"], _alert_records(symbols, args.alerts, datetime.now(timezone.utc), rng))
+        print(f"alerts: {n:,} rows in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        trade_symbols = symbols[: len(settings.ticker_list)]
+        n = await _copy(conn, "raw_trades", ["symbol", "price", "volume", "trade_ts"], _trade_records(trade_symbols, today - timedelta(days=1), args.trades_per_symbol, rng))
+        print(f"raw_trades: {n:,} rows in {time.perf_counter() - t0:.1f}s")
+
+        generated_at = datetime.now(timezone.utc)
+        movers = [(generated_at, s, float(rng.normal(0, 3)), i + 1, None, 1_000_000, 100.0) for i, s in enumerate(symbols[:5])]
+        movers += [(generated_at, s, float(-abs(rng.normal(0, 3))), None, i + 1, 1_000_000, 100.0) for i, s in enumerate(symbols[5:10])]
+        await conn.copy_records_to_table(
+            "top_movers",
+            records=movers,
+            columns=["generated_at", "symbol", "pct_change", "rank_gainers", "rank_losers", "volume", "close"],
+        )
+        await conn.execute("ANALYZE ohlcv_daily; ANALYZE alerts; ANALYZE raw_trades; ANALYZE top_movers")
+    finally:
+        await conn.close()
+
+
+async def seed_redis(symbols, rng):
+    redis = Redis.from_url(settings.redis_url, decode_responses=True)
+    try:
+        now_ms = int(time.time() * 1000)
+        pipe = redis.pipeline(transaction=False)
+        for i, symbol in enumerate(symbols):
+            price = float(rng.uniform(10, 500))
+            pipe.hset(f"trades:metrics:{symbol}", mapping={
+                "price": str(price),
+                "ts": str(now_ms),
+                "vwap_1m": str(price),
+                "vwap_5m": str(price),
+                "vwap_15m": str(price),
+                "ema9": str(price),
+                "ema21": str(price),
+                "vol": "0.5",
+            })
+            if i % 1000 == 999:
+                await pipe.execute()
+        await pipe.execute()
+        today = datetime.now(timezone.utc).date()
+        n = len(symbols)
+        boards = {
+            "pct_change": rng.normal(0, 2, n),
+            "range_pct": rng.uniform(0, 5, n),
+            "volume": rng.integers(10_000, 5_000_000, n),
+        }
+        for metric, scores in boards.items():
+            await redis.zadd(board_key(today, metric), {s: float(v) for s, v in zip(symbols, scores)})
+        await redis.set(board_key(today, "updated_at"), datetime.now(timezone.utc).isoformat())
+        print(f"redis: {n:,} metrics hashes, {len(boards)} leaderboard sorted sets")
+    finally:
+        await redis.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--alerts", type=int, default=1_000_000)
+    parser.add_argument("--trades-per-symbol", type=int, default=100_000, help="raw_trades for yesterday, configured tickers only")
+    parser.add_argument("--truncate", action="store_true", help="empty benchmark tables first")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    symbols = symbol_universe(args.symbols)
+    await seed_postgres(args, symbols, rng)
+    await seed_redis(symbols, rng)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Rolling correlation matrix published by the streaming job (Redis hash
+correlation:latest; float32 matrix, base64-encoded).
+
+The decoded matrix is cached per updated_at, so a request costs one HGET
+unless the streaming job has published a new interval since.
+"""
+import base64
+import json
+
+import numpy as np
+from redis.asyncio import Redis
+
+CORRELATION_KEY = "correlation:latest"
+
+_cache = {"updated_at": None, "snapshot": None}
+
+
+async def load_snapshot(redis: Redis) -> dict | None:
+    """{symbols, index, matrix, samples, window, interval_ms, as_of, updated_at} or None if nothing published."""
+    updated_at = await redis.hget(CORRELATION_KEY, "updated_at")
+    if updated_at is None:
+        return None
+    if updated_at == _cache["updated_at"]:
+        return _cache["snapshot"]
+    data = await redis.hgetall(CORRELATION_KEY)
+    symbols = json.loads(data["symbols"])
+    matrix = np.frombuffer(base64.b64decode(data["matrix"]), dtype="<f4").reshape(len(symbols), len(symbols))
+    snapshot = {
+        "symbols": symbols,
+        "index": {s: i for i, s in enumerate(symbols)},
+        "matrix": matrix,
+        "samples": int(data["samples"]),
+        "window": int(data["window"]),
+        "interval_ms": int(data["interval_ms"]),
+        "as_of": int(data["as_of"]),
+        "updated_at": data["updated_at"],
+    }
+    _cache.update(updated_at=data["updated_at"], snapshot=snapshot)
+    return snapshot
+
+
+def _meta(snapshot: dict) -> dict:
+    return {k: snapshot[k] for k in ("samples", "window", "interval_ms", "as_of", "updated_at")}
+
+
+def _num(x) -> float | None:
+    return None if not np.isfinite(x) else round(float(x), 4)
+
+
+def submatrix(snapshot: dict, symbols: list[str]) -> dict:
+    """Correlation among `symbols` (unknown ones dropped), rows/cols in the requested order."""
+    known = [s for s in symbols if s in snapshot["index"]]
+    idx = [snapshot["index"][s] for s in known]
+    sub = snapshot["matrix"][np.ix_(idx, idx)]
+    return {**_meta(snapshot), "symbols": known, "matrix": [[_num(v) for v in row] for row in sub]}
+
+
+def top_peers(snapshot: dict, ticker: str, n: int) -> dict | None:
+    """The n symbols most positively and most negatively correlated with ticker."""
+    i = snapshot["index"].get(ticker)
+    if i is None:
+        return None
+    row = snapshot["matrix"][i].astype(np.float64)
+    row[i] = np.nan
+    valid = np.flatnonzero(np.isfinite(row))
+    order = valid[np.argsort(row[valid])]
+    symbols = snapshot["symbols"]
+    return {
+        **_meta(snapshot),
+        "ticker": ticker,
+        "positive": [{"symbol": symbols[j], "correlation": _num(row[j])} for j in order[::-1][:n] if row[j] > 0],
+        "negative": [{"symbol": symbols[j], "correlation": _num(row[j])} for j in order[:n] if row[j] < 0],
+    }
@@ -1,5 +1,15 @@
+import asyncio
 import os
+from datetime import datetime
+
 import asyncpg
+import numpy as np
+
+import archive
+from downsample import BucketAggregator, CANDIDATES_PER_BUCKET, lttb
+
+# Rows pulled per cursor round trip when streaming raw_trades
+INTRADAY_CHUNK_ROWS = 20_000
 
 def get_pg_url() -> str:
     # FastAPI/asyncpg use postgresql:// not postgresql+asyncpg
@@ -17,30 +27,74 @@ async def get_pool():
     )
 
 async def fetch_historical(conn, ticker: str, limit: int = 200):
+    """Newest-first daily bars, each decoded on its own.
+
+    A row holds either NUMERIC prices or *_fx at the symbol's scale
+    (PRICE_ENCODING=fixed), so days from before and after a switch of
+    encoding, or before the symbol was registered, mix freely.
+    """
     rows = await conn.fetch(
         """
-        SELECT open, high, low, close, volume, date::text
-        FROM ohlcv_daily
-        WHERE symbol = $1
-        ORDER BY date DESC
+        SELECT o.open, o.high, o.low, o.close, o.open_fx, o.high_fx, o.low_fx, o.close_fx, o.volume, o.date::text, s.scale
+        FROM ohlcv_daily o
+        LEFT JOIN symbol_scales s ON s.symbol = o.symbol
+        WHERE o.symbol = $1
+        ORDER BY o.date DESC
         LIMIT $2
         """,
         ticker.upper(),
         limit,
     )
-    return [{"open": r["open"], "high": r["high"], "low": r["low"], "close": r["close"], "volume": r["volume"], "date": r["date"]} for r in rows]
+    out = []
+    for r in rows:
+        if r["close_fx"] is None:
+            prices = (r["open"], r["high"], r["low"], r["close"])
+        else:
+            factor = 10.0 ** r["scale"]
+            prices = (r["open_fx"] / factor, r["high_fx"] / factor, r["low_fx"] / factor, r["close_fx"] / factor)
+        out.append(dict(zip(("open", "high", "low", "close"), prices), volume=r["volume"], date=r["date"]))
+    return out
 
-async def fetch_alerts(conn, limit: int = 100):
+async def fetch_alerts(
+    conn,
+    limit: int = 100,
+    ticker: str | None = None,
+    alert_type: str | None = None,
+    severity: str | None = None,
+    before_ts: datetime | None = None,
+    before_id: int | None = None,
+):
+    """Newest-first alerts. Keyset pagination: pass the last row's ts (and id) as before_ts/before_id."""
+    clauses = []
+    args = []
+    if ticker:
+        args.append(ticker.upper())
+        clauses.append(f"ticker = ${len(args)}")
+    if alert_type:
+        args.append(alert_type)
+        clauses.append(f"alert_type = ${len(args)}")
+    if severity:
+        args.append(severity)
+        clauses.append(f"severity = ${len(args)}")
+    if before_ts is not None and before_id is not None:
+        args.extend([before_ts, before_id])
+        clauses.append(f"(ts, id) < (${len(args) - 1}, ${len(args)})")
+    elif before_ts is not None:
+        args.append(before_ts)
+        clauses.append(f"ts < ${len(args)}")
+    args.append(limit)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     rows = await conn.fetch(
-        """
-        SELECT ticker, alert_type, severity, value, ts
+        f"""
+        SELECT id, ticker, alert_type, severity, value, ts
         FROM alerts
-        ORDER BY ts DESC
-        LIMIT $1
+        {where}
+        ORDER BY ts DESC, id DESC
+        LIMIT ${len(args)}
         """,
-        limit,
+        *args,
     )
-    return [{"ticker": r["ticker"], "type": r["alert_type"], "severity": r["severity"], "value": float(r["value"]) if r["value"] else None, "ts": r["ts"].isoformat() if hasattr(r["ts"], "isoformat") else str(r["ts"])} for r in rows]
+    return [{"id": r["id"], "ticker": r["ticker"], "type": r["alert_type"], "severity": r["severity"], "value": float(r["value"]) if r["value"] is not None else None, "ts": r["ts"].isoformat() if hasattr(r["ts"], "isoformat") else str(r["ts"])} for r in rows]
 
 async def fetch_top_movers(conn):
     # Latest report: get max(generated_at) then gainers/losers
@@ -63,3 +117,126 @@ async def fetch_top_movers(conn):
         "losers": [{"symbol": r["symbol"], "pct_change": float(r["pct_change"]), "rank": r["rank_losers"], "volume": r["volume"], "close": float(r["close"]) if r["close"] else None} for r in losers],
         "generated_at": gen_at.isoformat() if hasattr(gen_at, "isoformat") else str(gen_at),
     }
+
+
+async def fetch_intraday(
+    conn, ticker: str, ts_from: int, ts_to: int, points: int, mode: str = "ohlcv", archive_dir: str = "", price_encoding: str = "decimal"
+):
+    """Stream raw_trades for one symbol in [ts_from, ts_to) and downsample to at most `points`.
+
+    mode="ohlcv" returns time-bucketed bars; mode="lttb" returns LTTB price points
+    chosen from per-bucket first/low/high/last candidates. Days present in the
+    Parquet archive under archive_dir are read from there instead of PostgreSQL.
+    With price_encoding="fixed", int64 price_fx is read and scaled in NumPy.
+    Trades in the other encoding (from before a switch) are converted in SQL.
+    """
+    ticker = ticker.upper()
+    # An unregistered symbol has no fixed-point rows yet, so it is read as NUMERIC
+    scale = await conn.fetchval("SELECT scale FROM symbol_scales WHERE symbol = $1", ticker)
+    fixed = price_encoding == "fixed" and scale is not None
+    n_buckets = points if mode == "ohlcv" else max(1, points // CANDIDATES_PER_BUCKET) * 2
+    agg = BucketAggregator(ts_from, ts_to, n_buckets)
+    for lo, hi, path in archive.plan_segments(archive_dir, ticker, ts_from, ts_to):
+        if path is not None:
+            await asyncio.to_thread(archive.fold_archived, agg, path, lo, hi)
+        else:
+            await _fold_raw_trades(conn, agg, ticker, lo, hi, scale, fixed)
+    if mode == "ohlcv":
+        return agg.ohlcv()
+    ts, price = lttb(*agg.candidates(), points)
+    return [{"ts": int(t), "price": float(p)} for t, p in zip(ts, price)]
+
+
+async def _fold_raw_trades(
+    conn, agg: BucketAggregator, ticker: str, ts_from: int, ts_to: int, scale: int | None = None, fixed: bool = False
+):
+    # Trades from before a switch of PRICE_ENCODING hold the other encoding; convert them in SQL
+    if scale is None:
+        price, args = "price::float8", ()
+    elif fixed:
+        price, args = "COALESCE(price_fx, round(price * $4)::bigint)", (10**scale,)
+    else:
+        price, args = "COALESCE(price::float8, price_fx / $4::float8)", (10**scale,)
+    async with conn.transaction():
+        cursor = await conn.cursor(
+            f"""
+            SELECT trade_ts, {price}, volume
+            FROM raw_trades
+            WHERE symbol = $1 AND trade_ts >= $2 AND trade_ts < $3
+            ORDER BY trade_ts
+            """,
+            ticker,
+            ts_from,
+            ts_to,
+            *args,
+        )
+        while True:
+            rows = await cursor.fetch(INTRADAY_CHUNK_ROWS)
+            if not rows:
+                break
+            n = len(rows)
+            if not fixed:
+                prices = np.fromiter((r[1] for r in rows), dtype=np.float64, count=n)
+            else:
+                prices = np.fromiter((r[1] for r in rows), dtype=np.int64, count=n) / 10.0 ** scale
+            agg.add(
+                np.fromiter((r[0] for r in rows), dtype=np.int64, count=n),
+                prices,
+                np.fromiter((r[2] for r in rows), dtype=np.int64, count=n),
+            )
+
+
+ROLLING_SORT_COLUMNS = ("return_pct", "realized_vol", "parkinson_vol", "atr", "avg_volume")
+
+
+def _rolling_row(r):
+    return {
+        "symbol": r["symbol"],
+        "window": r["window_days"],
+        "last_date": r["last_date"].isoformat() if r["last_date"] else None,
+        "return_pct": float(r["return_pct"]) if r["return_pct"] is not None else None,
+        "realized_vol": float(r["realized_vol"]) if r["realized_vol"] is not None else None,
+        "parkinson_vol": float(r["parkinson_vol"]) if r["parkinson_vol"] is not None else None,
+        "atr": float(r["atr"]) if r["atr"] is not None else None,
+        "avg_volume": float(r["avg_volume"]) if r["avg_volume"] is not None else None,
+        "last_close": float(r["last_close"]) if r["last_close"] is not None else None,
+    }
+
+
+async def fetch_rolling_ranked(conn, window: int, sort: str, descending: bool = True, limit: int = 20):
+    """Latest materialized rolling_metrics for one window, ranked by `sort` (one of ROLLING_SORT_COLUMNS)."""
+    as_of = await conn.fetchval("SELECT max(as_of_date) FROM rolling_metrics WHERE window_days = $1", window)
+    if as_of is None:
+        return {"as_of": None, "window": window, "rows": []}
+    rows = await conn.fetch(
+        f"""
+        SELECT symbol, window_days, last_date, return_pct, realized_vol, parkinson_vol, atr, avg_volume, last_close
+        FROM rolling_metrics
+        WHERE as_of_date = $1 AND window_days = $2 AND {sort} IS NOT NULL
+        ORDER BY {sort} {"DESC" if descending else "ASC"}
+        LIMIT $3
+        """,
+        as_of,
+        window,
+        limit,
+    )
+    return {"as_of": as_of.isoformat(), "window": window, "rows": [_rolling_row(r) for r in rows]}
+
+
+async def fetch_rolling_symbol(conn, ticker: str):
+    """All windows of the latest rolling_metrics for one symbol."""
+    rows = await conn.fetch(
+        """
+        SELECT symbol, as_of_date, window_days, last_date, return_pct, realized_vol, parkinson_vol, atr, avg_volume, last_close
+        FROM rolling_metrics
+        WHERE symbol = $1
+          AND as_of_date = (SELECT max(as_of_date) FROM rolling_metrics WHERE symbol = $1)
+        ORDER BY window_days
+        """,
+        ticker.upper(),
+    )
+    return {
+        "symbol": ticker.upper(),
+        "as_of": rows[0]["as_of_date"].isoformat() if rows else None,
+        "windows": [_rolling_row(r) for r in rows],
+    }
@@ -0,0 +1,117 @@
+"""
+Vectorized intraday downsampling over streamed trade chunks.
+
+BucketAggregator folds time-ordered chunks of (trade_ts, price, volume) into
+fixed-width time buckets with running OHLCV, so memory is bounded by the
+bucket count rather than the tick count. LTTB runs on the per-bucket
+first/low/high/last candidates (MinMax preselection), never on raw ticks.
+"""
+import numpy as np
+
+# Candidate points kept per bucket for LTTB preselection (first, low, high, last)
+CANDIDATES_PER_BUCKET = 4
+
+
+class BucketAggregator:
+    """Running OHLCV over `n_buckets` equal time buckets covering [start_ms, end_ms)."""
+
+    def __init__(self, start_ms: int, end_ms: int, n_buckets: int):
+        self.start_ms = int(start_ms)
+        self.n_buckets = max(1, int(n_buckets))
+        span = max(1, int(end_ms) - self.start_ms)
+        self.width_ms = max(1, -(-span // self.n_buckets))
+        n = self.n_buckets
+        self.count = np.zeros(n, dtype=np.int64)
+        self.volume = np.zeros(n, dtype=np.int64)
+        self.open = np.full(n, np.nan)
+        self.open_ts = np.zeros(n, dtype=np.int64)
+        self.close = np.full(n, np.nan)
+        self.close_ts = np.zeros(n, dtype=np.int64)
+        self.high = np.full(n, -np.inf)
+        self.high_ts = np.zeros(n, dtype=np.int64)
+        self.low = np.full(n, np.inf)
+        self.low_ts = np.zeros(n, dtype=np.int64)
+
+    def add(self, ts: np.ndarray, price: np.ndarray, volume: np.ndarray) -> None:
+        """Fold one chunk; chunks must arrive in non-decreasing trade_ts order."""
+        if len(ts) == 0:
+            return
+        idx = np.clip((ts - self.start_ms) // self.width_ms, 0, self.n_buckets - 1)
+        buckets, first = np.unique(idx, return_index=True)
+        last = np.append(first[1:], len(idx)) - 1
+        seg = np.repeat(np.arange(len(buckets)), np.diff(np.append(first, len(idx))))
+
+        fresh = self.count[buckets] == 0
+        self.open[buckets[fresh]] = price[first[fresh]]
+        self.open_ts[buckets[fresh]] = ts[first[fresh]]
+        self.close[buckets] = price[last]
+        self.close_ts[buckets] = ts[last]
+        self.count[buckets] += np.diff(np.append(first, len(idx)))
+        self.volume[buckets] += np.add.reduceat(volume, first)
+
+        hi = np.maximum.reduceat(price, first)
+        hi_pos = _first_hit(seg, price == hi[seg])
+        up = hi > self.high[buckets]
+        self.high[buckets[up]] = hi[up]
+        self.high_ts[buckets[up]] = ts[hi_pos[up]]
+
+        lo = np.minimum.reduceat(price, first)
+        lo_pos = _first_hit(seg, price == lo[seg])
+        down = lo < self.low[buckets]
+        self.low[buckets[down]] = lo[down]
+        self.low_ts[buckets[down]] = ts[lo_pos[down]]
+
+    def ohlcv(self) -> list[dict]:
+        filled = np.flatnonzero(self.count)
+        bucket_ts = self.start_ms + filled * self.width_ms
+        return [
+            {"ts": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c), "volume": int(v)}
+            for t, o, h, l, c, v in zip(
+                bucket_ts,
+                self.open[filled],
+                self.high[filled],
+                self.low[filled],
+                self.close[filled],
+                self.volume[filled],
+            )
+        ]
+
+    def candidates(self) -> tuple[np.ndarray, np.ndarray]:
+        """First/low/high/last point of every non-empty bucket, time-ordered and de-duplicated."""
+        filled = np.flatnonzero(self.count)
+        ts = np.concatenate([self.open_ts[filled], self.low_ts[filled], self.high_ts[filled], self.close_ts[filled]])
+        price = np.concatenate([self.open[filled], self.low[filled], self.high[filled], self.close[filled]])
+        ts, keep = np.unique(ts, return_index=True)
+        return ts, price[keep]
+
+
+def _first_hit(seg: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Index of the first True in `mask` for each segment id (every segment has one)."""
+    hits = np.flatnonzero(mask)
+    _, pos = np.unique(seg[hits], return_index=True)
+    return hits[pos]
+
+
+def lttb(ts: np.ndarray, price: np.ndarray, n_out: int) -> tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets downsampling to at most n_out points."""
+    n = len(ts)
+    if n_out >= n or n_out < 3:
+        return ts, price
+    x = ts.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = price[nxt_lo:nxt_hi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (price[lo:hi] - price[a])
+            - (x[a] - x[lo:hi]) * (avg_y - price[a])
+        )
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return ts[out], price[out]
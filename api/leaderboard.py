@@ -0,0 +1,34 @@
+"""
+Intraday leaderboard read from the per-day Redis sorted sets maintained by
+the streaming job (leaderboard:{YYYY-MM-DD}:{pct_change|range_pct|volume}).
+
+Each board is a ZREVRANGE/ZRANGE of the top N, all sent in one pipeline, so
+cost is O(log M + N) per board regardless of the symbol universe size M.
+"""
+from datetime import date
+
+from redis.asyncio import Redis
+
+KEY_PREFIX = "leaderboard"
+
+
+def board_key(day: date, metric: str) -> str:
+    return f"{KEY_PREFIX}:{day.isoformat()}:{metric}"
+
+
+async def fetch_intraday_leaderboard(redis: Redis, day: date, n: int = 5) -> dict:
+    pipe = redis.pipeline(transaction=False)
+    pipe.zrevrange(board_key(day, "pct_change"), 0, n - 1, withscores=True)
+    pipe.zrange(board_key(day, "pct_change"), 0, n - 1, withscores=True)
+    pipe.zrevrange(board_key(day, "range_pct"), 0, n - 1, withscores=True)
+    pipe.zrevrange(board_key(day, "volume"), 0, n - 1, withscores=True)
+    pipe.get(board_key(day, "updated_at"))
+    gainers, losers, volatile, volume, updated_at = await pipe.execute()
+    return {
+        "date": day.isoformat(),
+        "gainers": [{"symbol": s, "pct_change": v, "rank": i + 1} for i, (s, v) in enumerate(gainers) if v > 0],
+        "losers": [{"symbol": s, "pct_change": v, "rank": i + 1} for i, (s, v) in enumerate(losers) if v < 0],
+        "volatile": [{"symbol": s, "range_pct": v, "rank": i + 1} for i, (s, v) in enumerate(volatile)],
+        "volume": [{"symbol": s, "volume": int(v), "rank": i + 1} for i, (s, v) in enumerate(volume)],
+        "updated_at": updated_at,
+    }
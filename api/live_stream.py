@@ -0,0 +1,118 @@
+"""
+Live metrics for /ws/live from the per-symbol Redis Streams written by the
+stream processor (trades:stream:{symbol}, XADD MAXLEN ~N).
+
+A socket first gets a history message (the last N minutes, or everything
+after the stream ID the client last saw, so a reconnect resumes without
+gaps), then live entries. Live entries come from one XREAD BLOCK loop per
+subscribed ticker, shared by every socket on that ticker and fanned out to
+bounded per-client queues; entries already covered by the history are
+skipped by ID.
+"""
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+
+from prices import decode_metrics
+
+logger = logging.getLogger(__name__)
+
+CLIENT_QUEUE_SIZE = 256
+RECONNECT_DELAY_MAX = 30.0
+XREAD_BLOCK_MS = 5000
+XREAD_COUNT = 100
+# A new reader starts this far back (not at "$") so nothing slips between a
+# socket's history read and the reader's first XREAD; sockets drop the overlap by ID
+READER_START_LOOKBACK_MS = 60_000
+
+
+def stream_key(ticker: str) -> str:
+    return f"trades:stream:{ticker}"
+
+
+def parse_stream_id(stream_id: str) -> tuple[int, int]:
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def is_stream_id(value) -> bool:
+    try:
+        parse_stream_id(value)
+        return True
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+
+def _entry(stream_id: str, fields: dict) -> dict:
+    return {"type": "metrics", "id": stream_id, **decode_metrics(fields)}
+
+
+async def fetch_history(redis: Redis, ticker: str, after_id: str | None, minutes: float, max_items: int) -> tuple[list[dict], bool]:
+    """Entries after `after_id` (exclusive), else from the last `minutes`; newest max_items, oldest first.
+
+    Returns (entries, truncated) where truncated means older matching entries were left out.
+    """
+    start = f"({after_id}" if after_id else str(int(time.time() * 1000 - minutes * 60_000))
+    rows = await redis.xrevrange(stream_key(ticker), max="+", min=start, count=max_items + 1)
+    truncated = len(rows) > max_items
+    return [_entry(i, f) for i, f in reversed(rows[:max_items])], truncated
+
+
+class LiveStreamHub:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._clients: dict[str, set[asyncio.Queue]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def subscribe(self, ticker: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._clients.setdefault(ticker, set()).add(queue)
+        if ticker not in self._tasks:
+            self._tasks[ticker] = asyncio.create_task(self._run(ticker))
+        return queue
+
+    def unsubscribe(self, ticker: str, queue: asyncio.Queue):
+        clients = self._clients.get(ticker)
+        if clients is None:
+            return
+        clients.discard(queue)
+        if not clients:
+            del self._clients[ticker]
+            task = self._tasks.pop(ticker, None)
+            if task:
+                task.cancel()
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        self._clients.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _fan_out(self, ticker: str, entry: dict):
+        for queue in self._clients.get(ticker, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(entry)
+
+    async def _run(self, ticker: str):
+        key = stream_key(ticker)
+        last_id = f"{int(time.time() * 1000) - READER_START_LOOKBACK_MS}-0"
+        delay = 1.0
+        while True:
+            try:
+                result = await self.redis.xread({key: last_id}, count=XREAD_COUNT, block=XREAD_BLOCK_MS)
+                delay = 1.0
+                for _, entries in result or ():
+                    for stream_id, fields in entries:
+                        self._fan_out(ticker, _entry(stream_id, fields))
+                        last_id = stream_id
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Live stream reader for %s failed, retrying in %.1fs: %s", ticker, delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
@@ -1,24 +1,49 @@
 import json
+import time
 import asyncio
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Literal
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from redis.asyncio import Redis
+from fastapi.responses import StreamingResponse
+from redis.asyncio import BlockingConnectionPool, Redis
 
 from config import settings
-from models import MetricsResponse, OHLCVPoint, TopMoversResponse, AlertResponse
-from database import get_pool, fetch_historical, fetch_alerts, fetch_top_movers
+from models import MetricsResponse, OHLCVPoint, TopMoversResponse, AlertResponse, IntradayLeaderboardResponse
+from database import (
+    get_pool, fetch_historical, fetch_alerts, fetch_top_movers, fetch_intraday,
+    fetch_rolling_ranked, fetch_rolling_symbol, ROLLING_SORT_COLUMNS,
+)
+from alerts_stream import AlertBroadcaster, alert_matches
+from leaderboard import fetch_intraday_leaderboard
+from correlation import load_snapshot, submatrix, top_peers
+from live_stream import LiveStreamHub, fetch_history, is_stream_id, parse_stream_id
+from prices import decode_metrics
+from profiling import ProfilingMiddleware, RouteTimings
 
 redis_client: Redis | None = None
 db_pool = None
+alert_broadcaster: AlertBroadcaster | None = None
+live_hub: LiveStreamHub | None = None
+route_timings = RouteTimings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global redis_client, db_pool
-    redis_client = Redis.from_url(settings.redis_url, decode_responses=True)
+    global redis_client, db_pool, alert_broadcaster, live_hub
+    redis_client = Redis.from_pool(
+        BlockingConnectionPool.from_url(settings.redis_url, decode_responses=True, max_connections=settings.redis_max_connections)
+    )
     db_pool = await get_pool()
+    alert_broadcaster = AlertBroadcaster(redis_client, settings.alerts_channel)
+    alert_broadcaster.start()
+    live_hub = LiveStreamHub(redis_client)
     yield
+    if live_hub:
+        await live_hub.stop()
+    if alert_broadcaster:
+        await alert_broadcaster.stop()
     if redis_client:
         await redis_client.close()
     if db_pool:
@@ -32,6 +57,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.profile_timers or settings.profile_capture:
+    app.add_middleware(
+        ProfilingMiddleware,
+        timings=route_timings,
+        capture=settings.profile_capture,
+        every=settings.profile_every,
+        profile_dir=settings.profile_dir,
+    )
 
 
 @app.get("/health")
@@ -53,11 +86,23 @@ async def health():
     return {"status": "ok" if all(v == "ok" for k, v in checks.items() if k != "kafka") else "degraded", "checks": checks}
 
 
+@app.get("/debug/timings")
+async def get_route_timings():
+    """Per-route latency histograms recorded by ProfilingMiddleware (PROFILE_TIMERS=1)."""
+    if not (settings.profile_timers or settings.profile_capture):
+        raise HTTPException(status_code=404, detail="Profiling is disabled; set PROFILE_TIMERS=1")
+    return route_timings.snapshot()
+
+
 @app.get("/api/tickers")
 async def list_tickers():
     return {"tickers": settings.ticker_list}
 
 
+# Fields of trades:metrics:* that every INDICATORS setting writes; the rest are indicator outputs
+BASE_METRICS = ("price", "vwap_1m", "vwap_5m", "vwap_15m", "vol", "ts")
+
+
 @app.get("/api/metrics/{ticker}", response_model=MetricsResponse)
 async def get_metrics(ticker: str):
     if not redis_client:
@@ -66,15 +111,15 @@ async def get_metrics(ticker: str):
     data = await redis_client.hgetall(key)
     if not data:
         raise HTTPException(404, f"No metrics for ticker {ticker}")
+    data = decode_metrics(data)
     return MetricsResponse(
         price=float(data.get("price", 0)),
         vwap_1m=float(data.get("vwap_1m", 0)),
         vwap_5m=float(data.get("vwap_5m")) if data.get("vwap_5m") else None,
         vwap_15m=float(data.get("vwap_15m")) if data.get("vwap_15m") else None,
-        ema9=float(data.get("ema9", 0)),
-        ema21=float(data.get("ema21", 0)),
         vol=float(data.get("vol", 0)),
         ts=data.get("ts", "0"),
+        indicators={k: float(v) for k, v in data.items() if k not in BASE_METRICS and v != ""},
     )
 
 
@@ -85,6 +130,23 @@ async def get_historical(ticker: str, limit: int = 200):
     return rows
 
 
+@app.get("/api/intraday/{ticker}")
+async def get_intraday(
+    ticker: str,
+    ts_from: int | None = Query(None, alias="from", description="Start, epoch ms (default: to - 24h)"),
+    ts_to: int | None = Query(None, alias="to", description="End (exclusive), epoch ms (default: now)"),
+    points: int = Query(500, ge=10, le=5000),
+    mode: Literal["ohlcv", "lttb"] = "ohlcv",
+):
+    ts_to = ts_to if ts_to is not None else int(time.time() * 1000)
+    ts_from = ts_from if ts_from is not None else ts_to - 86_400_000
+    if ts_from >= ts_to:
+        raise HTTPException(400, "'from' must be before 'to'")
+    async with db_pool.acquire() as conn:
+        rows = await fetch_intraday(conn, ticker, ts_from, ts_to, points, mode, settings.raw_trades_archive_dir, settings.price_encoding)
+    return {"ticker": ticker.upper(), "from": ts_from, "to": ts_to, "mode": mode, "points": rows}
+
+
 @app.get("/api/reports/top-movers", response_model=TopMoversResponse)
 async def get_top_movers():
     async with db_pool.acquire() as conn:
@@ -92,35 +154,143 @@ async def get_top_movers():
     return TopMoversResponse(**data)
 
 
+@app.get("/api/leaderboard/intraday", response_model=IntradayLeaderboardResponse)
+async def get_intraday_leaderboard(n: int = Query(5, ge=1, le=100)):
+    if not redis_client:
+        raise HTTPException(500, "Redis not available")
+    today = datetime.now(timezone.utc).date()
+    return IntradayLeaderboardResponse(**await fetch_intraday_leaderboard(redis_client, today, n))
+
+
+@app.get("/api/correlation")
+async def get_correlation(symbols: str | None = Query(None, description="Comma-separated; default configured tickers")):
+    if not redis_client:
+        raise HTTPException(500, "Redis not available")
+    snapshot = await load_snapshot(redis_client)
+    if snapshot is None:
+        raise HTTPException(404, "No correlation data yet")
+    wanted = [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else settings.ticker_list
+    return submatrix(snapshot, wanted)
+
+
+@app.get("/api/correlation/{ticker}")
+async def get_correlation_peers(ticker: str, n: int = Query(10, ge=1, le=100)):
+    if not redis_client:
+        raise HTTPException(500, "Redis not available")
+    snapshot = await load_snapshot(redis_client)
+    data = top_peers(snapshot, ticker.upper(), n) if snapshot else None
+    if data is None:
+        raise HTTPException(404, f"No correlation data for ticker {ticker}")
+    return data
+
+
+@app.get("/api/analytics/rolling")
+async def get_rolling_ranked(
+    window: int = Query(20, ge=1),
+    sort: str = "realized_vol",
+    order: Literal["desc", "asc"] = "desc",
+    limit: int = Query(20, ge=1, le=500),
+):
+    if sort not in ROLLING_SORT_COLUMNS:
+        raise HTTPException(400, f"sort must be one of {', '.join(ROLLING_SORT_COLUMNS)}")
+    async with db_pool.acquire() as conn:
+        return await fetch_rolling_ranked(conn, window, sort, order == "desc", limit)
+
+
+@app.get("/api/analytics/rolling/{ticker}")
+async def get_rolling_symbol(ticker: str):
+    async with db_pool.acquire() as conn:
+        data = await fetch_rolling_symbol(conn, ticker)
+    if not data["windows"]:
+        raise HTTPException(404, f"No rolling analytics for ticker {ticker}")
+    return data
+
+
 @app.get("/api/alerts")
-async def get_alerts(limit: int = 100):
+async def get_alerts(
+    limit: int = Query(100, ge=1, le=1000),
+    ticker: str | None = None,
+    type: str | None = None,
+    severity: str | None = None,
+    before_ts: datetime | None = None,
+    before_id: int | None = None,
+):
+    if before_id is not None and before_ts is None:
+        raise HTTPException(422, "before_id requires before_ts")
     async with db_pool.acquire() as conn:
-        rows = await fetch_alerts(conn, limit)
+        rows = await fetch_alerts(conn, limit, ticker, type, severity, before_ts, before_id)
     return rows
 
 
+@app.get("/api/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    ticker: str | None = None,
+    type: str | None = None,
+    severity: str | None = None,
+):
+    if not alert_broadcaster:
+        raise HTTPException(500, "Alert stream not available")
+    ticker = ticker.upper() if ticker else None
+    queue = alert_broadcaster.subscribe()
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    alert = await asyncio.wait_for(queue.get(), timeout=settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if alert_matches(alert, ticker, type, severity):
+                    yield f"event: alert\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            alert_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.websocket("/ws/live")
 async def websocket_live(websocket: WebSocket):
+    """Send {"type": "history", ...} for the ticker, then live {"type": "metrics", "id", ...} entries.
+
+    The first client message is {"ticker": ..., "last_id": ...}; with last_id
+    (the "id" of the last entry the client saw) history resumes right after it.
+    """
     await websocket.accept()
     try:
         data = await websocket.receive_text()
         msg = json.loads(data) if data else {}
         ticker = (msg.get("ticker") or msg.get("symbol") or "AAPL").upper()
+        last_id = msg.get("last_id") if is_stream_id(msg.get("last_id")) else None
     except Exception:
-        ticker = "AAPL"
+        ticker, last_id = "AAPL", None
     if ticker not in settings.ticker_list:
         ticker = settings.ticker_list[0] if settings.ticker_list else "AAPL"
-    pubsub = redis_client.pubsub()
-    channel = f"live:{ticker}"
-    await pubsub.subscribe(channel)
+    queue = live_hub.subscribe(ticker)
     try:
+        items, truncated = await fetch_history(
+            redis_client, ticker, last_id, settings.live_history_minutes, settings.live_history_max_items
+        )
+        await websocket.send_text(json.dumps({"type": "history", "ticker": ticker, "items": items, "truncated": truncated}))
+        last_seen = parse_stream_id(items[-1]["id"] if items else last_id or "0-0")
         while True:
-            msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-            if msg and msg.get("type") == "message" and msg.get("data"):
-                await websocket.send_text(msg["data"])
-            await asyncio.sleep(0.01)
+            try:
+                entry = await asyncio.wait_for(queue.get(), timeout=settings.live_keepalive_seconds)
+            except asyncio.TimeoutError:
+                await websocket.send_text('{"type": "keepalive"}')
+                continue
+            entry_id = parse_stream_id(entry["id"])
+            if entry_id <= last_seen:
+                continue
+            await websocket.send_text(json.dumps(entry))
+            last_seen = entry_id
     except WebSocketDisconnect:
         pass
     finally:
-        await pubsub.unsubscribe(channel)
-        await pubsub.close()
+        live_hub.unsubscribe(ticker, queue)
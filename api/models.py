@@ -7,10 +7,13 @@ class MetricsResponse(BaseModel):
     vwap_1m: float
     vwap_5m: Optional[float] = None
     vwap_15m: Optional[float] = None
-    ema9: float
-    ema21: float
+    # Deprecated: left unset; EMA values are in indicators (when INDICATORS configures them)
+    ema9: Optional[float] = None
+    ema21: Optional[float] = None
     vol: float
     ts: str
+    # Indicator fields the stream processor writes (INDICATORS), e.g. ema9, ema21, rsi14, macd, bb20_upper
+    indicators: dict[str, float] = {}
 
 class OHLCVPoint(BaseModel):
     open: float
@@ -25,6 +28,14 @@ class TopMoversResponse(BaseModel):
     losers: list[dict]
     generated_at: Optional[str] = None
 
+class IntradayLeaderboardResponse(BaseModel):
+    date: str
+    gainers: list[dict]
+    losers: list[dict]
+    volatile: list[dict]
+    volume: list[dict]
+    updated_at: Optional[str] = None
+
 class AlertResponse(BaseModel):
     ticker: str
     type: str
@@ -0,0 +1,28 @@
+"""
+Fixed-point price decoding at the API edge.
+
+With PRICE_ENCODING=fixed the stream processor writes the price fields of
+trades:metrics:{ticker} and trades:stream:{ticker} as integers at the
+symbol's scale (price * 10^scale) with a "scale" field alongside, plus
+"price_fields" naming the scaled fields (indicator outputs vary with the
+stream's INDICATORS), and raw_trades / ohlcv_daily hold int64 *_fx columns
+(scale in symbol_scales).
+Everything below turns those into floats once, just before serialization;
+values without a scale pass through unchanged.
+"""
+# Scaled fields of entries written before "price_fields" was added
+PRICE_FIELDS = ("price", "vwap_1m", "vwap_5m", "vwap_15m", "ema9", "ema21")
+
+
+def decode_metrics(fields: dict) -> dict:
+    """Metrics hash/stream fields with fixed-point prices converted to floats and "scale"/"price_fields" dropped."""
+    scale = fields.get("scale")
+    if scale is None:
+        return fields
+    factor = 10.0 ** int(scale)
+    out = {k: v for k, v in fields.items() if k not in ("scale", "price_fields")}
+    price_fields = fields["price_fields"].split(",") if fields.get("price_fields") else PRICE_FIELDS
+    for field in price_fields:
+        if out.get(field):
+            out[field] = int(out[field]) / factor
+    return out
@@ -0,0 +1,139 @@
+"""
+Opt-in request profiling: per-route timing histograms and sampled profiler captures.
+
+ProfilingMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task
+hop), so with capture off a request costs two perf_counter calls, a bisect
+into fixed millisecond buckets, and a dict lookup keyed by "METHOD /route/{template}".
+Streaming responses (SSE) are timed until the stream ends.
+
+Every `every`-th HTTP request can run under cProfile or pyinstrument and the
+dump is written to profile_dir. pyinstrument (async_mode) follows just that
+request's task across awaits; cProfile sees everything the event loop runs
+while the request is in flight, so other requests show up in its dump. One
+capture runs at a time; a request that comes due during another is only timed.
+"""
+import bisect
+import cProfile
+import logging
+import re
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in ms; the last bucket is unbounded
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class RouteTimings:
+    def __init__(self):
+        # route -> [bucket counts, count, total_ms, max_ms]
+        self._routes: dict[str, list] = {}
+
+    def observe(self, route: str, ms: float):
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = [[0] * (len(BUCKETS_MS) + 1), 0, 0.0, 0.0]
+        entry[0][bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        entry[1] += 1
+        entry[2] += ms
+        if ms > entry[3]:
+            entry[3] = ms
+
+    def snapshot(self) -> dict:
+        """Per route: count, mean/max, bucket counts, and p50/p95/p99 as bucket upper bounds."""
+        out = {}
+        for route, (buckets, count, total, peak) in sorted(self._routes.items()):
+            bounds = [str(b) for b in BUCKETS_MS] + ["+Inf"]
+            out[route] = {
+                "count": count,
+                "mean_ms": round(total / count, 3),
+                "max_ms": round(peak, 3),
+                **{f"p{int(q * 100)}_ms": _quantile(buckets, count, q, peak) for q in (0.5, 0.95, 0.99)},
+                "buckets_ms": dict(zip(bounds, buckets)),
+            }
+        return out
+
+
+def _quantile(buckets: list[int], count: int, q: float, peak: float) -> float:
+    rank = q * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= rank:
+            return min(BUCKETS_MS[i], round(peak, 3)) if i < len(BUCKETS_MS) else round(peak, 3)
+    return round(peak, 3)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, timings: RouteTimings, capture: str = "", every: int = 100, profile_dir: str = "/tmp/profiles"):
+        self.app = app
+        self.timings = timings
+        self.capture = capture.lower()
+        if self.capture == "pyinstrument":
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                logger.warning("profile_capture=pyinstrument but pyinstrument is not installed; using cProfile")
+                self.capture = "cprofile"
+        elif self.capture not in ("", "cprofile"):
+            logger.warning("Unknown profile_capture=%r; captures disabled", capture)
+            self.capture = ""
+        self.every = max(1, every)
+        self.profile_dir = profile_dir
+        self.requests = 0
+        self._capturing = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.requests += 1
+        n = self.requests
+        profiler = self._start_capture() if self.capture and n % self.every == 0 else None
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            route = getattr(scope.get("route"), "path", None)
+            label = f"{scope['method']} {route}" if route else "unmatched"
+            if profiler is not None:
+                self._write_capture(profiler, label, n)
+            self.timings.observe(label, ms)
+
+    def _start_capture(self):
+        if self._capturing:
+            return None
+        try:
+            if self.capture == "pyinstrument":
+                import pyinstrument
+                profiler = pyinstrument.Profiler(async_mode="enabled")
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except (RuntimeError, ValueError) as e:
+            logger.debug("Skipping capture: %s", e)
+            return None
+        self._capturing = True
+        return profiler
+
+    def _write_capture(self, profiler, label: str, n: int):
+        try:
+            if self.capture == "pyinstrument":
+                profiler.stop()
+            else:
+                profiler.disable()
+        finally:
+            self._capturing = False
+        stem = f"{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}-{n}-{int(time.time() * 1000)}"
+        try:
+            path = Path(self.profile_dir)
+            path.mkdir(parents=True, exist_ok=True)
+            if self.capture == "pyinstrument":
+                (path / f"{stem}.html").write_text(profiler.output_html())
+            else:
+                profiler.dump_stats(str(path / f"{stem}.prof"))
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", stem, e)
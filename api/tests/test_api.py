@@ -52,3 +52,73 @@ async def test_alerts_returns_array(client):
     r = await client.get("/api/alerts")
     assert r.status_code == 200
     assert isinstance(r.json(), list)
+
+
+async def test_intraday_returns_shape(client):
+    r = await client.get("/api/intraday/AAPL?points=100&mode=lttb")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["mode"] == "lttb"
+    assert isinstance(data["points"], list)
+    assert len(data["points"]) <= 100
+
+
+async def test_intraday_rejects_inverted_range(client):
+    r = await client.get("/api/intraday/AAPL?from=2000&to=1000")
+    assert r.status_code == 400
+
+
+async def test_alerts_filtered_keyset_page(client):
+    r = await client.get("/api/alerts?ticker=AAPL&limit=5&before_ts=2030-01-01T00:00:00Z&before_id=1000000")
+    assert r.status_code == 200
+    rows = r.json()
+    assert isinstance(rows, list)
+    assert all(a["ticker"] == "AAPL" for a in rows)
+
+
+async def test_alerts_rejects_before_id_without_ts(client):
+    r = await client.get("/api/alerts?before_id=1000000")
+    assert r.status_code == 422
+
+
+async def test_intraday_leaderboard_returns_shape(client):
+    r = await client.get("/api/leaderboard/intraday?n=3")
+    assert r.status_code == 200
+    data = r.json()
+    for board in ("gainers", "losers", "volatile", "volume"):
+        assert len(data[board]) <= 3
+
+
+async def test_rolling_ranked_returns_shape(client):
+    r = await client.get("/api/analytics/rolling?window=20&sort=realized_vol&limit=5")
+    assert r.status_code == 200
+    data = r.json()
+    assert "as_of" in data
+    assert len(data["rows"]) <= 5
+
+
+async def test_rolling_rejects_unknown_sort(client):
+    r = await client.get("/api/analytics/rolling?sort=symbol;drop")
+    assert r.status_code == 400
+
+
+
+class _MetricsRedis:
+    def __init__(self, fields):
+        self.fields = fields
+
+    async def hgetall(self, key):
+        return self.fields
+
+
+async def test_metrics_serves_indicators_only_in_dict(client, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "redis_client", _MetricsRedis({
+        "price": "10.5", "vwap_1m": "10.4", "vwap_5m": "", "vol": "0.01", "ts": "1700000000000",
+        "ema9": "10.3", "rsi14": "55.5",
+    }))
+    r = await client.get("/api/metrics/TESTIND")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["ema9"] is None and body["ema21"] is None
+    assert body["indicators"] == {"ema9": 10.3, "rsi14": 55.5}
@@ -0,0 +1,52 @@
+"""Parquet archive reads: day-boundary planning and folding into the downsampler."""
+from decimal import Decimal
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from archive import DAY_MS, FILE_NAME, fold_archived, plan_segments
+from downsample import BucketAggregator
+
+
+def _write_day(root, day_str, ticker, ts, price, volume):
+    path = root / f"date={day_str}" / f"symbol={ticker}"
+    path.mkdir(parents=True)
+    table = pa.table({
+        "id": pa.array(np.arange(len(ts)), pa.int64()),
+        "trade_ts": pa.array(ts, pa.int64()),
+        "price": pa.array([Decimal(f"{p:.8f}") for p in price], pa.decimal128(20, 8)),
+        "volume": pa.array(volume, pa.int64()),
+    })
+    pq.write_table(table, path / FILE_NAME, row_group_size=1000)
+
+
+def test_plan_segments_uses_archive_only_for_archived_days(tmp_path):
+    _write_day(tmp_path, "1970-01-02", "AAPL", [DAY_MS + 1], [1.0], [1])
+    segments = plan_segments(str(tmp_path), "AAPL", 0, 3 * DAY_MS + 5)
+    assert [(lo, hi, p is not None) for lo, hi, p in segments] == [
+        (0, DAY_MS, False),
+        (DAY_MS, 2 * DAY_MS, True),
+        (2 * DAY_MS, 3 * DAY_MS + 5, False),
+    ]
+    assert plan_segments("", "AAPL", 0, 10) == [(0, 10, None)]
+
+
+def test_fold_archived_matches_in_memory_aggregation(tmp_path):
+    rng = np.random.default_rng(3)
+    ts = DAY_MS + np.sort(rng.integers(0, DAY_MS, 5000))
+    # multiples of 1/64 survive the decimal128 -> float64 round trip exactly
+    price = np.round((100 + np.cumsum(rng.normal(0, 0.05, 5000))) * 64) / 64
+    volume = rng.integers(1, 500, 5000)
+    _write_day(tmp_path, "1970-01-02", "AAPL", ts, price, volume)
+    lo, hi = DAY_MS + 3_600_000, DAY_MS + 7_200_000
+
+    (seg_lo, seg_hi, path), = plan_segments(str(tmp_path), "AAPL", lo, hi)
+    from_archive = BucketAggregator(lo, hi, 30)
+    rows = fold_archived(from_archive, path, seg_lo, seg_hi)
+
+    mask = (ts >= lo) & (ts < hi)
+    expected = BucketAggregator(lo, hi, 30)
+    expected.add(ts[mask], price[mask], volume[mask])
+    assert rows == mask.sum()
+    assert from_archive.ohlcv() == expected.ohlcv()
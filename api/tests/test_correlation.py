@@ -0,0 +1,39 @@
+"""Correlation snapshot slicing: submatrix order and peer ranking."""
+import numpy as np
+
+from correlation import submatrix, top_peers
+
+
+def _snapshot():
+    symbols = ["AAPL", "MSFT", "TSLA", "FLAT"]
+    matrix = np.array([
+        [1.0, 0.8, -0.3, np.nan],
+        [0.8, 1.0, 0.1, np.nan],
+        [-0.3, 0.1, 1.0, np.nan],
+        [np.nan, np.nan, np.nan, np.nan],
+    ], dtype="<f4")
+    return {
+        "symbols": symbols,
+        "index": {s: i for i, s in enumerate(symbols)},
+        "matrix": matrix,
+        "samples": 120,
+        "window": 120,
+        "interval_ms": 60_000,
+        "as_of": 0,
+        "updated_at": "2025-01-01T00:00:00+00:00",
+    }
+
+
+def test_submatrix_follows_requested_order_and_drops_unknown():
+    data = submatrix(_snapshot(), ["TSLA", "NOPE", "AAPL", "FLAT"])
+    assert data["symbols"] == ["TSLA", "AAPL", "FLAT"]
+    assert data["matrix"][0][1] == -0.3
+    assert data["matrix"][1][1] == 1.0
+    assert data["matrix"][2][2] is None
+
+
+def test_top_peers_splits_positive_and_negative():
+    data = top_peers(_snapshot(), "AAPL", 5)
+    assert [p["symbol"] for p in data["positive"]] == ["MSFT"]
+    assert [p["symbol"] for p in data["negative"]] == ["TSLA"]
+    assert top_peers(_snapshot(), "NOPE", 5) is None
@@ -0,0 +1,55 @@
+"""Downsampling tests: bucketed OHLCV and LTTB over chunked input."""
+import numpy as np
+
+from downsample import BucketAggregator, lttb
+
+
+def _ticks(n=10_000, seed=7):
+    rng = np.random.default_rng(seed)
+    ts = np.sort(rng.integers(0, 3_600_000, n)).astype(np.int64)
+    price = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    volume = rng.integers(1, 500, n).astype(np.int64)
+    return ts, price, volume
+
+
+def test_chunked_ohlcv_matches_single_pass():
+    ts, price, volume = _ticks()
+    whole = BucketAggregator(0, 3_600_000, 60)
+    whole.add(ts, price, volume)
+    chunked = BucketAggregator(0, 3_600_000, 60)
+    for i in range(0, len(ts), 777):
+        chunked.add(ts[i:i + 777], price[i:i + 777], volume[i:i + 777])
+    assert whole.ohlcv() == chunked.ohlcv()
+
+
+def test_ohlcv_bucket_values():
+    ts, price, volume = _ticks()
+    agg = BucketAggregator(0, 3_600_000, 60)
+    agg.add(ts, price, volume)
+    bars = agg.ohlcv()
+    first = bars[0]
+    mask = (ts >= first["ts"]) & (ts < first["ts"] + agg.width_ms)
+    assert first["open"] == price[mask][0]
+    assert first["close"] == price[mask][-1]
+    assert first["high"] == price[mask].max()
+    assert first["low"] == price[mask].min()
+    assert first["volume"] == volume[mask].sum()
+    assert sum(b["volume"] for b in bars) == volume.sum()
+
+
+def test_lttb_caps_points_and_keeps_endpoints():
+    ts, price, volume = _ticks()
+    agg = BucketAggregator(0, 3_600_000, 250)
+    agg.add(ts, price, volume)
+    cts, cprice = agg.candidates()
+    out_ts, out_price = lttb(cts, cprice, 100)
+    assert len(out_ts) == 100
+    assert out_ts[0] == cts[0] and out_ts[-1] == cts[-1]
+    assert np.all(np.diff(out_ts) > 0)
+
+
+def test_lttb_passthrough_when_small():
+    ts = np.arange(5, dtype=np.int64)
+    price = np.arange(5, dtype=np.float64)
+    out_ts, out_price = lttb(ts, price, 10)
+    assert len(out_ts) == 5
@@ -0,0 +1,14 @@
+"""Stream ID handling for resumable /ws/live sessions."""
+from live_stream import is_stream_id, parse_stream_id
+
+
+def test_stream_ids_order_by_time_then_sequence():
+    ids = ["1700000000000-1", "1700000000000-0", "999-5", "1700000000001-0"]
+    assert sorted(ids, key=parse_stream_id) == ["999-5", "1700000000000-0", "1700000000000-1", "1700000000001-0"]
+
+
+def test_is_stream_id_rejects_garbage():
+    assert is_stream_id("1700000000000-0")
+    assert not is_stream_id(None)
+    assert not is_stream_id("abc-1")
+    assert not is_stream_id(42)
@@ -0,0 +1,17 @@
+"""Fixed-point metrics decoding at the API edge."""
+from prices import decode_metrics
+
+
+def test_decode_metrics_scales_price_fields_only():
+    fields = {"price": "1871235", "ema9": "1870000", "vwap_5m": "", "vol": "0.0123", "ts": "1700000000000", "scale": "4"}
+    assert decode_metrics(fields) == {"price": 187.1235, "ema9": 187.0, "vwap_5m": "", "vol": "0.0123", "ts": "1700000000000"}
+
+
+def test_decode_metrics_passes_decimal_encoding_through():
+    fields = {"price": "187.1235", "vol": "0.5"}
+    assert decode_metrics(fields) is fields
+
+
+def test_decode_metrics_scales_listed_indicator_fields():
+    fields = {"price": "1871235", "bb20_upper": "1900000", "rsi14": "61.5", "scale": "4", "price_fields": "price,bb20_upper"}
+    assert decode_metrics(fields) == {"price": 187.1235, "bb20_upper": 190.0, "rsi14": "61.5"}
@@ -0,0 +1,37 @@
+"""Per-route timing histograms and sampled captures from ProfilingMiddleware."""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import BUCKETS_MS, ProfilingMiddleware, RouteTimings
+
+
+def test_route_timings_quantiles_are_bucket_bounds():
+    timings = RouteTimings()
+    for ms in [0.5] * 90 + [30.0] * 9 + [700.0]:
+        timings.observe("GET /x", ms)
+    snap = timings.snapshot()["GET /x"]
+    assert snap["count"] == 100
+    assert (snap["p50_ms"], snap["p95_ms"], snap["p99_ms"]) == (1, 50, 50)
+    assert snap["max_ms"] == 700.0
+    assert sum(snap["buckets_ms"].values()) == 100
+    assert len(snap["buckets_ms"]) == len(BUCKETS_MS) + 1
+
+
+def test_middleware_labels_by_route_template_and_samples_captures(tmp_path):
+    app = FastAPI()
+    timings = RouteTimings()
+    app.add_middleware(ProfilingMiddleware, timings=timings, capture="cprofile", every=2, profile_dir=str(tmp_path))
+
+    @app.get("/api/metrics/{ticker}")
+    async def metrics(ticker: str):
+        return {"ticker": ticker}
+
+    client = TestClient(app)
+    for ticker in ["AAPL", "MSFT", "TSLA", "AMZN"]:
+        assert client.get(f"/api/metrics/{ticker}").status_code == 200
+    assert client.get("/nope").status_code == 404
+
+    snap = timings.snapshot()
+    assert snap["GET /api/metrics/{ticker}"]["count"] == 4
+    assert snap["unmatched"]["count"] == 1
+    assert sorted(p.name.split("-")[1] for p in tmp_path.glob("*.prof")) == ["2", "4"]
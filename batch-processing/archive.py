@@ -0,0 +1,273 @@
+"""
+Parquet cold storage for raw_trades.
+
+Each finished UTC day is exported to
+
+    {RAW_TRADES_ARCHIVE_DIR}/date=YYYY-MM-DD/symbol=SYM/trades.parquet
+
+(hive layout, zstd, rows sorted by trade_ts then id) and recorded in
+raw_trades_archive. A day is re-exported when raw_trades receives rows for it
+after its archived_at. Readers memory-map the files and push date/symbol/
+trade_ts predicates down, so a query only opens the files and row groups it
+needs. Once a day is archived, retention may drop its raw_trades partition
+and compute_ohlcv reads it from here instead.
+"""
+import os
+import shutil
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+from psycopg2.extras import execute_values
+
+import profiling
+
+# Root of the archive; empty disables archiving and Parquet reads
+ARCHIVE_DIR = os.environ.get("RAW_TRADES_ARCHIVE_DIR", "")
+ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get("RAW_TRADES_ARCHIVE_ZSTD_LEVEL", "3"))
+ROW_GROUP_ROWS = 128_000
+# Rows per round trip of the server-side export cursor
+EXPORT_FETCH_ROWS = 100_000
+FILE_NAME = "trades.parquet"
+
+TRADE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("trade_ts", pa.int64()),
+    ("price", pa.decimal128(20, 8)),
+    ("volume", pa.int64()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("symbol", pa.string())]), flavor="hive")
+
+
+def day_dir(day: date, root=None) -> Path:
+    return Path(root or ARCHIVE_DIR) / f"date={day.isoformat()}"
+
+
+def pending_days(cur, start_date, end_date):
+    """Days in [start_date, end_date] with raw_trades that were never archived, or changed since."""
+    cur.execute(
+        """
+        SELECT d.day::date
+        FROM generate_series(%(start)s::timestamp, %(end)s::timestamp, interval '1 day') AS d(day)
+        LEFT JOIN raw_trades_archive a ON a.trade_date = d.day::date
+        WHERE EXISTS (
+            SELECT 1 FROM raw_trades r
+            WHERE r.trade_ts >= (extract(epoch FROM d.day AT TIME ZONE 'UTC') * 1000)::bigint
+              AND r.trade_ts < (extract(epoch FROM d.day AT TIME ZONE 'UTC') * 1000)::bigint + 86400000
+              AND (a.trade_date IS NULL OR r.created_at > a.archived_at)
+        )
+        ORDER BY 1
+        """,
+        {"start": start_date, "end": end_date},
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def archived_days(cur, days):
+    cur.execute("SELECT trade_date FROM raw_trades_archive WHERE trade_date = ANY(%s)", (list(days),))
+    return {r[0] for r in cur.fetchall()}
+
+
+def _table(columns) -> pa.Table:
+    return pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, TRADE_SCHEMA)], schema=TRADE_SCHEMA)
+
+
+def _write_symbol(out_dir: Path, symbol: str, table: pa.Table):
+    path = out_dir / f"symbol={symbol}"
+    path.mkdir(parents=True, exist_ok=True)
+    pq.write_table(
+        table,
+        path / FILE_NAME,
+        compression="zstd",
+        compression_level=ARCHIVE_COMPRESSION_LEVEL,
+        row_group_size=ROW_GROUP_ROWS,
+    )
+    return (path / FILE_NAME).stat().st_size
+
+
+@profiling.timed("archive.archive_day")
+def archive_day(conn, day: date, day_start_ms: int, root=None):
+    """Export one day of raw_trades to Parquet and record it. Returns (rows, symbols, bytes).
+
+    Fixed-point rows (price_fx) are exported as the same decimal128 price
+    column, so archive readers never depend on PRICE_ENCODING.
+    Rows stream through a server-side cursor in (symbol, trade_ts, id) order, so
+    only one symbol's trades are held at a time. Files are written to a temp
+    directory that replaces the day's directory once complete.
+    """
+    archived_at = datetime.now(timezone.utc)
+    final_dir = day_dir(day, root)
+    tmp_dir = _tmp_dir(final_dir)
+    tmp_dir.mkdir(parents=True)
+
+    rows = n_symbols = size = 0
+    current = None
+    columns = [[], [], [], []]
+    with conn.cursor(name=f"archive_{day:%Y%m%d}") as cur:
+        cur.itersize = EXPORT_FETCH_ROWS
+        cur.execute(
+            """
+            SELECT r.symbol, r.id, r.trade_ts, COALESCE(r.price, (r.price_fx / 10::numeric ^ s.scale)::numeric(20, 8)), r.volume
+            FROM raw_trades r
+            LEFT JOIN symbol_scales s ON s.symbol = r.symbol
+            WHERE r.trade_ts >= %s AND r.trade_ts < %s
+            ORDER BY r.symbol, r.trade_ts, r.id
+            """,
+            (day_start_ms, day_start_ms + 86_400_000),
+        )
+        for symbol, *values in cur:
+            if symbol != current:
+                if current is not None:
+                    size += _write_symbol(tmp_dir, current, _table(columns))
+                    n_symbols += 1
+                current, columns = symbol, [[], [], [], []]
+            for col, v in zip(columns, values):
+                col.append(v)
+            rows += 1
+    if current is not None:
+        size += _write_symbol(tmp_dir, current, _table(columns))
+        n_symbols += 1
+
+    _swap_in(tmp_dir, final_dir)
+    _record(conn, day, archived_at, rows, n_symbols, size, final_dir)
+    return rows, n_symbols, size
+
+
+def _tmp_dir(final_dir: Path) -> Path:
+    # Dot-prefixed siblings are skipped by dataset discovery while the swap is in progress
+    tmp_dir = final_dir.with_name(f".{final_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return tmp_dir
+
+
+def _swap_in(tmp_dir: Path, final_dir: Path):
+    old_dir = final_dir.with_name(f".{final_dir.name}.old")
+    if final_dir.exists():
+        final_dir.rename(old_dir)
+    tmp_dir.rename(final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _record(conn, day, archived_at, rows, n_symbols, size, final_dir):
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO raw_trades_archive (trade_date, archived_at, rows_archived, symbols, bytes, path)
+            VALUES %s
+            ON CONFLICT (trade_date) DO UPDATE SET
+              archived_at = EXCLUDED.archived_at, rows_archived = EXCLUDED.rows_archived,
+              symbols = EXCLUDED.symbols, bytes = EXCLUDED.bytes, path = EXCLUDED.path
+            """,
+            [(day, archived_at, rows, n_symbols, size, str(final_dir))],
+        )
+
+
+@profiling.timed("archive.archive_stragglers")
+def archive_stragglers(conn, before_ms: int, root=None):
+    """Move raw_trades_default rows older than before_ms into their days' archives. Returns {day: rows}.
+
+    These trades arrived after their day's partition was dropped (or before
+    it existed), so archive_day, which re-exports a whole day from
+    raw_trades, would lose what is already archived. Instead the rows are
+    deleted and merged into the existing symbol files, deduplicated on id,
+    and the day directory is swapped in as in archive_day. If the caller's
+    transaction rolls back, the rows stay in PostgreSQL and the next run
+    merges them again without duplicating any.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH expired AS (
+                DELETE FROM raw_trades_default WHERE trade_ts < %s
+                RETURNING symbol, id, trade_ts, price, price_fx, volume
+            )
+            SELECT e.symbol, e.id, e.trade_ts, COALESCE(e.price, (e.price_fx / 10::numeric ^ s.scale)::numeric(20, 8)), e.volume
+            FROM expired e
+            LEFT JOIN symbol_scales s ON s.symbol = e.symbol
+            ORDER BY e.trade_ts, e.id
+            """,
+            (before_ms,),
+        )
+        rows = cur.fetchall()
+
+    by_day = {}
+    for symbol, *values in rows:
+        day = datetime.fromtimestamp(values[1] / 1000, tz=timezone.utc).date()
+        columns = by_day.setdefault(day, {}).setdefault(symbol, [[], [], [], []])
+        for col, v in zip(columns, values):
+            col.append(v)
+
+    merged = {}
+    for day, symbols in by_day.items():
+        archived_at = datetime.now(timezone.utc)
+        final_dir = day_dir(day, root)
+        tmp_dir = _tmp_dir(final_dir)
+        if final_dir.exists():
+            shutil.copytree(final_dir, tmp_dir)
+        for symbol, columns in symbols.items():
+            table = _table(columns)
+            path = tmp_dir / f"symbol={symbol}" / FILE_NAME
+            if path.exists():
+                table = pa.concat_tables([pq.ParquetFile(path).read(), table])
+                _, first = np.unique(table.column("id").to_numpy(), return_index=True)
+                table = table.take(first).sort_by([("trade_ts", "ascending"), ("id", "ascending")])
+            _write_symbol(tmp_dir, symbol, table)
+        files = list(tmp_dir.glob(f"symbol=*/{FILE_NAME}"))
+        day_rows = sum(pq.read_metadata(f).num_rows for f in files)
+        size = sum(f.stat().st_size for f in files)
+        _swap_in(tmp_dir, final_dir)
+        _record(conn, day, archived_at, day_rows, len(files), size, final_dir)
+        merged[day] = sum(len(c[0]) for c in symbols.values())
+    return merged
+
+
+def dataset(root=None):
+    """The whole archive as a hive-partitioned, memory-mapped Parquet dataset."""
+    return ds.dataset(
+        str(root or ARCHIVE_DIR),
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=True,
+    )
+
+
+@profiling.timed("archive.compute_ohlcv")
+def compute_ohlcv(days, symbols=None, root=None):
+    """OHLCV per (symbol, day) from the archive; same shape as batch_job.compute_ohlcv.
+
+    Each file holds one symbol-day sorted by (trade_ts, id), so open/close are
+    its first/last rows and the rest are column reductions; only the price and
+    volume columns are read.
+    """
+    expr = ds.field("date").isin([d.isoformat() for d in days])
+    if symbols is not None:
+        expr = expr & ds.field("symbol").isin(list(symbols))
+    ohlcv_rows = []
+    trades_by_day = {}
+    for fragment in dataset(root).get_fragments(filter=expr):
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        table = fragment.to_table(columns=["price", "volume"])
+        if table.num_rows == 0:
+            continue
+        day = date.fromisoformat(keys["date"])
+        price = table.column("price")
+        lo_hi = pc.min_max(price)
+        ohlcv_rows.append((
+            keys["symbol"],
+            day,
+            price[0].as_py(),
+            lo_hi["max"].as_py(),
+            lo_hi["min"].as_py(),
+            price[-1].as_py(),
+            pc.sum(table.column("volume")).as_py(),
+        ))
+        trades_by_day[day] = trades_by_day.get(day, 0) + table.num_rows
+    ohlcv_rows.sort(key=lambda r: (r[0], r[1]))
+    return ohlcv_rows, trades_by_day
@@ -1,132 +1,384 @@
 """
 Nightly batch job: read raw_trades for previous day, compute OHLCV,
-daily returns, top_movers and most_volatile reports. Write to PostgreSQL.
+rolling multi-day analytics (rolling_metrics), top_movers and most_volatile
+reports. Write to PostgreSQL.
+
+Days are UTC. --date / --start/--end select the days to (re)process in one
+pass; --incremental narrows them to days whose raw_trades changed since their
+last successful run (batch_watermarks), so missed nights and backfills
+collapse into a single bulk aggregation and upsert.
+
+Parallel mode (--workers N or BATCH_WORKERS=N) hash-partitions symbols into
+N shards; each shard runs extract/OHLCV in its own process and connection,
+and the driver merges shard results, upserts them in its single transaction
+and builds the cross-symbol reports.
+
+Every run first maintains the daily raw_trades partitions: it creates
+RAW_TRADES_PARTITIONS_AHEAD days ahead, exports finished days to Parquet when
+RAW_TRADES_ARCHIVE_DIR is set (see archive.py), and detaches + drops
+partitions older than RAW_TRADES_RETENTION_DAYS (default 0 keeps everything;
+with an archive, only days already exported are dropped, and expired rows in
+raw_trades_default are merged into it first; without one they are left in
+raw_trades_default, never deleted). Days whose partition is gone
+are aggregated from the archive; --source parquet prefers it for every
+archived day.
+
+PRICE_ENCODING=fixed aggregates and writes the int64 *_fx price columns
+(price * 10^scale, per-symbol scale in symbol_scales) instead of NUMERIC, so
+the OHLCV query compares integers and no Decimal crosses the wire.
+
+PROFILE_TIMERS=1 / PROFILE_CAPTURE=cprofile|pyinstrument time (and sample
+profiler dumps of) each stage below; see profiling.py. The per-stage summary
+is printed when the run ends.
 """
+import argparse
+import bisect
 import os
+import re
 import sys
-from datetime import datetime, timedelta
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from multiprocessing import get_context
 
+import numpy as np
 import psycopg2
 from psycopg2.extras import execute_values
 
+import archive
+import profiling
+import rolling
+
 PG_HOST = os.environ.get("PG_HOST", "localhost")
 PG_PORT = int(os.environ.get("PG_PORT", "5432"))
 PG_DB = os.environ.get("PG_DATABASE", "stock_analytics")
 PG_USER = os.environ.get("PG_USER", "stock")
 PG_PASSWORD = os.environ.get("PG_PASSWORD", "stock")
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "1"))
+# --incremental without --start looks back this many days for changed data
+INCREMENTAL_LOOKBACK_DAYS = int(os.environ.get("INCREMENTAL_LOOKBACK_DAYS", "30"))
+EPOCH_DATE = date(1970, 1, 1)
+# Trading-day windows materialized into rolling_metrics
+ROLLING_WINDOWS = [int(w) for w in os.environ.get("ROLLING_WINDOWS", "5,20,60").split(",") if w.strip()]
+# Window whose realized volatility ranks the most_volatile report
+REPORT_VOLATILITY_WINDOW = int(os.environ.get("REPORT_VOLATILITY_WINDOW", "20"))
+# Daily raw_trades partitions created ahead of today, and days of raw trades kept (0 = forever)
+RAW_TRADES_PARTITIONS_AHEAD = int(os.environ.get("RAW_TRADES_PARTITIONS_AHEAD", "7"))
+RAW_TRADES_RETENTION_DAYS = int(os.environ.get("RAW_TRADES_RETENTION_DAYS", "0"))
+RAW_TRADES_PARTITION_RE = re.compile(r"^raw_trades_p(\d{8})$")
+# "decimal" (NUMERIC columns) or "fixed" (int64 *_fx columns at the symbol's scale)
+PRICE_ENCODING = os.environ.get("PRICE_ENCODING", "decimal")
+PRICE_SCALE_DEFAULT = int(os.environ.get("PRICE_SCALE_DEFAULT", "4"))
+PRICE_SCALES = {
+    symbol.strip(): int(scale)
+    for symbol, _, scale in (item.partition(":") for item in os.environ.get("PRICE_SCALES", "").split(","))
+    if symbol.strip() and scale
+}
 
 
-def run():
-    conn = psycopg2.connect(
+def _connect():
+    return psycopg2.connect(
         host=PG_HOST,
         port=PG_PORT,
         dbname=PG_DB,
         user=PG_USER,
         password=PG_PASSWORD,
     )
+
+
+def run(start_date=None, end_date=None, incremental=False, workers: int = BATCH_WORKERS, source: str = "auto"):
+    """Process trade days in [start_date, end_date] (UTC, inclusive) in one pass.
+
+    Defaults to yesterday (UTC). With incremental=True only days that have no
+    watermark yet, or whose raw_trades received rows after their watermark,
+    are recomputed. Reports are regenerated only when the latest session in
+    ohlcv_daily is among them.
+    source picks where trades are read: "auto" (Parquet archive only for days
+    whose partition was dropped), "parquet" (every archived day) or "postgres".
+    """
+    conn = _connect()
     conn.autocommit = False
     cur = conn.cursor()
 
-    # Previous trading day (use yesterday for simplicity)
-    target_date = (datetime.utcnow() - timedelta(days=1)).date()
-    started_at = datetime.utcnow()
+    started_at = datetime.now(timezone.utc)
+    end_date = end_date or (started_at - timedelta(days=1)).date()
+    if start_date is None:
+        start_date = end_date - timedelta(days=INCREMENTAL_LOOKBACK_DAYS) if incremental else end_date
+    if start_date > end_date:
+        raise ValueError(f"start date {start_date} is after end date {end_date}")
 
+    # 0. Partition upkeep in its own transaction; a failure here must not block the OHLCV run
     try:
-        # 1. Extract raw_trades for target_date (trade_ts in that day)
-        ts_start = int(datetime.combine(target_date, datetime.min.time()).timestamp() * 1000)
-        ts_end = int(datetime.combine(target_date, datetime.max.time()).timestamp() * 1000) + 86400_000
+        maintain_partitions(cur, started_at.date())
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        _log_job(cur, "raw_trades_partitions", started_at, "failed", 0, str(e))
+        conn.commit()
 
-        cur.execute(
-            """
-            SELECT symbol, price, volume, trade_ts
-            FROM raw_trades
-            WHERE trade_ts >= %s AND trade_ts < %s
-            ORDER BY symbol, trade_ts
-            """,
-            (ts_start, ts_end),
-        )
-        rows = cur.fetchall()
+    # 1-2. Aggregate raw_trades for the selected days into OHLCV per (symbol, date) (in PostgreSQL)
+    try:
+        days = dirty_days(cur, start_date, end_date) if incremental else _date_range(start_date, end_date)
+        if not days:
+            _log_job(cur, "batch_job", started_at, "success", 0, f"No changed days in {start_date}..{end_date}")
+            conn.commit()
+            return
+        parquet_days = _parquet_days(cur, days, source)
+        pg_days = [d for d in days if d not in parquet_days]
+        ohlcv_rows, trades_by_day = [], {}
+        if pg_days and workers > 1:
+            ohlcv_rows, trades_by_day = _compute_ohlcv_sharded(cur, pg_days, workers)
+        elif pg_days:
+            ohlcv_rows, trades_by_day = compute_ohlcv(cur, pg_days)
+        archived_rows = []
+        if parquet_days:
+            archived_rows, archived_trades = archive.compute_ohlcv(sorted(parquet_days))
+            if PRICE_ENCODING == "fixed":
+                archived_rows = encode_ohlcv_rows(cur, archived_rows)
+            ohlcv_rows.extend(archived_rows)
+            trades_by_day.update(archived_trades)
     except Exception as e:
+        conn.rollback()
         _log_job(cur, "extract_raw_trades", started_at, "failed", 0, str(e))
         conn.commit()
         raise
 
-    if not rows:
-        _log_job(cur, "extract_raw_trades", started_at, "success", 0, "No data")
+    trades_processed = sum(trades_by_day.values())
+    summary = f"{len(days)} day(s) {days[0]}..{days[-1]}"
+    if not ohlcv_rows:
+        _write_watermarks(cur, days, trades_by_day, started_at)
+        _log_job(cur, "extract_raw_trades", started_at, "success", 0, f"No data for {summary}")
         conn.commit()
         return
 
-    # 2. Compute OHLCV per (symbol, date)
-    from collections import defaultdict
-    agg = defaultdict(lambda: {"prices": [], "volumes": [], "ts": []})
-    for symbol, price, volume, trade_ts in rows:
-        key = (symbol, target_date)
-        agg[key]["prices"].append(float(price))
-        agg[key]["volumes"].append(int(volume))
-        agg[key]["ts"].append(trade_ts)
+    # 3. Write ohlcv_daily (all shards and archived days) in one bulk upsert, in the run's transaction
+    upsert_ohlcv(cur, ohlcv_rows)
 
-    ohlcv_rows = []
-    for (symbol, date), v in agg.items():
-        prices = v["prices"]
-        volumes = v["volumes"]
-        if not prices:
-            continue
-        open_p = prices[0]
-        close_p = prices[-1]
-        high_p = max(prices)
-        low_p = min(prices)
-        vol_sum = sum(volumes)
-        ohlcv_rows.append((symbol, date, open_p, high_p, low_p, close_p, vol_sum))
-
-    # 3. Write ohlcv_daily (upsert)
+    # 4. Rolling multi-day analytics, then top_movers / most_volatile.
+    # A recomputed day is inside the windows of the next max(ROLLING_WINDOWS) sessions,
+    # so only those as_of dates are refreshed, not every day through the newest one.
+    # Reports always describe the latest session; a backfill of older days leaves them alone.
+    rolling_days = rolling_sessions(cur, days, max(ROLLING_WINDOWS))
+    latest = latest_session(cur)
+    rolling_result = materialize_rolling(cur, rolling_days, report_day=latest if latest in days else None)
+    movers = generate_reports(cur, latest, rolling_result) if rolling_result else []
+
+    _write_watermarks(cur, days, trades_by_day, started_at)
+    _log_job(cur, "batch_job", started_at, "success", trades_processed, summary)
+    conn.commit()
+    cur.close()
+    conn.close()
+    print("Batch job completed.", summary, len(ohlcv_rows), "OHLCV rows,", len(movers), "movers.")
+
+
+def _date_range(start_date, end_date):
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def _day_start_ms(day):
+    """Epoch ms of 00:00 UTC on `day` (raw_trades.trade_ts is epoch ms)."""
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+@profiling.timed("batch.maintain_partitions")
+def maintain_partitions(cur, today, ahead=None, retention_days=None):
+    """Create raw_trades partitions through today + ahead, archive finished days, and drop expired ones.
+
+    Dropping a whole day partition replaces DELETE: no dead tuples, no vacuum,
+    and the other partitions' indexes are untouched. With an archive
+    configured, a partition is only dropped once its day has been exported.
+    Returns (created, dropped).
+    """
+    ahead = RAW_TRADES_PARTITIONS_AHEAD if ahead is None else ahead
+    retention_days = RAW_TRADES_RETENTION_DAYS if retention_days is None else retention_days
+    started_at = datetime.now(timezone.utc)
+    cur.execute("SELECT create_raw_trades_partitions(%s, %s)", (today, ahead + 1))
+    created = cur.fetchone()[0]
+
+    partitions = {}
+    for name in list_partitions(cur):
+        m = RAW_TRADES_PARTITION_RE.match(name)
+        if m:
+            partitions[datetime.strptime(m.group(1), "%Y%m%d").date()] = name
+
+    archived = []
+    if archive.ARCHIVE_DIR and partitions:
+        for day in archive.pending_days(cur, min(partitions), today - timedelta(days=1)):
+            rows, symbols, size = archive.archive_day(cur.connection, day, _day_start_ms(day))
+            archived.append(day)
+            _log_job(cur, "raw_trades_archive", started_at, "success", rows, f"{day}: {symbols} symbols, {size / 2**20:.1f} MB")
+
+    dropped = []
+    if retention_days > 0:
+        cutoff = today - timedelta(days=retention_days)
+        expired = [d for d in sorted(partitions) if d < cutoff]
+        if archive.ARCHIVE_DIR:
+            keep = set(expired) - archive.archived_days(cur, expired)
+            expired = [d for d in expired if d not in keep or _partition_empty(cur, partitions[d])]
+        for day in expired:
+            name = partitions[day]
+            cur.execute(f'ALTER TABLE raw_trades DETACH PARTITION "{name}"')
+            cur.execute(f'DROP TABLE "{name}"')
+            dropped.append(name)
+        # Stragglers that landed in the default partition before their day existed (or after it was
+        # dropped) are merged into the archive; without one they stay in raw_trades_default
+        if archive.ARCHIVE_DIR:
+            stragglers = archive.archive_stragglers(cur.connection, _day_start_ms(cutoff))
+            for day, rows in sorted(stragglers.items()):
+                _log_job(cur, "raw_trades_archive", started_at, "success", rows, f"{day}: merged {rows} straggler(s)")
+
+    if created or archived or dropped:
+        _log_job(
+            cur,
+            "raw_trades_partitions",
+            started_at,
+            "success",
+            len(dropped),
+            f"created {created} partition(s); archived {len(archived)} day(s); dropped {', '.join(dropped) or 'none'}",
+        )
+    return created, dropped
+
+
+def _partition_empty(cur, name):
+    cur.execute(f'SELECT NOT EXISTS (SELECT 1 FROM "{name}")')
+    return cur.fetchone()[0]
+
+
+def list_partitions(cur):
+    """Names of raw_trades' attached partitions, oldest first."""
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'raw_trades'::regclass
+        ORDER BY c.relname
+        """
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def _parquet_days(cur, days, source):
+    """Days to aggregate from the Parquet archive instead of raw_trades."""
+    if source == "postgres" or not archive.ARCHIVE_DIR:
+        return set()
+    archived = archive.archived_days(cur, days)
+    if source == "parquet":
+        return archived
+    partitions = set(list_partitions(cur))
+    return {d for d in archived if f"raw_trades_p{d:%Y%m%d}" not in partitions}
+
+
+@profiling.timed("batch.dirty_days")
+def dirty_days(cur, start_date, end_date):
+    """Days in [start_date, end_date] with no watermark, or with raw_trades inserted after it."""
+    cur.execute(
+        """
+        SELECT d.day::date
+        FROM generate_series(%(start)s::timestamp, %(end)s::timestamp, interval '1 day') AS d(day)
+        LEFT JOIN batch_watermarks w ON w.trade_date = d.day::date
+        WHERE w.trade_date IS NULL
+           OR EXISTS (
+                SELECT 1 FROM raw_trades r
+                WHERE r.created_at > w.processed_at
+                  AND r.trade_ts >= (extract(epoch FROM d.day AT TIME ZONE 'UTC') * 1000)::bigint
+                  AND r.trade_ts < (extract(epoch FROM d.day AT TIME ZONE 'UTC') * 1000)::bigint + 86400000
+           )
+        ORDER BY 1
+        """,
+        {"start": start_date, "end": end_date},
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+@profiling.timed("batch.write_watermarks")
+def _write_watermarks(cur, days, trades_by_day, processed_at):
+    """Record that `days` reflect raw_trades as of processed_at (the run's start, so concurrent inserts are re-checked)."""
     execute_values(
         cur,
         """
-        INSERT INTO ohlcv_daily (symbol, date, open, high, low, close, volume)
+        INSERT INTO batch_watermarks (trade_date, processed_at, rows_processed)
         VALUES %s
-        ON CONFLICT (symbol, date) DO UPDATE SET
-          open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
-          close = EXCLUDED.close, volume = EXCLUDED.volume
+        ON CONFLICT (trade_date) DO UPDATE SET
+          processed_at = EXCLUDED.processed_at, rows_processed = EXCLUDED.rows_processed
         """,
-        ohlcv_rows,
+        [(d, processed_at, trades_by_day.get(d, 0)) for d in days],
     )
 
-    # 4. Compute daily returns and top_movers / most_volatile
-    prev_date = target_date - timedelta(days=1)
+
+@profiling.timed("batch.materialize_rolling")
+def materialize_rolling(cur, days, report_day=None):
+    """Compute rolling windows for every symbol as of each of `days` and upsert rolling_metrics.
+
+    ohlcv_daily is read once for the whole range and sliced per day.
+    Returns the (symbols, last_dates, matrices, metrics) of report_day, or None if it was not computed.
+    """
+    lookback = max(ROLLING_WINDOWS) + 1
+    history = rolling.load_ohlcv_history(cur, min(days), max(days), lookback)
+    result = None
+    for as_of in days:
+        symbols, last_dates, mats = rolling.window(history, as_of, lookback)
+        if not symbols:
+            continue
+        metrics = rolling.compute_rolling(mats, ROLLING_WINDOWS)
+        rolling.write_rolling(cur, as_of, symbols, last_dates, mats, metrics)
+        if as_of == report_day:
+            result = symbols, last_dates, mats, metrics
+    return result
+
+
+@profiling.timed("batch.rolling_sessions")
+def rolling_sessions(cur, days, horizon):
+    """Sessions whose rolling windows include one of `days`, oldest first.
+
+    For each of `days` that is a session (a date in ohlcv_daily) that is the
+    day itself and the next `horizon` sessions; overlapping ranges are merged.
+    The calendar is walked one idx_ohlcv_daily_date probe per session, from
+    the first day until `horizon` sessions past the last one.
+    """
     cur.execute(
         """
-        SELECT symbol, date, open, high, low, close, volume
-        FROM ohlcv_daily
-        WHERE date IN (%s, %s)
-        ORDER BY symbol, date
+        WITH RECURSIVE cal(day, after) AS (
+            SELECT min(date), 0 FROM ohlcv_daily WHERE date >= %(first)s
+            UNION ALL
+            SELECT nxt.day, cal.after + (nxt.day > %(last)s)::int
+            FROM cal, LATERAL (SELECT min(o.date) AS day FROM ohlcv_daily o WHERE o.date > cal.day) nxt
+            WHERE cal.after < %(horizon)s AND nxt.day IS NOT NULL
+        )
+        SELECT day FROM cal WHERE day IS NOT NULL ORDER BY day
         """,
-        (target_date, prev_date),
+        {"first": min(days), "last": max(days), "horizon": horizon},
     )
-    ohlcv = cur.fetchall()
-    prev_close = {}
-    for symbol, date, o, h, l, c, vol in ohlcv:
-        if date == prev_date:
-            prev_close[symbol] = c
-    current = {}
-    volatility_sum = {}
-    volatility_count = {}
-    for symbol, date, o, h, l, c, vol in ohlcv:
-        if date == target_date:
-            current[symbol] = {"close": c, "high": h, "low": l, "vol": vol}
-            daily_vol = (h - l) / o if o else 0
-            volatility_sum[symbol] = volatility_sum.get(symbol, 0) + daily_vol
-            volatility_count[symbol] = volatility_count.get(symbol, 0) + 1
-
-    generated_at = datetime.utcnow()
+    calendar = [r[0] for r in cur.fetchall()]
+    sessions = set()
+    for day in days:
+        i = bisect.bisect_left(calendar, day)
+        if i < len(calendar) and calendar[i] == day:
+            sessions.update(calendar[i : i + horizon + 1])
+    return sorted(sessions)
+
+
+def latest_session(cur):
+    """Most recent date in ohlcv_daily (idx_ohlcv_daily_date), or None."""
+    cur.execute("SELECT max(date) FROM ohlcv_daily")
+    return cur.fetchone()[0]
+
+
+@profiling.timed("batch.generate_reports")
+def generate_reports(cur, target_date, rolling_result):
+    """Rank symbols that traded on target_date vs their previous trading day; write top_movers and most_volatile."""
+    symbols, last_dates, mats, metrics = rolling_result
+    change = rolling.daily_change_pct(mats)
+    volatility = metrics.get(REPORT_VOLATILITY_WINDOW, metrics[min(metrics)])["realized_vol"]
+
+    generated_at = datetime.now(timezone.utc)
     movers = []
-    for symbol, data in current.items():
-        prev = prev_close.get(symbol)
-        if prev and prev != 0:
-            pct = (data["close"] - prev) / prev * 100
-        else:
-            pct = 0.0
-        avg_vol = volatility_sum.get(symbol, 0) / max(volatility_count.get(symbol, 1), 1)
-        movers.append((symbol, pct, data["close"], data["vol"], avg_vol))
+    for i, symbol in enumerate(symbols):
+        if last_dates[i] != target_date:
+            continue
+        pct = float(change[i]) if np.isfinite(change[i]) else 0.0
+        movers.append((symbol, pct, float(mats["close"][i, -1]), int(mats["volume"][i, -1]), volatility[i]))
 
     movers.sort(key=lambda x: x[1], reverse=True)
     gainers = [(generated_at, m[0], m[1], i + 1, None, m[3], m[2]) for i, m in enumerate(movers[:5])]
@@ -150,8 +402,8 @@ def run():
             template="(%s, %s, %s, %s, %s, %s, %s)",
         )
 
-    # most_volatile: top 5 by avg daily volatility
-    vol_list = [(s, volatility_sum.get(s, 0) / max(volatility_count.get(s, 1), 1), v["vol"]) for s, v in current.items()]
+    # most_volatile: top 5 by annualized realized volatility over REPORT_VOLATILITY_WINDOW sessions
+    vol_list = [(m[0], float(m[4]), m[3]) for m in movers if np.isfinite(m[4])]
     vol_list.sort(key=lambda x: x[1], reverse=True)
     volatile_rows = [(generated_at, x[0], x[1], i + 1, x[2]) for i, x in enumerate(vol_list[:5])]
     cur.execute("DELETE FROM most_volatile WHERE generated_at >= %s - interval '1 day'", (generated_at,))
@@ -160,22 +412,252 @@ def run():
         """INSERT INTO most_volatile (generated_at, symbol, avg_volatility, rank, volume) VALUES %s""",
         volatile_rows,
     )
+    return movers
 
-    _log_job(cur, "batch_job", started_at, "success", len(rows), None)
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("Batch job completed.", len(ohlcv_rows), "OHLCV rows,", len(movers), "movers.")
+
+def list_symbols(cur):
+    """Distinct symbols in raw_trades via a loose index scan on idx_raw_trades_symbol_ts."""
+    cur.execute(
+        """
+        WITH RECURSIVE s(symbol) AS (
+            (SELECT symbol FROM raw_trades ORDER BY symbol LIMIT 1)
+            UNION ALL
+            SELECT (SELECT r.symbol FROM raw_trades r WHERE r.symbol > s.symbol ORDER BY r.symbol LIMIT 1)
+            FROM s WHERE s.symbol IS NOT NULL
+        )
+        SELECT symbol FROM s WHERE symbol IS NOT NULL
+        """
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def shard_symbols(symbols, n_shards):
+    """Stable hash partition of symbols into n_shards lists (crc32, independent of PYTHONHASHSEED)."""
+    shards = [[] for _ in range(n_shards)]
+    for symbol in symbols:
+        shards[zlib.crc32(symbol.encode()) % n_shards].append(symbol)
+    return shards
+
+
+@profiling.timed("batch.run_shard")
+def _run_shard(shard_id, symbols, days):
+    """Worker: extract + OHLCV for one shard on its own connection.
+
+    The rows go back to the driver, which upserts them in its own transaction
+    together with the watermarks, so a failed shard or driver leaves
+    ohlcv_daily untouched.
+    """
+    started_at = datetime.now(timezone.utc)
+    conn = _connect()
+    try:
+        with conn, conn.cursor() as cur:
+            ohlcv_rows, trades_by_day = compute_ohlcv(cur, days, symbols)
+    finally:
+        conn.close()
+    return {
+        "shard": shard_id,
+        "symbols": len(symbols),
+        "ohlcv_rows": ohlcv_rows,
+        "trades_by_day": trades_by_day,
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc),
+    }
+
+
+@profiling.timed("batch.compute_ohlcv_sharded")
+def _compute_ohlcv_sharded(cur, days, workers):
+    """Fan shards out to a process pool, log per-shard timings, and merge their OHLCV rows."""
+    shards = [s for s in shard_symbols(list_symbols(cur), workers) if s]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        futures = [
+            pool.submit(_run_shard, i, symbols, days)
+            for i, symbols in enumerate(shards)
+        ]
+        for f in futures:
+            results.append(f.result())
+
+    ohlcv_rows = []
+    trades_by_day = {}
+    for r in results:
+        ohlcv_rows.extend(r["ohlcv_rows"])
+        for day, n in r["trades_by_day"].items():
+            trades_by_day[day] = trades_by_day.get(day, 0) + n
+        elapsed = (r["finished_at"] - r["started_at"]).total_seconds()
+        _log_job(
+            cur,
+            "batch_job.shard",
+            r["started_at"],
+            "success",
+            sum(r["trades_by_day"].values()),
+            f"shard {r['shard'] + 1}/{len(shards)}: {r['symbols']} symbols, {len(r['ohlcv_rows'])} OHLCV rows, {elapsed:.2f}s",
+            finished_at=r["finished_at"],
+        )
+    return ohlcv_rows, trades_by_day
+
+
+@profiling.timed("batch.compute_ohlcv")
+def compute_ohlcv(cur, days, symbols=None):
+    """OHLCV per (symbol, UTC day) for the given days, aggregated server-side in one query.
+
+    Only one row per symbol and day crosses the wire, so client memory is
+    independent of trade volume. Open/close are the earliest/latest trade
+    (ties broken by id), looked up through idx_raw_trades_symbol_ts.
+    `symbols` restricts to one shard. Prices are Decimals, or ints at the
+    symbol's scale with PRICE_ENCODING=fixed. Days written before a switch of
+    PRICE_ENCODING hold the other encoding; both are aggregated and the
+    minority converted at the symbol's scale (see _merge_encodings).
+    Returns (ohlcv_rows, trades_by_day).
+    """
+    days = sorted(days)
+    symbol_filter = "AND symbol = ANY(%(symbols)s)" if symbols is not None else ""
+    cur.execute(
+        f"""
+        WITH day AS (
+            SELECT symbol, trade_ts / 86400000 AS day_idx,
+                   max(price) AS high, min(price) AS low, max(price_fx) AS high_fx, min(price_fx) AS low_fx,
+                   sum(volume) AS volume, min(trade_ts) AS first_ts, max(trade_ts) AS last_ts, count(*) AS trades
+            FROM raw_trades
+            WHERE trade_ts >= %(ts_start)s AND trade_ts < %(ts_end)s
+              AND trade_ts / 86400000 = ANY(%(day_idx)s) {symbol_filter}
+            GROUP BY symbol, trade_ts / 86400000
+        )
+        SELECT d.symbol, d.day_idx, o.price, d.high, d.low, c.price,
+               o.price_fx, d.high_fx, d.low_fx, c.price_fx, d.volume, d.trades
+        FROM day d
+        CROSS JOIN LATERAL (
+            SELECT price, price_fx FROM raw_trades r
+            WHERE r.symbol = d.symbol AND r.trade_ts = d.first_ts
+            ORDER BY r.id LIMIT 1
+        ) o
+        CROSS JOIN LATERAL (
+            SELECT price, price_fx FROM raw_trades r
+            WHERE r.symbol = d.symbol AND r.trade_ts = d.last_ts
+            ORDER BY r.id DESC LIMIT 1
+        ) c
+        ORDER BY d.symbol, d.day_idx
+        """,
+        {
+            "ts_start": _day_start_ms(days[0]),
+            "ts_end": _day_start_ms(days[-1]) + 86_400_000,
+            "day_idx": [_day_start_ms(d) // 86_400_000 for d in days],
+            "symbols": symbols,
+        },
+    )
+    rows = cur.fetchall()
+    fixed = PRICE_ENCODING == "fixed"
+    # Symbols with any trade in the encoding this run does not write
+    other = slice(2, 6) if fixed else slice(6, 10)
+    mixed = {r[0] for r in rows if any(p is not None for p in r[other])}
+    scales = symbol_scales(cur, mixed) if mixed else {}
+
+    ohlcv_rows = []
+    trades_by_day = {}
+    for symbol, day_idx, *prices, vol_sum, trades in rows:
+        day = EPOCH_DATE + timedelta(days=int(day_idx))
+        ohlcv_rows.append((symbol, day, *_merge_encodings(prices, scales.get(symbol), fixed), int(vol_sum)))
+        trades_by_day[day] = trades_by_day.get(day, 0) + trades
+    return ohlcv_rows, trades_by_day
+
+
+def _merge_encodings(prices, scale, fixed):
+    """(open, high, low, close) in the run's encoding from the decimal and fixed-point aggregates of one day.
+
+    `prices` is the decimal open/high/low/close followed by the *_fx ones;
+    each side is None where the day had no trade in that encoding. Encoding
+    rounds half away from zero and is monotonic, so high/low of the
+    converted values equal the converted high/low.
+    """
+    dec, fx = prices[:4], prices[4:]
+    if fixed:
+        ours, theirs = fx, [None if p is None else int(p.scaleb(scale).to_integral_value(ROUND_HALF_UP)) for p in dec]
+    else:
+        ours, theirs = dec, [None if p is None else Decimal(p).scaleb(-scale) for p in fx]
+    if scale is None:
+        return tuple(ours)
+    open_p, high_p, low_p, close_p = ours
+    # Open/close come from the earliest/latest trade, which holds exactly one encoding
+    return (
+        theirs[0] if open_p is None else open_p,
+        max((p for p in (high_p, theirs[1]) if p is not None), default=None),
+        min((p for p in (low_p, theirs[2]) if p is not None), default=None),
+        theirs[3] if close_p is None else close_p,
+    )
+
+
+def symbol_scales(cur, symbols):
+    """Registered fixed-point scale per symbol; unseen symbols are registered at their PRICE_SCALES / default scale."""
+    symbols = sorted(set(symbols))
+    execute_values(
+        cur,
+        "INSERT INTO symbol_scales (symbol, scale) VALUES %s ON CONFLICT (symbol) DO NOTHING",
+        [(s, PRICE_SCALES.get(s, PRICE_SCALE_DEFAULT)) for s in symbols],
+    )
+    cur.execute("SELECT symbol, scale FROM symbol_scales WHERE symbol = ANY(%s)", (symbols,))
+    return dict(cur.fetchall())
+
+
+def encode_ohlcv_rows(cur, ohlcv_rows):
+    """Decimal OHLCV rows (from the Parquet archive) as ints at each symbol's scale, rounding half away from zero."""
+    if not ohlcv_rows:
+        return ohlcv_rows
+    scales = symbol_scales(cur, (r[0] for r in ohlcv_rows))
+    return [
+        (symbol, day, *(int(p.scaleb(scales[symbol]).to_integral_value(ROUND_HALF_UP)) for p in prices), volume)
+        for symbol, day, *prices, volume in ohlcv_rows
+    ]
 
 
-def _log_job(cur, job_name, started_at, status, rows_processed, message):
+@profiling.timed("batch.upsert_ohlcv")
+def upsert_ohlcv(cur, ohlcv_rows):
+    decimal_cols, fixed_cols = ("open", "high", "low", "close"), ("open_fx", "high_fx", "low_fx", "close_fx")
+    cols, other = (fixed_cols, decimal_cols) if PRICE_ENCODING == "fixed" else (decimal_cols, fixed_cols)
+    # A day written before a PRICE_ENCODING switch loses its old encoding (one per row, see init-db.sql)
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO ohlcv_daily (symbol, date, {", ".join(cols)}, volume)
+        VALUES %s
+        ON CONFLICT (symbol, date) DO UPDATE SET
+          {", ".join(f"{c} = EXCLUDED.{c}" for c in cols)}, {", ".join(f"{c} = NULL" for c in other)},
+          volume = EXCLUDED.volume
+        """,
+        ohlcv_rows,
+        page_size=5000,
+    )
+
+
+def _log_job(cur, job_name, started_at, status, rows_processed, message, finished_at=None):
     cur.execute(
         """INSERT INTO job_logs (job_name, started_at, finished_at, status, rows_processed, message)
            VALUES (%s, %s, %s, %s, %s, %s)""",
-        (job_name, started_at, datetime.utcnow(), status, rows_processed, message),
+        (job_name, started_at, finished_at or datetime.now(timezone.utc), status, rows_processed, message),
     )
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Nightly OHLCV + reports batch job")
+    parser.add_argument("--date", type=date.fromisoformat, help="single UTC trade date (YYYY-MM-DD); default yesterday")
+    parser.add_argument("--start", type=date.fromisoformat, help="first date of a range (inclusive)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last date of a range (inclusive)")
+    parser.add_argument("--incremental", action="store_true", help="only days changed since their last successful run")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="symbol shards processed in parallel (1 = serial)")
+    parser.add_argument(
+        "--source",
+        choices=["auto", "parquet", "postgres"],
+        default="auto",
+        help="where to read trades: auto = Parquet archive only for days whose partition was dropped",
+    )
+    args = parser.parse_args()
+    if args.date and (args.start or args.end):
+        parser.error("--date cannot be combined with --start/--end")
+    start = args.date or args.start
+    end = args.date or args.end
+    try:
+        run(start_date=start, end_date=end, incremental=args.incremental, workers=args.workers, source=args.source)
+    finally:
+        if profiling.ENABLED:
+            profiling.report()
+            for stage, s in sorted(profiling.snapshot().items()):
+                print(f"profile {stage}: calls={s['calls']} sampled={s['sampled']} total={s['total_ms']:.1f}ms max={s['max_ms']:.1f}ms")
     sys.exit(0)
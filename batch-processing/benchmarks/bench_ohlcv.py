@@ -0,0 +1,170 @@
+"""
+Benchmark the OHLCV stage at increasing trade volumes.
+
+For each size, synthetic trades are generated server-side (generate_series)
+for a fixed bench date, then compute_ohlcv runs in a fresh child process so
+its peak RSS is measured in isolation. --legacy also times the previous
+fetchall + per-symbol Python lists approach for comparison, up to
+--legacy-max trades (it holds every row in memory). --parquet exports the
+bench day to a temporary Parquet archive and times archive.compute_ohlcv
+over it.
+
+Run from batch-processing/ with PG_* pointing at a scratch database:
+
+    python -m benchmarks.bench_ohlcv --trades 1000000 10000000 100000000 --symbols 500
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+import psycopg2
+
+import archive
+import batch_job
+
+BENCH_DATE = date(2000, 1, 3)
+BENCH_SYMBOL_PREFIX = "BENCH"
+
+
+def _connect():
+    return psycopg2.connect(
+        host=batch_job.PG_HOST,
+        port=batch_job.PG_PORT,
+        dbname=batch_job.PG_DB,
+        user=batch_job.PG_USER,
+        password=batch_job.PG_PASSWORD,
+    )
+
+
+def _bench_range():
+    ts_start = int(datetime(BENCH_DATE.year, BENCH_DATE.month, BENCH_DATE.day, tzinfo=timezone.utc).timestamp() * 1000)
+    return ts_start, ts_start + 86_400_000
+
+
+def seed(n_trades: int, n_symbols: int):
+    ts_start, ts_end = _bench_range()
+    conn = _connect()
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT create_raw_trades_partitions(%s, 1)", (BENCH_DATE,))
+        cur.execute("DELETE FROM raw_trades WHERE trade_ts >= %s AND trade_ts < %s", (ts_start, ts_end))
+        cur.execute(
+            """
+            INSERT INTO raw_trades (symbol, price, volume, trade_ts)
+            SELECT %(prefix)s || (g %% %(symbols)s),
+                   round((100 + 10 * random())::numeric, 4),
+                   1 + (random() * 999)::bigint,
+                   %(ts_start)s + (g * 86400000::bigint / %(n)s)
+            FROM generate_series(0, %(n)s - 1) AS g
+            """,
+            {"prefix": BENCH_SYMBOL_PREFIX, "symbols": n_symbols, "ts_start": ts_start, "n": n_trades},
+        )
+        cur.execute("ANALYZE raw_trades")
+    conn.close()
+
+
+def export_parquet(root: str) -> float:
+    ts_start, _ = _bench_range()
+    conn = _connect()
+    t0 = time.perf_counter()
+    with conn:
+        archive.archive_day(conn, BENCH_DATE, ts_start, root=root)
+    conn.close()
+    return time.perf_counter() - t0
+
+
+def cleanup():
+    ts_start, ts_end = _bench_range()
+    conn = _connect()
+    with conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM raw_trades WHERE trade_ts >= %s AND trade_ts < %s", (ts_start, ts_end))
+        cur.execute("DELETE FROM raw_trades_archive WHERE trade_date = %s", (BENCH_DATE,))
+    conn.close()
+
+
+def _legacy_ohlcv(cur, ts_start, ts_end):
+    """The pre-streaming implementation: fetchall + per-symbol Python lists."""
+    cur.execute(
+        """
+        SELECT symbol, price, volume, trade_ts
+        FROM raw_trades
+        WHERE trade_ts >= %s AND trade_ts < %s
+        ORDER BY symbol, trade_ts
+        """,
+        (ts_start, ts_end),
+    )
+    rows = cur.fetchall()
+    agg = defaultdict(lambda: {"prices": [], "volumes": []})
+    for symbol, price, volume, _ in rows:
+        agg[symbol]["prices"].append(float(price))
+        agg[symbol]["volumes"].append(int(volume))
+    out = [(s, v["prices"][0], max(v["prices"]), min(v["prices"]), v["prices"][-1], sum(v["volumes"])) for s, v in agg.items()]
+    return out, len(rows)
+
+
+def _measure(mode: str, queue, parquet_root=None):
+    ts_start, ts_end = _bench_range()
+    conn = _connect()
+    cur = conn.cursor()
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        ohlcv_rows, trades = _legacy_ohlcv(cur, ts_start, ts_end)
+    elif mode == "parquet":
+        ohlcv_rows, trades_by_day = archive.compute_ohlcv([BENCH_DATE], root=parquet_root)
+        trades = sum(trades_by_day.values())
+    else:
+        ohlcv_rows, trades_by_day = batch_job.compute_ohlcv(cur, [BENCH_DATE])
+        trades = sum(trades_by_day.values())
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({"mode": mode, "trades": trades, "symbols": len(ohlcv_rows), "seconds": elapsed, "peak_rss_mb": peak_kb / 1024})
+
+
+def measure(mode: str, parquet_root=None) -> dict:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(mode, queue, parquet_root))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, nargs="+", default=[1_000_000, 10_000_000, 100_000_000])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--legacy", action="store_true", help="also time the fetchall implementation")
+    parser.add_argument("--legacy-max", type=int, default=10_000_000, help="skip --legacy above this many trades")
+    parser.add_argument("--parquet", action="store_true", help="also time OHLCV from a Parquet export of the day")
+    parser.add_argument("--keep", action="store_true", help="leave bench trades in raw_trades")
+    args = parser.parse_args()
+    parquet_root = tempfile.mkdtemp(prefix="bench_ohlcv_") if args.parquet else None
+
+    print(f"{'trades':>12}{'mode':>8}{'symbols':>9}{'seconds':>10}{'peak RSS MB':>13}{'trades/s':>14}")
+    try:
+        for n in args.trades:
+            t0 = time.perf_counter()
+            seed(n, args.symbols)
+            print(f"# seeded {n:,} trades in {time.perf_counter() - t0:.1f}s")
+            modes = ["sql"] + (["legacy"] if args.legacy and n <= args.legacy_max else [])
+            if args.parquet:
+                print(f"# exported to Parquet in {export_parquet(parquet_root):.1f}s")
+                modes.append("parquet")
+            for mode in modes:
+                r = measure(mode, parquet_root)
+                print(f"{r['trades']:>12,}{r['mode']:>8}{r['symbols']:>9}{r['seconds']:>10.2f}{r['peak_rss_mb']:>13.1f}{r['trades'] / r['seconds']:>14,.0f}")
+    finally:
+        if not args.keep:
+            cleanup()
+        if parquet_root:
+            shutil.rmtree(parquet_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
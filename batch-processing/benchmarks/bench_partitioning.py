@@ -0,0 +1,195 @@
+"""
+Compare the old single-heap raw_trades against the daily-partitioned layout.
+
+Both layouts are built side by side in scratch schemas (bench_heap with the
+previous BIGSERIAL PK + B-tree indexes, bench_part with init-db.sql's daily
+partitions + BRIN), then each is measured on:
+
+  * insert throughput: time-ordered execute_values batches, like the stream writer
+  * extract: batch_job.compute_ohlcv for one day (search_path points at the schema)
+  * on-disk size of table + indexes
+  * retention of the oldest day: DELETE + VACUUM vs DETACH + DROP PARTITION
+
+Run from batch-processing/ with PG_* pointing at a database that has init-db.sql
+applied (create_raw_trades_partitions must exist):
+
+    python -m benchmarks.bench_partitioning --days 10 --trades-per-day 1000000 --symbols 500
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+import batch_job
+from benchmarks.bench_ohlcv import _connect
+
+BENCH_START = date(2000, 1, 3)
+INSERT_BATCH_ROWS = 5_000
+COMMIT_EVERY_ROWS = 100_000
+
+HEAP_DDL = """
+CREATE TABLE bench_heap.raw_trades (
+    id          BIGSERIAL PRIMARY KEY,
+    symbol      VARCHAR(20) NOT NULL,
+    price       NUMERIC(20, 8) NOT NULL,
+    volume      BIGINT NOT NULL,
+    trade_ts    BIGINT NOT NULL,
+    conditions  TEXT[],
+    created_at  TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX ON bench_heap.raw_trades (symbol, trade_ts);
+CREATE INDEX ON bench_heap.raw_trades (created_at);
+"""
+
+PARTITIONED_DDL = """
+CREATE TABLE bench_part.raw_trades (
+    id          BIGSERIAL,
+    symbol      VARCHAR(20) NOT NULL,
+    price       NUMERIC(20, 8) NOT NULL,
+    volume      BIGINT NOT NULL,
+    trade_ts    BIGINT NOT NULL,
+    conditions  TEXT[],
+    created_at  TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (id, trade_ts)
+) PARTITION BY RANGE (trade_ts);
+CREATE INDEX ON bench_part.raw_trades (symbol, trade_ts);
+CREATE INDEX ON bench_part.raw_trades USING brin (trade_ts) WITH (pages_per_range = 32);
+CREATE INDEX ON bench_part.raw_trades USING brin (created_at) WITH (pages_per_range = 32);
+CREATE TABLE bench_part.raw_trades_default PARTITION OF bench_part.raw_trades DEFAULT;
+"""
+
+
+def setup(conn, days: int):
+    with conn, conn.cursor() as cur:
+        for schema, ddl in (("bench_heap", HEAP_DDL), ("bench_part", PARTITIONED_DDL)):
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+            cur.execute(ddl)
+        # create_raw_trades_partitions resolves raw_trades via search_path, so it builds bench_part's partitions
+        cur.execute("SET LOCAL search_path TO bench_part")
+        cur.execute("SELECT public.create_raw_trades_partitions(%s, %s)", (BENCH_START, days))
+
+
+def teardown(conn):
+    with conn, conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS bench_heap CASCADE; DROP SCHEMA IF EXISTS bench_part CASCADE")
+
+
+def _trade_batches(days: int, trades_per_day: int, n_symbols: int, seed: int):
+    """Time-ordered synthetic trades, one day at a time, in insert-sized batches."""
+    rng = np.random.default_rng(seed)
+    for i in range(days):
+        day_start = batch_job._day_start_ms(BENCH_START + timedelta(days=i))
+        ts = day_start + np.arange(trades_per_day, dtype=np.int64) * 86_400_000 // trades_per_day
+        symbols = rng.integers(0, n_symbols, trades_per_day)
+        prices = np.round(100 + 10 * rng.random(trades_per_day), 4)
+        volumes = rng.integers(1, 1000, trades_per_day)
+        for lo in range(0, trades_per_day, COMMIT_EVERY_ROWS):
+            hi = min(lo + COMMIT_EVERY_ROWS, trades_per_day)
+            yield [(f"BENCH{symbols[j]}", float(prices[j]), int(volumes[j]), int(ts[j])) for j in range(lo, hi)]
+
+
+def bench_insert(conn, schema: str, args) -> dict:
+    rows = 0
+    elapsed = 0.0
+    with conn.cursor() as cur:
+        for batch in _trade_batches(args.days, args.trades_per_day, args.symbols, args.seed):
+            t0 = time.perf_counter()
+            execute_values(
+                cur,
+                f"INSERT INTO {schema}.raw_trades (symbol, price, volume, trade_ts) VALUES %s",
+                batch,
+                page_size=INSERT_BATCH_ROWS,
+            )
+            conn.commit()
+            elapsed += time.perf_counter() - t0
+            rows += len(batch)
+        cur.execute(f"ANALYZE {schema}.raw_trades")
+    conn.commit()
+    return {"rows": rows, "insert_s": elapsed, "rows_per_s": rows / elapsed}
+
+
+def bench_extract(conn, schema: str, day: date, repeats: int) -> dict:
+    timings = []
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {schema}, public")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            ohlcv_rows, _ = batch_job.compute_ohlcv(cur, [day])
+            timings.append(time.perf_counter() - t0)
+        cur.execute("RESET search_path")
+    conn.commit()
+    return {"extract_s": float(np.median(timings)), "ohlcv_rows": len(ohlcv_rows)}
+
+
+def relation_sizes(conn, schema: str) -> dict:
+    """Table and index bytes, summed over partitions for the partitioned layout."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT coalesce(sum(pg_table_size(c.oid)), 0), coalesce(sum(pg_indexes_size(c.oid)), 0)
+            FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %s AND c.relkind = 'r'
+            """,
+            (schema,),
+        )
+        table_bytes, index_bytes = cur.fetchone()
+    conn.commit()
+    return {"table_mb": table_bytes / 2**20, "index_mb": index_bytes / 2**20}
+
+
+def bench_retention(conn, schema: str) -> float:
+    """Seconds to remove BENCH_START's trades and reclaim the space."""
+    t0 = time.perf_counter()
+    if schema == "bench_heap":
+        lo = batch_job._day_start_ms(BENCH_START)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM bench_heap.raw_trades WHERE trade_ts >= %s AND trade_ts < %s", (lo, lo + 86_400_000))
+        conn.commit()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM bench_heap.raw_trades")
+        conn.autocommit = False
+    else:
+        name = f"raw_trades_p{BENCH_START:%Y%m%d}"
+        with conn, conn.cursor() as cur:
+            cur.execute(f"ALTER TABLE bench_part.raw_trades DETACH PARTITION bench_part.{name}")
+            cur.execute(f"DROP TABLE bench_part.{name}")
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--trades-per-day", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=5, help="extract runs per layout (median reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="leave the bench_heap / bench_part schemas")
+    args = parser.parse_args()
+
+    conn = _connect()
+    extract_day = BENCH_START + timedelta(days=args.days // 2)
+    results = {}
+    try:
+        setup(conn, args.days)
+        for schema in ("bench_heap", "bench_part"):
+            r = bench_insert(conn, schema, args)
+            r.update(bench_extract(conn, schema, extract_day, args.repeats))
+            r.update(relation_sizes(conn, schema))
+            r["retention_s"] = bench_retention(conn, schema)
+            results[schema] = r
+            print(f"# {schema}: {r['rows']:,} trades loaded")
+    finally:
+        if not args.keep:
+            teardown(conn)
+        conn.close()
+
+    print(f"{'layout':<12}{'rows/s':>12}{'extract s':>11}{'table MB':>10}{'index MB':>10}{'drop day s':>12}")
+    for schema, r in results.items():
+        print(f"{schema:<12}{r['rows_per_s']:>12,.0f}{r['extract_s']:>11.3f}{r['table_mb']:>10.1f}{r['index_mb']:>10.1f}{r['retention_s']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Compare NUMERIC(20, 8) prices against fixed-point int64 price_fx (PRICE_ENCODING=fixed).
+
+The same synthetic trades are loaded into two scratch schemas that both use
+init-db.sql's raw_trades columns (nullable price + price_fx): bench_numeric
+fills price, bench_fixed fills price_fx at scale 4. Each layout is measured on:
+
+  * on-disk size of raw_trades + indexes
+  * extract: batch_job.compute_ohlcv over every loaded day (search_path points at the schema)
+  * fetch: one symbol's trades into a float64 NumPy array, as the intraday endpoint does
+    (price::float8 vs price_fx scaled client-side)
+  * serialize: JSON for --serialize-rows rows as the API returns them (Decimal
+    converted at encode time, as FastAPI does for fetch_historical, vs ints scaled once)
+
+Run from batch-processing/ against any PostgreSQL database:
+
+    python -m benchmarks.bench_price_encoding --days 5 --trades-per-day 1000000 --symbols 500
+"""
+import argparse
+import io
+import json
+import time
+from datetime import timedelta
+
+import numpy as np
+
+import batch_job
+from benchmarks.bench_ohlcv import _connect
+from benchmarks.bench_partitioning import BENCH_START
+
+SCALE = 4
+SCHEMAS = {"bench_numeric": "decimal", "bench_fixed": "fixed"}
+
+DDL = """
+CREATE TABLE {schema}.symbol_scales (
+    symbol VARCHAR(20) PRIMARY KEY,
+    scale  SMALLINT NOT NULL
+);
+CREATE TABLE {schema}.raw_trades (
+    id          BIGSERIAL PRIMARY KEY,
+    symbol      VARCHAR(20) NOT NULL,
+    price       NUMERIC(20, 8),
+    price_fx    BIGINT,
+    volume      BIGINT NOT NULL,
+    trade_ts    BIGINT NOT NULL,
+    conditions  TEXT[],
+    created_at  TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX ON {schema}.raw_trades (symbol, trade_ts);
+"""
+
+
+def setup(conn):
+    with conn, conn.cursor() as cur:
+        for schema in SCHEMAS:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+            cur.execute(DDL.format(schema=schema))
+
+
+def teardown(conn):
+    with conn, conn.cursor() as cur:
+        for schema in SCHEMAS:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+
+
+def load(conn, schema: str, args) -> float:
+    """COPY the synthetic trades into one layout; returns seconds spent."""
+    fixed = SCHEMAS[schema] == "fixed"
+    column = "price_fx" if fixed else "price"
+    rng = np.random.default_rng(args.seed)
+    elapsed = 0.0
+    with conn.cursor() as cur:
+        cur.execute(
+            f"INSERT INTO {schema}.symbol_scales SELECT 'BENCH' || i, %s FROM generate_series(0, %s) i",
+            (SCALE, args.symbols - 1),
+        )
+        for i in range(args.days):
+            day_start = batch_job._day_start_ms(BENCH_START + timedelta(days=i))
+            n = args.trades_per_day
+            ts = day_start + np.arange(n, dtype=np.int64) * 86_400_000 // n
+            symbols = rng.integers(0, args.symbols, n)
+            prices_fx = np.round((100 + 10 * rng.random(n)) * 10**SCALE).astype(np.int64)
+            volumes = rng.integers(1, 1000, n)
+            prices = prices_fx if fixed else [f"{p / 10**SCALE:.{SCALE}f}" for p in prices_fx]
+            buf = io.StringIO("".join(
+                f"BENCH{s}\t{p}\t{v}\t{t}\n" for s, p, v, t in zip(symbols, prices, volumes, ts)
+            ))
+            t0 = time.perf_counter()
+            cur.copy_expert(f"COPY {schema}.raw_trades (symbol, {column}, volume, trade_ts) FROM STDIN", buf)
+            conn.commit()
+            elapsed += time.perf_counter() - t0
+        cur.execute(f"ANALYZE {schema}.raw_trades")
+    conn.commit()
+    return elapsed
+
+
+def relation_sizes(conn, schema: str) -> dict:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT pg_table_size(%s::regclass), pg_indexes_size(%s::regclass)",
+            (f"{schema}.raw_trades", f"{schema}.raw_trades"),
+        )
+        table_bytes, index_bytes = cur.fetchone()
+    conn.commit()
+    return {"table_mb": table_bytes / 2**20, "index_mb": index_bytes / 2**20}
+
+
+def bench_extract(conn, schema: str, days: list, repeats: int) -> float:
+    batch_job.PRICE_ENCODING = SCHEMAS[schema]
+    timings = []
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {schema}, public")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            batch_job.compute_ohlcv(cur, days)
+            timings.append(time.perf_counter() - t0)
+        cur.execute("RESET search_path")
+    conn.commit()
+    return float(np.median(timings))
+
+
+def bench_fetch(conn, schema: str, repeats: int) -> float:
+    """Median seconds to pull BENCH0's trades into a float64 array."""
+    fixed = SCHEMAS[schema] == "fixed"
+    sql = f"SELECT {'price_fx' if fixed else 'price::float8'} FROM {schema}.raw_trades WHERE symbol = 'BENCH0' ORDER BY trade_ts"
+    timings = []
+    with conn.cursor() as cur:
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            cur.execute(sql)
+            rows = cur.fetchall()
+            if fixed:
+                np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)) / 10.0**SCALE
+            else:
+                np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows))
+            timings.append(time.perf_counter() - t0)
+    conn.commit()
+    return float(np.median(timings))
+
+
+def bench_serialize(conn, schema: str, n_rows: int, repeats: int) -> float:
+    """Median seconds to JSON-encode n_rows {"price": ...} objects from the column as fetched."""
+    fixed = SCHEMAS[schema] == "fixed"
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {'price_fx' if fixed else 'price'} FROM {schema}.raw_trades LIMIT %s", (n_rows,))
+        values = [r[0] for r in cur.fetchall()]
+    conn.commit()
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        if fixed:
+            factor = 10.0**SCALE
+            json.dumps([{"price": v / factor} for v in values])
+        else:
+            json.dumps([{"price": v} for v in values], default=float)
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--trades-per-day", type=int, default=1_000_000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--serialize-rows", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5, help="runs per measurement (median reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="leave the bench_numeric / bench_fixed schemas")
+    args = parser.parse_args()
+
+    conn = _connect()
+    days = [BENCH_START + timedelta(days=i) for i in range(args.days)]
+    results = {}
+    try:
+        setup(conn)
+        for schema in SCHEMAS:
+            r = {"load_s": load(conn, schema, args)}
+            r.update(relation_sizes(conn, schema))
+            r["extract_s"] = bench_extract(conn, schema, days, args.repeats)
+            r["fetch_s"] = bench_fetch(conn, schema, args.repeats)
+            r["serialize_s"] = bench_serialize(conn, schema, args.serialize_rows, args.repeats)
+            results[schema] = r
+            print(f"# {schema}: {args.days * args.trades_per_day:,} trades loaded")
+    finally:
+        if not args.keep:
+            teardown(conn)
+        conn.close()
+
+    print(f"{'encoding':<15}{'load s':>9}{'table MB':>10}{'index MB':>10}{'extract s':>11}{'fetch s':>10}{'json s':>9}")
+    for schema, r in results.items():
+        print(
+            f"{schema:<15}{r['load_s']:>9.2f}{r['table_mb']:>10.1f}{r['index_mb']:>10.1f}"
+            f"{r['extract_s']:>11.3f}{r['fetch_s']:>10.4f}{r['serialize_s']:>9.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
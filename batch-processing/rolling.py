@@ -0,0 +1,192 @@
+"""
+Multi-day rolling analytics over ohlcv_daily, computed vectorized for all symbols.
+
+The sessions of every symbol over a run's whole date range are loaded once
+(load_ohlcv_history). window() then cuts the last `lookback` trading days on
+or before each as_of into right-aligned (symbols x days) NumPy matrices, so
+column -1 is each symbol's latest session and column -2 its previous trading
+day (not the previous calendar date). Every window is then a column slice;
+missing history shows up as NaN and yields NULL metrics rather than a
+partial-window estimate.
+"""
+import math
+from datetime import date, datetime, timezone
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def load_ohlcv_history(cur, start, end, lookback):
+    """Load every symbol's sessions in [start, end] plus the `lookback` sessions before `start`.
+
+    Each symbol is two range scans on idx_ohlcv_daily_symbol_date (symbols
+    found by a loose index scan), so the cost follows the requested range
+    rather than the whole of ohlcv_daily. A row holds NUMERIC prices or
+    int64 *_fx (PRICE_ENCODING=fixed); both are read and the *_fx ones
+    scaled in NumPy, so history from before a switch of encoding is kept.
+    Returns (symbols, dates, data): left-aligned [S, n] arrays of date
+    ordinals and of {"open"|"high"|"low"|"close"|"volume"}, oldest session
+    first, for window() to cut per-day matrices from.
+    """
+    prices = "open, high, low, close, open_fx, high_fx, low_fx, close_fx"
+    cur.execute(
+        f"""
+        WITH RECURSIVE syms(symbol) AS (
+            (SELECT symbol FROM ohlcv_daily ORDER BY symbol LIMIT 1)
+            UNION ALL
+            SELECT (SELECT o.symbol FROM ohlcv_daily o WHERE o.symbol > syms.symbol ORDER BY o.symbol LIMIT 1)
+            FROM syms WHERE syms.symbol IS NOT NULL
+        )
+        SELECT t.symbol, t.date, open::float8, high::float8, low::float8, close::float8, volume::float8,
+               open_fx, high_fx, low_fx, close_fx, (SELECT scale FROM symbol_scales s WHERE s.symbol = t.symbol)
+        FROM syms
+        CROSS JOIN LATERAL (
+            (SELECT symbol, date, {prices}, volume FROM ohlcv_daily o
+             WHERE o.symbol = syms.symbol AND o.date < %(start)s
+             ORDER BY o.date DESC LIMIT %(lookback)s)
+            UNION ALL
+            (SELECT symbol, date, {prices}, volume FROM ohlcv_daily o
+             WHERE o.symbol = syms.symbol AND o.date BETWEEN %(start)s AND %(end)s)
+        ) t
+        WHERE syms.symbol IS NOT NULL
+        ORDER BY t.symbol, t.date
+        """,
+        {"start": start, "end": end, "lookback": lookback},
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return [], np.empty((0, 0), dtype=np.int64), {}
+    sym_col = [r[0] for r in rows]
+    symbols, sym_idx = np.unique(np.array(sym_col, dtype=object), return_inverse=True)
+    counts = np.bincount(sym_idx)
+    # Rows arrive ordered by (symbol, date): position within the symbol's run
+    col_idx = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    # NULLs become NaN: the NUMERIC columns of *_fx rows are filled from the scaled ints
+    data = np.array([r[2:7] for r in rows], dtype=np.float64)
+    fx = np.array([r[7:11] for r in rows], dtype=np.float64)
+    if not np.isnan(fx).all():
+        scale = np.array([r[11] for r in rows], dtype=np.float64)
+        data[:, :4] = np.where(np.isnan(data[:, :4]), fx / 10.0 ** scale[:, None], data[:, :4])
+
+    # Padding sorts after every real date, so it is never on or before an as_of
+    dates = np.full((len(symbols), counts.max()), np.iinfo(np.int64).max, dtype=np.int64)
+    dates[sym_idx, col_idx] = np.fromiter((r[1].toordinal() for r in rows), dtype=np.int64, count=len(rows))
+    history = {}
+    for i, name in enumerate(("open", "high", "low", "close", "volume")):
+        m = np.full(dates.shape, np.nan)
+        m[sym_idx, col_idx] = data[:, i]
+        history[name] = m
+    return list(symbols), dates, history
+
+
+def window(history, as_of, lookback):
+    """The last `lookback` sessions on or before `as_of` for every symbol still trading.
+
+    A symbol is kept when its latest session is on or after the previous
+    session (the last date before as_of any symbol traded), so halted or
+    delisted symbols drop out instead of repeating a stale window.
+    Returns (symbols, last_dates, {"open"|"high"|"low"|"close"|"volume": ndarray[S, lookback]}),
+    right-aligned as described in the module docstring.
+    """
+    symbols, dates, data = history
+    as_of_ord = as_of.toordinal()
+    # Sessions on or before as_of per symbol; they are a prefix of each row
+    ends = (dates <= as_of_ord).sum(axis=1)
+    last = dates[np.arange(len(dates)), np.maximum(ends - 1, 0)]
+    earlier = dates[dates < as_of_ord]
+    previous = earlier.max() if earlier.size else as_of_ord
+    keep = np.flatnonzero((ends > 0) & (last >= previous))
+    if not len(keep):
+        return [], [], {}
+    ends = ends[keep]
+    cols = ends[:, None] - lookback + np.arange(lookback)
+    valid = cols >= 0
+    rows = keep[:, None]
+    cols = np.maximum(cols, 0)
+    matrices = {name: np.where(valid, m[rows, cols], np.nan) for name, m in data.items()}
+    last_dates = [date.fromordinal(int(d)) for d in dates[keep, ends - 1]]
+    return [symbols[i] for i in keep], last_dates, matrices
+
+
+def load_ohlcv_matrix(cur, as_of, lookback):
+    """Load the last `lookback` sessions on or before `as_of` for every symbol (see window())."""
+    return window(load_ohlcv_history(cur, as_of, as_of, lookback), as_of, lookback)
+
+
+def compute_rolling(m, windows):
+    """Per-window metrics for the latest session of each row of the matrices.
+
+    Returns {window: {"return_pct", "realized_vol", "parkinson_vol", "atr", "avg_volume"}},
+    each an ndarray[S]; volatilities are annualized.
+    """
+    close, high, low, volume = m["close"], m["high"], m["low"], m["volume"]
+    prev_close = close[:, :-1]
+    log_ret = np.log(close[:, 1:] / prev_close)
+    hl_sq = np.log(high / low) ** 2
+    true_range = np.fmax(
+        high[:, 1:] - low[:, 1:],
+        np.fmax(np.abs(high[:, 1:] - prev_close), np.abs(low[:, 1:] - prev_close)),
+    )
+    annualize = math.sqrt(TRADING_DAYS_PER_YEAR)
+
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for w in windows:
+            out[w] = {
+                "return_pct": (close[:, -1] / close[:, -1 - w] - 1) * 100,
+                "realized_vol": np.std(log_ret[:, -w:], axis=1, ddof=1) * annualize,
+                "parkinson_vol": np.sqrt(np.mean(hl_sq[:, -w:], axis=1) / (4 * math.log(2))) * annualize,
+                "atr": np.mean(true_range[:, -w:], axis=1),
+                "avg_volume": np.mean(volume[:, -w:], axis=1),
+            }
+    return out
+
+
+def daily_change_pct(m):
+    """Close vs previous trading day's close, in percent."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (m["close"][:, -1] / m["close"][:, -2] - 1) * 100
+
+
+def _num(x):
+    return None if x is None or not np.isfinite(x) else float(x)
+
+
+def write_rolling(cur, as_of, symbols, last_dates, m, metrics):
+    generated_at = datetime.now(timezone.utc)
+    rows = []
+    for w, vals in metrics.items():
+        for i, symbol in enumerate(symbols):
+            rows.append((
+                symbol,
+                as_of,
+                w,
+                last_dates[i],
+                _num(vals["return_pct"][i]),
+                _num(vals["realized_vol"][i]),
+                _num(vals["parkinson_vol"][i]),
+                _num(vals["atr"][i]),
+                _num(vals["avg_volume"][i]),
+                _num(m["close"][i, -1]),
+                generated_at,
+            ))
+    # Symbols that dropped out of this as_of since it was last written
+    cur.execute("DELETE FROM rolling_metrics WHERE as_of_date = %s AND symbol <> ALL(%s)", (as_of, list(symbols)))
+    execute_values(
+        cur,
+        """
+        INSERT INTO rolling_metrics (symbol, as_of_date, window_days, last_date, return_pct, realized_vol,
+                                     parkinson_vol, atr, avg_volume, last_close, generated_at)
+        VALUES %s
+        ON CONFLICT (as_of_date, window_days, symbol) DO UPDATE SET
+          last_date = EXCLUDED.last_date, return_pct = EXCLUDED.return_pct,
+          realized_vol = EXCLUDED.realized_vol, parkinson_vol = EXCLUDED.parkinson_vol,
+          atr = EXCLUDED.atr, avg_volume = EXCLUDED.avg_volume,
+          last_close = EXCLUDED.last_close, generated_at = EXCLUDED.generated_at
+        """,
+        rows,
+        page_size=5000,
+    )
+    return len(rows)
@@ -0,0 +1,96 @@
+"""--incremental picks up every changed day in one run (needs a scratch PostgreSQL with init-db.sql, PG_* env)."""
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg2
+import pytest
+
+import batch_job
+
+# Far enough back that no real data or partition shares these days
+DAYS = [date(2001, 3, 5) + timedelta(days=i) for i in range(6)]
+SYMBOLS = ("INCA", "INCB")
+
+
+def _ms(day, hour=15):
+    return batch_job._day_start_ms(day) + hour * 3_600_000
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    # Keep the 2001 rows in raw_trades_default through run()'s partition upkeep
+    monkeypatch.setattr(batch_job, "RAW_TRADES_RETENTION_DAYS", 0)
+    try:
+        conn = batch_job._connect()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL not reachable: {e}")
+    lo, hi = batch_job._day_start_ms(DAYS[0]), batch_job._day_start_ms(DAYS[-1] + timedelta(days=1))
+
+    def cleanup():
+        with conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM raw_trades WHERE trade_ts >= %s AND trade_ts < %s", (lo, hi))
+            cur.execute("DELETE FROM ohlcv_daily WHERE symbol = ANY(%s)", (list(SYMBOLS),))
+            cur.execute("DELETE FROM rolling_metrics WHERE symbol = ANY(%s)", (list(SYMBOLS),))
+            cur.execute("DELETE FROM batch_watermarks WHERE trade_date BETWEEN %s AND %s", (DAYS[0], DAYS[-1]))
+
+    cleanup()
+    yield conn
+    conn.rollback()
+    cleanup()
+    conn.close()
+
+
+def _insert_trades(conn, day, price, created_at=None):
+    with conn, conn.cursor() as cur:
+        for i, symbol in enumerate(SYMBOLS):
+            cur.execute(
+                "INSERT INTO raw_trades (symbol, price, volume, trade_ts, created_at) VALUES (%s, %s, 10, %s, COALESCE(%s, NOW()))",
+                (symbol, price + i, _ms(day), created_at),
+            )
+
+
+def _closes(conn):
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT date, symbol, close FROM ohlcv_daily WHERE symbol = ANY(%s) ORDER BY 1, 2", (list(SYMBOLS),))
+        return {(d, s): float(c) for d, s, c in cur.fetchall()}
+
+
+def _watermarked(conn):
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT trade_date FROM batch_watermarks WHERE trade_date BETWEEN %s AND %s ORDER BY 1", (DAYS[0], DAYS[-1]))
+        return [r[0] for r in cur.fetchall()]
+
+
+def test_dirty_days_are_unwatermarked_or_changed_days(conn):
+    processed_at = datetime(2001, 3, 20, tzinfo=timezone.utc)
+    with conn, conn.cursor() as cur:
+        batch_job._write_watermarks(cur, DAYS[:2], {}, processed_at)
+    _insert_trades(conn, DAYS[0], 10.0, created_at=processed_at - timedelta(hours=1))
+    _insert_trades(conn, DAYS[1], 10.0, created_at=processed_at + timedelta(hours=1))
+    with conn.cursor() as cur:
+        assert batch_job.dirty_days(cur, DAYS[0], DAYS[-1]) == DAYS[1:]
+
+
+def test_one_incremental_run_backfills_every_missed_day(conn):
+    # Several nights missed: trades on days 0, 2, 3 and 5, nothing processed yet
+    for i in (0, 2, 3, 5):
+        _insert_trades(conn, DAYS[i], 100.0 + i)
+
+    # The DAG's run after downtime: --end {{ ds }} --incremental, nothing earlier in the lookback
+    batch_job.run(end_date=DAYS[-1], start_date=DAYS[0], incremental=True)
+    closes = _closes(conn)
+    assert {d for d, _ in closes} == {DAYS[i] for i in (0, 2, 3, 5)}
+    assert closes[(DAYS[3], "INCB")] == 104.0
+    assert _watermarked(conn) == DAYS
+
+    # Nothing changed: the next run is a no-op
+    with conn.cursor() as cur:
+        assert batch_job.dirty_days(cur, DAYS[0], DAYS[-1]) == []
+    conn.rollback()
+
+    # A late trade for an old day is picked up by the next incremental run, and only that day is redone
+    _insert_trades(conn, DAYS[2], 500.0)
+    with conn.cursor() as cur:
+        assert batch_job.dirty_days(cur, DAYS[0], DAYS[-1]) == [DAYS[2]]
+    conn.rollback()
+    batch_job.run(end_date=DAYS[-1], start_date=DAYS[0], incremental=True)
+    assert _closes(conn)[(DAYS[2], "INCB")] == 501.0
@@ -0,0 +1,188 @@
+"""
+Opt-in profiling for the streaming and batch jobs, toggled by environment.
+
+PROFILE_TIMERS=1 samples every PROFILE_EVERY-th call of the stages wrapped in
+@timed / timer(), starting with the first (so a batch stage that runs once
+per job is always timed), with a wall clock. Other calls only bump the
+stage's call counter. Every PROFILE_REPORT_EVERY calls of a stage its
+count/mean/max are logged and all stages this process has seen are written
+to PROFILE_DIR/timings-{pid}.json, so executor-side stages (Python workers
+have no log handler) can be read too. PROFILE_EVERY=1 times every call.
+
+PROFILE_CAPTURE=cprofile|pyinstrument also runs the sampled calls under that
+profiler and writes the dump to PROFILE_DIR/{stage}-{call}-{unix_ms}.prof
+(cProfile, open with snakeviz or pstats) or .html (pyinstrument). One
+capture runs at a time per process; a sampled call that comes due while
+another is running (a nested stage, another query thread) is timed but not
+captured.
+
+With neither variable set, @timed returns the function unchanged and timer()
+returns a shared no-op context, so instrumented code pays nothing.
+
+This is the one copy for both jobs: batch-processing/profiling.py and
+stream-processing/profiling.py are symlinks to it, and the stream-processing
+image copies it from here.
+"""
+import cProfile
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TIMERS = os.environ.get("PROFILE_TIMERS", "").lower() in ("1", "true", "yes")
+PROFILE_CAPTURE = os.environ.get("PROFILE_CAPTURE", "").lower()
+PROFILE_EVERY = max(1, int(os.environ.get("PROFILE_EVERY", "100")))
+PROFILE_REPORT_EVERY = max(1, int(os.environ.get("PROFILE_REPORT_EVERY", "100")))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/profiles")
+
+if PROFILE_CAPTURE == "pyinstrument":
+    try:
+        import pyinstrument
+    except ImportError:
+        logger.warning("PROFILE_CAPTURE=pyinstrument but pyinstrument is not installed; using cProfile")
+        PROFILE_CAPTURE = "cprofile"
+elif PROFILE_CAPTURE not in ("", "cprofile"):
+    logger.warning("Unknown PROFILE_CAPTURE=%r; captures disabled", PROFILE_CAPTURE)
+    PROFILE_CAPTURE = ""
+
+ENABLED = PROFILE_TIMERS or bool(PROFILE_CAPTURE)
+
+# stage -> [calls, sampled_calls, total_seconds, max_seconds]
+_stats: dict[str, list] = {}
+_NULL = contextlib.nullcontext()
+_capture_lock = threading.Lock()
+
+
+class _Timer:
+    __slots__ = ("name", "call", "t0", "profiler")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stats = _stats.get(self.name)
+        if stats is None:
+            stats = _stats[self.name] = [0, 0, 0.0, 0.0]
+        self.call = stats[0] + 1
+        if (self.call - 1) % PROFILE_EVERY:
+            self.t0 = None
+            return self
+        self.profiler = _start_capture() if PROFILE_CAPTURE else None
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        stats = _stats[self.name]
+        stats[0] += 1
+        if self.t0 is not None:
+            elapsed = time.perf_counter() - self.t0
+            if self.profiler is not None:
+                _write_capture(self.profiler, self.name, self.call)
+            stats[1] += 1
+            stats[2] += elapsed
+            if elapsed > stats[3]:
+                stats[3] = elapsed
+        if stats[0] % PROFILE_REPORT_EVERY == 0:
+            report(self.name)
+        return False
+
+
+def timer(name: str):
+    """Context manager timing one block as stage `name` (when the call is sampled)."""
+    return _Timer(name) if ENABLED else _NULL
+
+
+def timed(name: str | None = None):
+    """Decorator timing the sampled calls of the function (or the full iteration of a generator)."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        stage = name or fn.__name__
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                with _Timer(stage):
+                    yield from fn(*args, **kwargs)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot() -> dict:
+    """Per stage: every call counted, and the total/mean/max of the sampled ones."""
+    return {
+        name: {
+            "calls": calls,
+            "sampled": sampled,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total / sampled * 1000, 3) if sampled else None,
+            "max_ms": round(peak * 1000, 3),
+        }
+        for name, (calls, sampled, total, peak) in _stats.items()
+    }
+
+
+def report(stage: str | None = None):
+    """Log one stage's (or every stage's) summary and rewrite this process's timings file."""
+    snap = snapshot()
+    for name in [stage] if stage else sorted(snap):
+        s = snap[name]
+        logger.info(
+            "profile %s: calls=%d sampled=%d mean=%.2fms max=%.2fms",
+            name, s["calls"], s["sampled"], s["mean_ms"] or 0, s["max_ms"],
+        )
+    try:
+        path = Path(PROFILE_DIR)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / f"timings-{os.getpid()}.json").write_text(json.dumps(snap, indent=2, sort_keys=True))
+    except OSError as e:
+        logger.warning("Could not write timings to %s: %s", PROFILE_DIR, e)
+
+
+def _start_capture():
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    try:
+        if PROFILE_CAPTURE == "pyinstrument":
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except (RuntimeError, ValueError) as e:
+        _capture_lock.release()
+        logger.debug("Skipping capture: %s", e)
+        return None
+
+
+def _write_capture(profiler, name: str, call: int):
+    try:
+        if PROFILE_CAPTURE == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+    finally:
+        _capture_lock.release()
+    stem = f"{name}-{call}-{int(time.time() * 1000)}"
+    try:
+        path = Path(PROFILE_DIR)
+        path.mkdir(parents=True, exist_ok=True)
+        if PROFILE_CAPTURE == "pyinstrument":
+            (path / f"{stem}.html").write_text(profiler.output_html())
+        else:
+            profiler.dump_stats(str(path / f"{stem}.prof"))
+    except OSError as e:
+        logger.warning("Could not write profile %s: %s", stem, e)
@@ -1,7 +1,7 @@
 import { useQuery } from '@tanstack/react-query'
 import { useStore } from './store'
 import { useMarketSocket } from './hooks/useMarketSocket'
-import { fetchTickers, fetchTopMovers, fetchAlerts } from './api'
+import { fetchTickers, fetchTopMovers } from './api'
 import { TickerBar } from './components/TickerBar'
 import { CandlestickChart } from './components/CandlestickChart'
 import { VolumeChart } from './components/VolumeChart'
@@ -22,11 +22,6 @@ function App() {
     queryFn: fetchTopMovers,
     refetchInterval: 60_000,
   })
-  useQuery({
-    queryKey: ['alerts'],
-    queryFn: fetchAlerts,
-    refetchInterval: 10_000,
-  })
 
   return (
     <div className="min-h-screen p-4">
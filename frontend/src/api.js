@@ -18,18 +18,46 @@ export async function fetchHistorical(ticker, limit = 200) {
   return r.json()
 }
 
+export async function fetchIntraday(ticker, { from, to, points = 500, mode = 'ohlcv' } = {}) {
+  const params = new URLSearchParams({ points, mode })
+  if (from != null) params.set('from', from)
+  if (to != null) params.set('to', to)
+  const r = await fetch(`${API_BASE}/api/intraday/${ticker}?${params}`)
+  if (!r.ok) throw new Error(`No intraday data for ${ticker}`)
+  return r.json()
+}
+
 export async function fetchTopMovers() {
   const r = await fetch(`${API_BASE}/api/reports/top-movers`)
   if (!r.ok) throw new Error('Failed to fetch top movers')
   return r.json()
 }
 
-export async function fetchAlerts(limit = 100) {
-  const r = await fetch(`${API_BASE}/api/alerts?limit=${limit}`)
+export async function fetchIntradayLeaderboard(n = 5) {
+  const r = await fetch(`${API_BASE}/api/leaderboard/intraday?n=${n}`)
+  if (!r.ok) throw new Error('Failed to fetch intraday leaderboard')
+  return r.json()
+}
+
+export async function fetchAlerts({ limit = 100, ticker, type, severity, beforeTs, beforeId } = {}) {
+  const params = new URLSearchParams({ limit })
+  if (ticker) params.set('ticker', ticker)
+  if (type) params.set('type', type)
+  if (severity) params.set('severity', severity)
+  if (beforeTs) params.set('before_ts', beforeTs)
+  if (beforeId != null) params.set('before_id', beforeId)
+  const r = await fetch(`${API_BASE}/api/alerts?${params}`)
   if (!r.ok) throw new Error('Failed to fetch alerts')
   return r.json()
 }
 
+export function alertsStreamUrl({ ticker } = {}) {
+  const params = new URLSearchParams()
+  if (ticker) params.set('ticker', ticker)
+  const qs = params.toString()
+  return `${API_BASE}/api/alerts/stream${qs ? `?${qs}` : ''}`
+}
+
 export function wsLiveUrl() {
   const base = import.meta.env.VITE_WS_URL || (API_BASE ? new URL(API_BASE).origin.replace(/^http/, 'ws') : `${window.location.protocol === 'https:' ? 'wss' : 'ws'}://${window.location.host}`)
   return `${base}/ws/live`
@@ -1,7 +1,9 @@
 import React from 'react'
-import { useQuery } from '@tanstack/react-query'
+import { useQuery, useQueryClient } from '@tanstack/react-query'
 import { useStore } from '../store'
-import { fetchAlerts } from '../api'
+import { fetchAlerts, alertsStreamUrl } from '../api'
+
+const MAX_ALERTS = 50
 
 const SEVERITY_COLOR = {
   critical: 'bg-red-500/20 text-red-400 border-red-500/50',
@@ -12,13 +14,26 @@ const SEVERITY_COLOR = {
 export function AlertsFeed() {
   const selectedTicker = useStore((s) => s.selectedTicker)
   const [filterTicker, setFilterTicker] = React.useState(false)
+  const ticker = filterTicker ? selectedTicker : null
+  const queryClient = useQueryClient()
   const { data: alerts = [], isLoading } = useQuery({
-    queryKey: ['alerts'],
-    queryFn: () => fetchAlerts(50),
-    refetchInterval: 10_000,
+    queryKey: ['alerts', ticker],
+    queryFn: () => fetchAlerts({ limit: MAX_ALERTS, ticker }),
   })
 
-  const filtered = filterTicker ? alerts.filter((a) => a.ticker === selectedTicker) : alerts.slice(0, 50)
+  // New alerts are pushed over SSE; the REST query only loads the initial page.
+  React.useEffect(() => {
+    const source = new EventSource(alertsStreamUrl({ ticker }))
+    source.addEventListener('alert', (event) => {
+      try {
+        const alert = JSON.parse(event.data)
+        queryClient.setQueryData(['alerts', ticker], (prev = []) =>
+          prev.some((a) => a.id === alert.id) ? prev : [alert, ...prev].slice(0, MAX_ALERTS)
+        )
+      } catch (_) {}
+    })
+    return () => source.close()
+  }, [ticker, queryClient])
 
   return (
     <div className="rounded-lg bg-slate-800/50 p-4">
@@ -34,13 +49,13 @@ export function AlertsFeed() {
       </div>
       {isLoading ? (
         <div className="text-slate-500 text-sm">Loading…</div>
-      ) : filtered.length === 0 ? (
+      ) : alerts.length === 0 ? (
         <div className="text-slate-500 text-sm">No alerts</div>
       ) : (
         <ul className="space-y-2 max-h-64 overflow-y-auto">
-          {filtered.map((alert, i) => (
+          {alerts.map((alert, i) => (
             <li
-              key={`${alert.ticker}-${alert.ts}-${i}`}
+              key={alert.id ?? `${alert.ticker}-${alert.ts}-${i}`}
               className={`rounded border p-2 text-sm ${SEVERITY_COLOR[alert.severity] || 'bg-slate-700/50 text-slate-400 border-slate-600'}`}
             >
               <span className="font-mono font-medium">{alert.ticker}</span>
@@ -1,8 +1,14 @@
 import { useMemo } from 'react'
 import { useStore } from '../store'
+import { Sparkline } from './Sparkline'
 
 export function IndicatorsPanel({ ticker }) {
   const metrics = useStore((s) => s.metrics)
+  const history = useStore((s) => s.history)
+  const prices = useMemo(
+    () => history.map((m) => Number(m.price)).filter((p) => Number.isFinite(p) && p > 0),
+    [history]
+  )
 
   const ts = metrics?.ts ? Number(metrics.ts) : null
   const lastUpdated = useMemo(() => {
@@ -17,7 +23,9 @@ export function IndicatorsPanel({ ticker }) {
       <h2 className="text-lg font-semibold text-slate-200">Indicators — {ticker}</h2>
 
       <div className="grid gap-3">
-        <Card title="Price" value={metrics?.price != null ? `$${Number(metrics.price).toFixed(2)}` : '—'} />
+        <Card title="Price" value={metrics?.price != null ? `$${Number(metrics.price).toFixed(2)}` : '—'}>
+          <Sparkline values={prices} />
+        </Card>
         <Card title="VWAP (1m)" value={metrics?.vwap_1m != null ? `$${Number(metrics.vwap_1m).toFixed(2)}` : '—'} />
         <Card
           title="EMA-9 / EMA-21"
@@ -38,7 +46,7 @@ export function IndicatorsPanel({ ticker }) {
   )
 }
 
-function Card({ title, value, badge }) {
+function Card({ title, value, badge, children }) {
   return (
     <div className="rounded bg-slate-700/50 p-3">
       <div className="text-slate-400 text-xs uppercase tracking-wide">{title}</div>
@@ -48,6 +56,7 @@ function Card({ title, value, badge }) {
           {badge}
         </span>
       )}
+      {children}
     </div>
   )
 }
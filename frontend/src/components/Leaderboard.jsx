@@ -1,12 +1,22 @@
 import { useQuery } from '@tanstack/react-query'
-import { fetchTopMovers } from '../api'
+import { fetchIntradayLeaderboard, fetchTopMovers } from '../api'
 
 export function Leaderboard() {
-  const { data, isLoading, isError } = useQuery({
+  // Live ranks from the streaming job; the nightly report fills in before the first trade of the day
+  const intraday = useQuery({
+    queryKey: ['leaderboard', 'intraday'],
+    queryFn: () => fetchIntradayLeaderboard(5),
+    refetchInterval: 5_000,
+  })
+  const hasIntraday = Boolean(intraday.data?.gainers?.length || intraday.data?.losers?.length)
+  const nightly = useQuery({
     queryKey: ['topMovers'],
     queryFn: fetchTopMovers,
     refetchInterval: 60_000,
+    enabled: intraday.isFetched && !hasIntraday,
   })
+  const { data, isError } = hasIntraday ? intraday : nightly
+  const isLoading = intraday.isLoading || (!hasIntraday && nightly.isLoading)
 
   if (isLoading) {
     return (
@@ -32,13 +42,15 @@ export function Leaderboard() {
 
   const gainers = data.gainers || []
   const losers = data.losers || []
-  const generatedAt = data.generated_at
+  const generatedAt = hasIntraday ? data.updated_at : data.generated_at
 
   return (
     <div className="rounded-lg bg-slate-800/50 p-4">
       <h2 className="text-lg font-semibold text-slate-200 mb-2">Top Gainers / Losers</h2>
       {generatedAt && (
-        <p className="text-slate-500 text-xs mb-3">Last updated: {generatedAt}</p>
+        <p className="text-slate-500 text-xs mb-3">
+          {hasIntraday ? 'Intraday, live' : 'Nightly report'} · Last updated: {generatedAt}
+        </p>
       )}
       <div className="grid grid-cols-2 gap-4">
         <div>
@@ -0,0 +1,26 @@
+import { useMemo } from 'react'
+
+export function Sparkline({ values, width = 240, height = 40 }) {
+  const points = useMemo(() => {
+    if (values.length < 2) return null
+    const min = Math.min(...values)
+    const span = Math.max(...values) - min || 1
+    const step = width / (values.length - 1)
+    return values
+      .map((v, i) => `${(i * step).toFixed(1)},${(height - ((v - min) / span) * height).toFixed(1)}`)
+      .join(' ')
+  }, [values, width, height])
+
+  if (!points) return null
+  const rising = values[values.length - 1] >= values[0]
+  return (
+    <svg viewBox={`0 0 ${width} ${height}`} className="w-full h-10 mt-2" preserveAspectRatio="none">
+      <polyline
+        points={points}
+        fill="none"
+        strokeWidth="1.5"
+        className={rising ? 'stroke-green-400' : 'stroke-red-400'}
+      />
+    </svg>
+  )
+}
@@ -8,7 +8,10 @@ const BACKOFF_BASE = 1000
 export function useMarketSocket(ticker) {
   const wsRef = useRef(null)
   const retryCount = useRef(0)
+  const lastId = useRef(null)
   const setMetrics = useStore((s) => s.setMetrics)
+  const appendHistory = useStore((s) => s.appendHistory)
+  const resetHistory = useStore((s) => s.resetHistory)
   const setReconnectStatus = useStore((s) => s.setReconnectStatus)
 
   const connect = useCallback(() => {
@@ -20,13 +23,24 @@ export function useMarketSocket(ticker) {
     ws.onopen = () => {
       retryCount.current = 0
       setReconnectStatus(null)
-      ws.send(JSON.stringify({ ticker }))
+      // last_id lets the server replay only what was missed while disconnected
+      ws.send(JSON.stringify({ ticker, last_id: lastId.current }))
     }
 
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data)
-        setMetrics(data)
+        if (data.type === 'history') {
+          if (data.items.length === 0) return
+          appendHistory(data.items)
+          const last = data.items[data.items.length - 1]
+          lastId.current = last.id
+          setMetrics(last)
+        } else if (data.type === 'metrics') {
+          appendHistory([data])
+          lastId.current = data.id
+          setMetrics(data)
+        }
       } catch (_) {}
     }
 
@@ -42,9 +56,11 @@ export function useMarketSocket(ticker) {
       retryCount.current += 1
       setTimeout(() => connect(), Math.min(delay, 30000))
     }
-  }, [ticker, setMetrics, setReconnectStatus])
+  }, [ticker, setMetrics, appendHistory, setReconnectStatus])
 
   useEffect(() => {
+    lastId.current = null
+    resetHistory()
     connect()
     return () => {
       if (wsRef.current) {
@@ -53,7 +69,7 @@ export function useMarketSocket(ticker) {
       }
       setReconnectStatus(null)
     }
-  }, [connect])
+  }, [connect, resetHistory])
 
   return { reconnectStatus: useStore((s) => s.reconnectStatus) }
 }
@@ -1,5 +1,7 @@
 import { create } from 'zustand'
 
+const MAX_HISTORY = 720
+
 export const useStore = create((set) => ({
   selectedTicker: 'AAPL',
   setSelectedTicker: (ticker) => set({ selectedTicker: ticker }),
@@ -7,6 +9,12 @@ export const useStore = create((set) => ({
   metrics: null,
   setMetrics: (metrics) => set({ metrics }),
 
+  // Live metrics entries for the selected ticker, oldest first
+  history: [],
+  appendHistory: (items) =>
+    set((s) => ({ history: [...s.history, ...items].slice(-MAX_HISTORY) })),
+  resetHistory: () => set({ history: [], metrics: null }),
+
   alerts: [],
   setAlerts: (alerts) => set({ alerts }),
 
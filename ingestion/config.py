@@ -20,3 +20,24 @@ NUM_PARTITIONS = 5
 REPLICATION_FACTOR = 1
 
 FINNHUB_WS_URL = "wss://ws.finnhub.io"
+
+# "decimal" publishes float prices; "fixed" publishes price_fx = round(price * 10^scale) plus scale
+PRICE_ENCODING = os.environ.get("PRICE_ENCODING", "decimal")
+PRICE_SCALE_DEFAULT = int(os.environ.get("PRICE_SCALE_DEFAULT", "4"))
+
+
+def parse_price_scales(value: str) -> dict[str, int]:
+    """'BTC-USD:2,EURUSD:5' -> {'BTC-USD': 2, 'EURUSD': 5}"""
+    scales = {}
+    for item in value.split(","):
+        symbol, _, scale = item.strip().partition(":")
+        if symbol and scale:
+            scales[symbol] = int(scale)
+    return scales
+
+
+PRICE_SCALES = parse_price_scales(os.environ.get("PRICE_SCALES", ""))
+
+
+def price_scale(symbol: str) -> int:
+    return PRICE_SCALES.get(symbol, PRICE_SCALE_DEFAULT)
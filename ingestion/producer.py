@@ -2,6 +2,7 @@
 Finnhub WebSocket → Kafka producer.
 Subscribes to tickers, deserializes trade JSON, publishes to trades-raw with key=symbol.
 Exponential backoff for WebSocket and Kafka; never crash on Kafka unavailable.
+With PRICE_ENCODING=fixed, payloads carry price_fx (int) and scale instead of price.
 """
 import json
 import logging
@@ -17,8 +18,10 @@ from config import (
     FINNHUB_WS_URL,
     FINNHUB_API_KEY,
     KAFKA_BOOTSTRAP_SERVERS,
+    PRICE_ENCODING,
     TICKERS,
     TOPIC_RAW,
+    price_scale,
 )
 from topics import ensure_topics
 
@@ -74,6 +77,10 @@ def on_message(ws: websocket.WebSocketApp, message: str, producer: Producer):
             "timestamp": trade.get("t"),
             "conditions": trade.get("c", []),
         }
+        if PRICE_ENCODING == "fixed" and payload["price"] is not None:
+            scale = price_scale(symbol)
+            payload["price_fx"] = round(payload.pop("price") * 10 ** scale)
+            payload["scale"] = scale
         value = json.dumps(payload).encode("utf-8")
         key = symbol.encode("utf-8")
         try:
@@ -23,3 +23,8 @@ def test_topics_defined():
 
 def test_partitions():
     assert NUM_PARTITIONS == 5
+
+
+def test_price_scales_parsed():
+    from config import parse_price_scales
+    assert parse_price_scales("BTC-USD:2, EURUSD:5,,bad") == {"BTC-USD": 2, "EURUSD": 5}
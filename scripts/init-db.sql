@@ -1,32 +1,173 @@
 -- Stock Analytics Platform: PostgreSQL schema
 -- Used by stream layer (alerts), batch layer (OHLCV, reports), and API.
 
--- Raw trade events (can be written by stream processor or backfill job)
+-- Fixed-point price scale per symbol: with PRICE_ENCODING=fixed, prices are
+-- stored as BIGINT price * 10^scale in the *_fx columns below and the NUMERIC
+-- columns stay NULL. A symbol's scale never changes once registered (writers
+-- rescale to it), so stored values decode with one lookup per symbol.
+CREATE TABLE IF NOT EXISTS symbol_scales (
+    symbol VARCHAR(20) PRIMARY KEY,
+    scale  SMALLINT NOT NULL CHECK (scale BETWEEN 0 AND 8)
+);
+
+-- Migration from the original single-heap raw_trades: initdb only runs this
+-- file on a fresh volume, and CREATE TABLE IF NOT EXISTS below would keep the
+-- old heap. Re-running this file against an existing database moves the heap
+-- aside here and copies it into the daily partitions after they are defined.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('raw_trades') AND relkind = 'r') THEN
+        ALTER TABLE raw_trades RENAME TO raw_trades_heap;
+        ALTER TABLE raw_trades_heap RENAME CONSTRAINT raw_trades_pkey TO raw_trades_heap_pkey;
+        ALTER INDEX IF EXISTS idx_raw_trades_symbol_ts RENAME TO idx_raw_trades_heap_symbol_ts;
+        ALTER INDEX IF EXISTS idx_raw_trades_created_at RENAME TO idx_raw_trades_heap_created_at;
+        ALTER SEQUENCE IF EXISTS raw_trades_id_seq RENAME TO raw_trades_heap_id_seq;
+    END IF;
+END $$;
+
+-- Raw trade events (can be written by stream processor or backfill job).
+-- Range-partitioned by UTC day on trade_ts (epoch ms) as raw_trades_pYYYYMMDD.
+-- Partitions are created ahead by create_raw_trades_partitions() (called here
+-- and by the nightly batch job); retention detaches and drops whole partitions.
+-- Exactly one of price (NUMERIC) / price_fx (fixed-point, see symbol_scales) is set.
 CREATE TABLE IF NOT EXISTS raw_trades (
-    id          BIGSERIAL PRIMARY KEY,
+    id          BIGSERIAL,
     symbol      VARCHAR(20) NOT NULL,
-    price       NUMERIC(20, 8) NOT NULL,
+    price       NUMERIC(20, 8),
+    price_fx    BIGINT,
     volume      BIGINT NOT NULL,
     trade_ts    BIGINT NOT NULL,
     conditions  TEXT[],
-    created_at  TIMESTAMPTZ DEFAULT NOW()
-);
+    created_at  TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (id, trade_ts),
+    CHECK ((price IS NULL) <> (price_fx IS NULL))
+) PARTITION BY RANGE (trade_ts);
 CREATE INDEX IF NOT EXISTS idx_raw_trades_symbol_ts ON raw_trades (symbol, trade_ts);
-CREATE INDEX IF NOT EXISTS idx_raw_trades_created_at ON raw_trades (created_at);
+-- Rows arrive roughly in time order, so BRIN summaries stay tight and tiny
+CREATE INDEX IF NOT EXISTS idx_raw_trades_ts_brin ON raw_trades USING brin (trade_ts) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS idx_raw_trades_created_at ON raw_trades USING brin (created_at) WITH (pages_per_range = 32);
+-- Catches trades outside any daily partition; rows are moved out when their day's partition is created
+CREATE TABLE IF NOT EXISTS raw_trades_default PARTITION OF raw_trades DEFAULT;
+
+CREATE OR REPLACE FUNCTION create_raw_trades_partitions(start_day DATE, n_days INT)
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    d       DATE;
+    lo      BIGINT;
+    hi      BIGINT;
+    part    TEXT;
+    created INT := 0;
+BEGIN
+    FOR i IN 0 .. n_days - 1 LOOP
+        d := start_day + i;
+        part := 'raw_trades_p' || to_char(d, 'YYYYMMDD');
+        CONTINUE WHEN to_regclass(part) IS NOT NULL;
+        lo := (extract(epoch FROM d::timestamp AT TIME ZONE 'UTC') * 1000)::bigint;
+        hi := lo + 86400000;
+        IF EXISTS (SELECT 1 FROM raw_trades_default WHERE trade_ts >= lo AND trade_ts < hi) THEN
+            EXECUTE format('CREATE TABLE %I (LIKE raw_trades INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM raw_trades_default WHERE trade_ts >= %s AND trade_ts < %s RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved', lo, hi, part);
+            EXECUTE format('ALTER TABLE raw_trades ATTACH PARTITION %I FOR VALUES FROM (%s) TO (%s)', part, lo, hi);
+        ELSE
+            EXECUTE format('CREATE TABLE %I PARTITION OF raw_trades FOR VALUES FROM (%s) TO (%s)', part, lo, hi);
+        END IF;
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END $$;
 
--- Daily OHLCV (batch job output)
+SELECT create_raw_trades_partitions(CURRENT_DATE - 7, 15);
+
+-- Second half of the migration above: one partition per day the old heap
+-- covers, then copy (ids kept) and drop the heap. Atomic, so a failed run
+-- leaves raw_trades_heap in place to retry.
+DO $$
+DECLARE
+    first_day DATE;
+BEGIN
+    IF to_regclass('raw_trades_heap') IS NULL THEN
+        RETURN;
+    END IF;
+    SELECT (to_timestamp(min(trade_ts) / 1000.0) AT TIME ZONE 'UTC')::date INTO first_day FROM raw_trades_heap;
+    IF first_day < CURRENT_DATE - 7 THEN
+        PERFORM create_raw_trades_partitions(first_day, CURRENT_DATE - 7 - first_day);
+    END IF;
+    INSERT INTO raw_trades (id, symbol, price, volume, trade_ts, conditions, created_at)
+    SELECT id, symbol, price, volume, trade_ts, conditions, created_at FROM raw_trades_heap;
+    PERFORM setval(pg_get_serial_sequence('raw_trades', 'id'), max(id)) FROM raw_trades_heap HAVING max(id) IS NOT NULL;
+    DROP TABLE raw_trades_heap;
+END $$;
+
+-- Daily OHLCV (batch job output); NUMERIC prices, or *_fx with PRICE_ENCODING=fixed
 CREATE TABLE IF NOT EXISTS ohlcv_daily (
     id        SERIAL PRIMARY KEY,
     symbol    VARCHAR(20) NOT NULL,
     date      DATE NOT NULL,
-    open      NUMERIC(20, 8) NOT NULL,
-    high      NUMERIC(20, 8) NOT NULL,
-    low       NUMERIC(20, 8) NOT NULL,
-    close     NUMERIC(20, 8) NOT NULL,
+    open      NUMERIC(20, 8),
+    high      NUMERIC(20, 8),
+    low       NUMERIC(20, 8),
+    close     NUMERIC(20, 8),
+    open_fx   BIGINT,
+    high_fx   BIGINT,
+    low_fx    BIGINT,
+    close_fx  BIGINT,
     volume    BIGINT NOT NULL,
-    UNIQUE (symbol, date)
+    UNIQUE (symbol, date),
+    CHECK ((close IS NULL) <> (close_fx IS NULL))
 );
+-- Databases created before the *_fx columns (re-run this file to upgrade, like raw_trades above)
+ALTER TABLE ohlcv_daily
+    ADD COLUMN IF NOT EXISTS open_fx BIGINT,
+    ADD COLUMN IF NOT EXISTS high_fx BIGINT,
+    ADD COLUMN IF NOT EXISTS low_fx BIGINT,
+    ADD COLUMN IF NOT EXISTS close_fx BIGINT,
+    ALTER COLUMN open DROP NOT NULL,
+    ALTER COLUMN high DROP NOT NULL,
+    ALTER COLUMN low DROP NOT NULL,
+    ALTER COLUMN close DROP NOT NULL;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = 'ohlcv_daily'::regclass AND contype = 'c') THEN
+        ALTER TABLE ohlcv_daily ADD CHECK ((close IS NULL) <> (close_fx IS NULL));
+    END IF;
+END $$;
 CREATE INDEX IF NOT EXISTS idx_ohlcv_daily_symbol_date ON ohlcv_daily (symbol, date);
+-- max(date): the batch job only regenerates reports for the latest session
+CREATE INDEX IF NOT EXISTS idx_ohlcv_daily_date ON ohlcv_daily (date);
+
+-- One-off conversion when switching a deployment to PRICE_ENCODING=fixed:
+-- registers unseen symbols at default_scale, then rewrites NUMERIC rows as *_fx
+CREATE OR REPLACE FUNCTION encode_fixed_point_prices(default_scale SMALLINT DEFAULT 4)
+RETURNS BIGINT LANGUAGE plpgsql AS $$
+DECLARE
+    converted BIGINT;
+    n         BIGINT;
+BEGIN
+    INSERT INTO symbol_scales (symbol, scale)
+    SELECT DISTINCT symbol, default_scale FROM raw_trades WHERE price IS NOT NULL
+    UNION
+    SELECT DISTINCT symbol, default_scale FROM ohlcv_daily WHERE close IS NOT NULL
+    ON CONFLICT (symbol) DO NOTHING;
+
+    UPDATE raw_trades r
+    SET price_fx = round(r.price * 10::numeric ^ s.scale)::bigint, price = NULL
+    FROM symbol_scales s
+    WHERE s.symbol = r.symbol AND r.price IS NOT NULL;
+    GET DIAGNOSTICS converted = ROW_COUNT;
+
+    UPDATE ohlcv_daily o
+    SET open_fx = round(o.open * 10::numeric ^ s.scale)::bigint,
+        high_fx = round(o.high * 10::numeric ^ s.scale)::bigint,
+        low_fx = round(o.low * 10::numeric ^ s.scale)::bigint,
+        close_fx = round(o.close * 10::numeric ^ s.scale)::bigint,
+        open = NULL, high = NULL, low = NULL, close = NULL
+    FROM symbol_scales s
+    WHERE s.symbol = o.symbol AND o.close IS NOT NULL;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN converted + n;
+END $$;
 
 -- Anomaly alerts (stream processor writes here)
 CREATE TABLE IF NOT EXISTS alerts (
@@ -36,11 +177,32 @@ CREATE TABLE IF NOT EXISTS alerts (
     severity   VARCHAR(20) NOT NULL,
     value      NUMERIC(20, 8),
     ts         TIMESTAMPTZ NOT NULL,
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    -- One alert per window: Spark retries and overlapping batches hit ON CONFLICT DO NOTHING
+    UNIQUE (ticker, alert_type, ts)
 );
-CREATE INDEX IF NOT EXISTS idx_alerts_ticker_ts ON alerts (ticker, ts);
+-- (ts, id) ordering backs keyset pagination in GET /api/alerts.
+-- New name so existing databases get it; it supersedes the old (ticker, ts) index.
+CREATE INDEX IF NOT EXISTS idx_alerts_ticker_ts_id ON alerts (ticker, ts DESC, id DESC);
+DROP INDEX IF EXISTS idx_alerts_ticker_ts;
+CREATE INDEX IF NOT EXISTS idx_alerts_ts_id ON alerts (ts DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts (created_at DESC);
 
+-- Alerts committed here but not yet in a committed trades-alerts transaction
+CREATE TABLE IF NOT EXISTS alerts_outbox (
+    alert_id INT PRIMARY KEY REFERENCES alerts (id) ON DELETE CASCADE
+);
+
+-- Last micro-batch each streaming query committed to PostgreSQL: Spark batch_id and the
+-- StreamingQuery id (run_id), which stays the same across restarts from one checkpoint
+CREATE TABLE IF NOT EXISTS stream_batches (
+    query_name   VARCHAR(50) PRIMARY KEY,
+    batch_id     BIGINT NOT NULL,
+    run_id       VARCHAR(64),
+    committed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+ALTER TABLE stream_batches ADD COLUMN IF NOT EXISTS run_id VARCHAR(64);
+
 -- Top movers report (batch job)
 CREATE TABLE IF NOT EXISTS top_movers (
     id           SERIAL PRIMARY KEY,
@@ -65,6 +227,24 @@ CREATE TABLE IF NOT EXISTS most_volatile (
 );
 CREATE INDEX IF NOT EXISTS idx_most_volatile_generated ON most_volatile (generated_at DESC);
 
+-- Rolling multi-day analytics per symbol (batch job), one row per window.
+-- last_date is the symbol's latest session on or before as_of_date; volatilities are annualized.
+CREATE TABLE IF NOT EXISTS rolling_metrics (
+    symbol        VARCHAR(20) NOT NULL,
+    as_of_date    DATE NOT NULL,
+    window_days   SMALLINT NOT NULL,
+    last_date     DATE,
+    return_pct    NUMERIC(12, 4),
+    realized_vol  NUMERIC(12, 6),
+    parkinson_vol NUMERIC(12, 6),
+    atr           NUMERIC(20, 8),
+    avg_volume    NUMERIC(20, 2),
+    last_close    NUMERIC(20, 8),
+    generated_at  TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (as_of_date, window_days, symbol)
+);
+CREATE INDEX IF NOT EXISTS idx_rolling_metrics_symbol ON rolling_metrics (symbol, as_of_date DESC);
+
 -- Batch job execution log
 CREATE TABLE IF NOT EXISTS job_logs (
     id          SERIAL PRIMARY KEY,
@@ -76,3 +256,22 @@ CREATE TABLE IF NOT EXISTS job_logs (
     message     TEXT
 );
 CREATE INDEX IF NOT EXISTS idx_job_logs_job_started ON job_logs (job_name, started_at DESC);
+
+-- Per-day watermark for incremental batch runs: a trade date is reprocessed
+-- when it has no row here or raw_trades gained rows after processed_at
+CREATE TABLE IF NOT EXISTS batch_watermarks (
+    trade_date     DATE PRIMARY KEY,
+    processed_at   TIMESTAMPTZ NOT NULL,
+    rows_processed BIGINT
+);
+
+-- Days of raw_trades exported to Parquet cold storage (batch-processing/archive.py);
+-- retention only drops a day's partition once it appears here
+CREATE TABLE IF NOT EXISTS raw_trades_archive (
+    trade_date    DATE PRIMARY KEY,
+    archived_at   TIMESTAMPTZ NOT NULL,
+    rows_archived BIGINT NOT NULL,
+    symbols       INT NOT NULL,
+    bytes         BIGINT NOT NULL,
+    path          TEXT NOT NULL
+);
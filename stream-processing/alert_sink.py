@@ -0,0 +1,305 @@
+"""
+Exactly-once alert emission for the streaming job's alerts query.
+
+One AlertSink lives as long as the driver (foreachBatch runs there). It
+holds a psycopg2 ThreadedConnectionPool, a Redis client and one
+transactional confluent-kafka producer. All three are created on first use,
+not per micro-batch. write_batch(batch_id, alerts) runs in two steps.
+
+1. One PostgreSQL transaction inserts the alerts:
+   - If stream_batches already records this batch_id and run_id (the
+     StreamingQuery id, kept in the checkpoint) for the query, this is a
+     Spark retry of a committed batch and is skipped. A new or reset
+     checkpoint gets a new id, so its batch ids restarting from 0 are not
+     mistaken for retries.
+   - Otherwise the alerts are bulk-inserted with ON CONFLICT
+     (ticker, alert_type, ts) DO NOTHING, which drops windows an earlier
+     batch already emitted.
+   - The rows actually inserted are queued in alerts_outbox, and batch_id and
+     run_id are recorded.
+2. The outbox is published:
+   - Queued alerts are produced to trades-alerts in id order inside one
+     Kafka transaction. They leave the outbox once it commits.
+   - The rows inserted in step 1 are then published on the Redis alerts
+     channel.
+   - A failure here leaves the outbox intact for the next batch.
+
+Crash recovery:
+- A process can die between a Kafka commit and the outbox delete. The next
+  producer (same transactional.id, so init_transactions() also fences the
+  old one) reads the tail of trades-alerts with read_committed.
+- It then drops outbox rows up to the highest alert id found there, so no
+  alert is produced twice. Messages without an id (written before the
+  outbox existed) are ignored.
+- Consumers of trades-alerts should read with isolation.level=read_committed.
+"""
+import contextlib
+import json
+import logging
+import time
+
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# Outbox rows produced per Kafka transaction
+OUTBOX_BATCH_ROWS = 10_000
+# Offsets per partition read back from the topic tail on producer start
+RECOVERY_TAIL_OFFSETS = 500
+KAFKA_TIMEOUT_S = 30
+
+INSERT_SQL = """
+    WITH inserted AS (
+        INSERT INTO alerts (ticker, alert_type, severity, value, ts) VALUES %s
+        ON CONFLICT (ticker, alert_type, ts) DO NOTHING
+        RETURNING id, ticker, alert_type, severity, value, ts
+    ), queued AS (
+        INSERT INTO alerts_outbox (alert_id) SELECT id FROM inserted
+    )
+    SELECT * FROM inserted ORDER BY id
+"""
+
+
+def alert_payload(row) -> dict:
+    """(id, ticker, alert_type, severity, value, ts) as published to Redis and Kafka."""
+    alert_id, ticker, alert_type, severity, value, ts = row
+    return {
+        "id": alert_id,
+        "ticker": ticker,
+        "type": alert_type,
+        "severity": severity,
+        "value": float(value) if value is not None else None,
+        "ts": ts.isoformat(),
+    }
+
+
+def published_id(value) -> int | None:
+    """The outbox alert id of a trades-alerts message, or None.
+
+    Messages from before the outbox (the old per-batch producer sent
+    {ticker, type, severity, value, ts}) and tombstones carry no id.
+    """
+    try:
+        alert_id = json.loads(value).get("id")
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return alert_id if isinstance(alert_id, int) and not isinstance(alert_id, bool) else None
+
+
+class AlertSink:
+    def __init__(
+        self,
+        pg: dict,
+        bootstrap_servers: str,
+        topic: str,
+        transactional_id: str,
+        redis_host: str,
+        redis_port: int,
+        channel: str,
+        query_name: str = "alerts",
+        run_id: str | None = None,
+    ):
+        self.pg = pg
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.transactional_id = transactional_id
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+        self.channel = channel
+        self.query_name = query_name
+        # Set by the streaming job to the query's id once it has started
+        self.run_id = run_id
+        self._pool = None
+        self._kafka = None
+        self._redis = None
+        # Unknown after a restart; False once the outbox has been drained and nothing was queued since
+        self._outbox_pending = True
+
+    @contextlib.contextmanager
+    def _connection(self):
+        if self._pool is None:
+            self._pool = ThreadedConnectionPool(1, 2, **self.pg)
+        conn = self._pool.getconn()
+        try:
+            yield conn
+        except BaseException:
+            # The connection may be mid-transaction or dead; replace it
+            self._pool.putconn(conn, close=True)
+            raise
+        self._pool.putconn(conn)
+
+    def write_batch(self, batch_id: int, alerts: list[tuple]) -> int:
+        """Insert (ticker, alert_type, severity, value, ts) rows once and publish them. Returns rows inserted."""
+        inserted = self.insert(batch_id, alerts)
+        if inserted:
+            self._outbox_pending = True
+        if self._outbox_pending:
+            try:
+                with profiling.timer("sink.alerts.kafka"):
+                    self.publish_outbox()
+            except Exception as e:
+                logger.warning("Kafka alert produce failed, alerts stay in the outbox: %s", e)
+        if inserted:
+            try:
+                with profiling.timer("sink.alerts.redis"):
+                    self._publish_live(inserted)
+            except Exception as e:
+                logger.warning("Redis alert publish failed: %s", e)
+        return len(inserted)
+
+    @profiling.timed("sink.alerts.postgres")
+    def insert(self, batch_id: int, alerts: list[tuple]) -> list[tuple]:
+        """Step 1: the rows newly inserted by this batch, or [] if it was already committed."""
+        with self._connection() as conn, conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT batch_id, run_id FROM stream_batches WHERE query_name = %s FOR UPDATE",
+                    (self.query_name,),
+                )
+                last = cur.fetchone()
+                # Only the same batch of the same query (checkpoint) is a retry
+                if last is not None and tuple(last) == (batch_id, self.run_id):
+                    logger.info("Alerts batch %s of run %s already committed, skipping", batch_id, self.run_id)
+                    return []
+                inserted = []
+                if alerts:
+                    inserted = execute_values(cur, INSERT_SQL, alerts, page_size=len(alerts), fetch=True)
+                cur.execute(
+                    """
+                    INSERT INTO stream_batches (query_name, batch_id, run_id, committed_at) VALUES (%s, %s, %s, NOW())
+                    ON CONFLICT (query_name) DO UPDATE SET
+                      batch_id = EXCLUDED.batch_id, run_id = EXCLUDED.run_id, committed_at = EXCLUDED.committed_at
+                    """,
+                    (self.query_name, batch_id, self.run_id),
+                )
+        return inserted
+
+    def publish_outbox(self) -> int:
+        """Step 2: produce queued alerts in Kafka transactions until the outbox is empty. Returns alerts produced."""
+        from confluent_kafka import KafkaException
+
+        produced = 0
+        with self._connection() as conn:
+            producer = self._producer(conn)
+            while True:
+                with conn, conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT a.id, a.ticker, a.alert_type, a.severity, a.value, a.ts
+                        FROM alerts_outbox o
+                        JOIN alerts a ON a.id = o.alert_id
+                        ORDER BY o.alert_id
+                        LIMIT %s
+                        """,
+                        (OUTBOX_BATCH_ROWS,),
+                    )
+                    rows = cur.fetchall()
+                if not rows:
+                    self._outbox_pending = False
+                    return produced
+                producer.begin_transaction()
+                try:
+                    for row in rows:
+                        producer.produce(self.topic, key=row[1].encode(), value=json.dumps(alert_payload(row)).encode())
+                    producer.commit_transaction(KAFKA_TIMEOUT_S)
+                except Exception as e:
+                    if isinstance(e, KafkaException) and e.args[0].fatal():
+                        self._kafka = None
+                    else:
+                        self._abort(producer)
+                    raise
+                try:
+                    with conn, conn.cursor() as cur:
+                        cur.execute("DELETE FROM alerts_outbox WHERE alert_id = ANY(%s)", ([r[0] for r in rows],))
+                except Exception:
+                    # These alerts are committed in Kafka; a new producer re-reads the topic tail first
+                    self._kafka = None
+                    raise
+                produced += len(rows)
+
+    def _abort(self, producer):
+        from confluent_kafka import KafkaException
+
+        try:
+            producer.abort_transaction(KAFKA_TIMEOUT_S)
+        except KafkaException as e:
+            logger.warning("Could not abort the alerts transaction, recreating the producer: %s", e)
+            self._kafka = None
+
+    def _producer(self, conn):
+        if self._kafka is not None:
+            return self._kafka
+        from confluent_kafka import Producer
+
+        producer = Producer({
+            "bootstrap.servers": self.bootstrap_servers,
+            "transactional.id": self.transactional_id,
+            "enable.idempotence": True,
+            "linger.ms": 5,
+        })
+        # Aborts whatever a previous producer with this id left open and fences it out
+        producer.init_transactions(KAFKA_TIMEOUT_S)
+        published = self._last_published_id()
+        with conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM alerts_outbox WHERE alert_id <= %s", (published,))
+            if cur.rowcount:
+                logger.info("Dropped %d outbox alerts already in %s (up to id %d)", cur.rowcount, self.topic, published)
+        self._kafka = producer
+        return producer
+
+    def _last_published_id(self) -> int:
+        """Highest alert id in a committed transaction on the topic (0 if none)."""
+        from confluent_kafka import Consumer, KafkaError, KafkaException, TopicPartition
+
+        consumer = Consumer({
+            "bootstrap.servers": self.bootstrap_servers,
+            "group.id": f"{self.transactional_id}-recovery",
+            "isolation.level": "read_committed",
+            "enable.auto.commit": False,
+            "enable.partition.eof": True,
+        })
+        try:
+            metadata = consumer.list_topics(self.topic, timeout=KAFKA_TIMEOUT_S).topics.get(self.topic)
+            if metadata is None or metadata.error is not None:
+                return 0
+            tails = []
+            for p in metadata.partitions:
+                low, high = consumer.get_watermark_offsets(TopicPartition(self.topic, p), timeout=KAFKA_TIMEOUT_S)
+                if high > low:
+                    tails.append(TopicPartition(self.topic, p, max(low, high - RECOVERY_TAIL_OFFSETS)))
+            if not tails:
+                return 0
+            consumer.assign(tails)
+            pending = {tp.partition for tp in tails}
+            last_id = 0
+            deadline = time.monotonic() + KAFKA_TIMEOUT_S
+            while pending:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"reading the tail of {self.topic} timed out")
+                msg = consumer.poll(1.0)
+                if msg is None:
+                    continue
+                if msg.error():
+                    if msg.error().code() == KafkaError._PARTITION_EOF:
+                        pending.discard(msg.partition())
+                        continue
+                    raise KafkaException(msg.error())
+                alert_id = published_id(msg.value())
+                if alert_id is not None:
+                    last_id = max(last_id, alert_id)
+            return last_id
+        finally:
+            consumer.close()
+
+    def _publish_live(self, rows):
+        """Push newly inserted alerts to API SSE clients via the shared Redis alerts channel."""
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis(host=self.redis_host, port=self.redis_port)
+        pipe = self._redis.pipeline(transaction=False)
+        for row in rows:
+            pipe.publish(self.channel, json.dumps(alert_payload(row)))
+        pipe.execute()
@@ -0,0 +1,169 @@
+"""
+Benchmark the alerts write path: per-batch connection + row-by-row INSERT
+(the old _compute_and_write_alerts) against AlertSink.insert (pooled
+connection, one ON CONFLICT bulk insert + outbox + batch ledger).
+
+Synthetic micro-batches re-emit --overlap of the previous batch's windows,
+as consecutive Spark batches do, and every --retry-every-th batch is run
+twice under the same batch_id, as a Spark retry would be. Each path writes
+to its own scratch schema; the report shows per-batch latency and how many
+duplicate (ticker, alert_type, ts) rows each left behind. Kafka and Redis
+are not involved (the outbox is left undrained).
+
+Run from stream-processing/ against any PostgreSQL database (PG_* env as for the job):
+
+    python -m benchmarks.bench_alert_sink --batches 200 --alerts-per-batch 5 50 500
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg2
+
+from alert_sink import AlertSink
+
+PG = {
+    "host": os.environ.get("PG_HOST", "localhost"),
+    "port": int(os.environ.get("PG_PORT", "5432")),
+    "dbname": os.environ.get("PG_DATABASE", "stock_analytics"),
+    "user": os.environ.get("PG_USER", "stock"),
+    "password": os.environ.get("PG_PASSWORD", "stock"),
+}
+SCHEMAS = ("bench_alerts_legacy", "bench_alerts_sink")
+
+DDL = """
+CREATE TABLE {schema}.alerts (
+    id         SERIAL PRIMARY KEY,
+    ticker     VARCHAR(20) NOT NULL,
+    alert_type VARCHAR(50) NOT NULL,
+    severity   VARCHAR(20) NOT NULL,
+    value      NUMERIC(20, 8),
+    ts         TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+    {unique}
+);
+CREATE TABLE {schema}.alerts_outbox (
+    alert_id INT PRIMARY KEY REFERENCES {schema}.alerts (id) ON DELETE CASCADE
+);
+CREATE TABLE {schema}.stream_batches (
+    query_name   VARCHAR(50) PRIMARY KEY,
+    batch_id     BIGINT NOT NULL,
+    run_id       VARCHAR(64),
+    committed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+
+def _connect(schema=None):
+    options = {"options": f"-c search_path={schema}"} if schema else {}
+    return psycopg2.connect(**PG, **options)
+
+
+def setup(conn):
+    with conn, conn.cursor() as cur:
+        for schema in SCHEMAS:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+            # The legacy path has no unique key to conflict on, as before
+            unique = "" if schema == "bench_alerts_legacy" else ", UNIQUE (ticker, alert_type, ts)"
+            cur.execute(DDL.format(schema=schema, unique=unique))
+
+
+def teardown(conn):
+    with conn, conn.cursor() as cur:
+        for schema in SCHEMAS:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+
+
+def make_batches(n_batches: int, per_batch: int, overlap: float, retry_every: int, seed: int):
+    """[(batch_id, alerts)], with repeated batch_ids standing in for Spark retries."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 2, 14, 30)
+    window = 0
+    prev = []
+    batches = []
+    for batch_id in range(n_batches):
+        n_old = min(len(prev), int(per_batch * overlap))
+        alerts = prev[len(prev) - n_old:]
+        while len(alerts) < per_batch:
+            ts = (start + timedelta(minutes=window // 1000)).isoformat()
+            alerts.append((f"S{window % 1000:04d}", "volume_spike", "high", float(rng.uniform(2, 10)), ts))
+            window += 1
+        batches.append((batch_id, alerts))
+        if retry_every and (batch_id + 1) % retry_every == 0:
+            batches.append((batch_id, alerts))
+        prev = alerts
+    return batches
+
+
+def run_legacy(batches) -> list[float]:
+    timings = []
+    for _, alerts in batches:
+        t0 = time.perf_counter()
+        conn = _connect("bench_alerts_legacy")
+        cur = conn.cursor()
+        for alert in alerts:
+            cur.execute(
+                "INSERT INTO alerts (ticker, alert_type, severity, value, ts) VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                alert,
+            )
+            cur.fetchone()
+        conn.commit()
+        cur.close()
+        conn.close()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def run_sink(batches) -> list[float]:
+    pg = dict(PG, options="-c search_path=bench_alerts_sink")
+    sink = AlertSink(pg, "", "trades-alerts", "bench", "", 0, "alerts:live")
+    timings = []
+    for batch_id, alerts in batches:
+        t0 = time.perf_counter()
+        sink.insert(batch_id, alerts)
+        timings.append(time.perf_counter() - t0)
+    sink._pool.closeall()
+    return timings
+
+
+def counts(conn, schema: str) -> tuple[int, int]:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*), count(*) - count(DISTINCT (ticker, alert_type, ts)) FROM {schema}.alerts")
+        rows, duplicates = cur.fetchone()
+    conn.commit()
+    return rows, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--alerts-per-batch", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--overlap", type=float, default=0.5, help="share of each batch re-emitting the previous one's windows")
+    parser.add_argument("--retry-every", type=int, default=20, help="replay every Nth batch under the same batch_id (0: never)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="leave the bench_alerts_* schemas")
+    args = parser.parse_args()
+
+    conn = _connect()
+    print(f"{'alerts':>7}{'path':>8}{'p50 ms':>9}{'mean ms':>9}{'max ms':>9}{'rows':>9}{'dups':>8}")
+    try:
+        for per_batch in args.alerts_per_batch:
+            setup(conn)
+            batches = make_batches(args.batches, per_batch, args.overlap, args.retry_every, args.seed)
+            for name, run, schema in (("legacy", run_legacy, SCHEMAS[0]), ("sink", run_sink, SCHEMAS[1])):
+                ms = np.array(run(batches)) * 1000
+                rows, duplicates = counts(conn, schema)
+                print(
+                    f"{per_batch:>7}{name:>8}{np.median(ms):>9.2f}{ms.mean():>9.2f}{ms.max():>9.2f}"
+                    f"{rows:>9,}{duplicates:>8,}"
+                )
+    finally:
+        if not args.keep:
+            teardown(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
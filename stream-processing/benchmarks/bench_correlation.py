@@ -0,0 +1,74 @@
+"""
+Benchmark the incremental rolling correlation against full recomputation.
+
+For each universe size, a window of synthetic factor-driven returns is
+pushed through RollingCorrelation, then the per-interval cost of push() +
+correlation() (float32, as published) is timed against np.corrcoef over the
+whole ring buffer, and the two matrices are compared. Both are O(symbols^2)
+to emit; only recomputation also scales with the window, so the speedup
+grows with --window.
+
+Run from stream-processing/ (NumPy only, no Spark or Redis needed):
+
+    python -m benchmarks.bench_correlation --symbols 50 100 250 500 1000 --window 120
+"""
+import argparse
+import time
+
+import numpy as np
+
+from correlation import RollingCorrelation
+
+
+def _returns(rng, n_intervals: int, n_symbols: int, n_factors: int = 5):
+    loadings = rng.normal(0, 1, (n_factors, n_symbols))
+    factors = rng.normal(0, 0.01, (n_intervals, n_factors))
+    return factors @ loadings + rng.normal(0, 0.01, (n_intervals, n_symbols))
+
+
+def bench(n_symbols: int, window: int, intervals: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    data = _returns(rng, window + intervals, n_symbols)
+    engine = RollingCorrelation(window, [f"S{i}" for i in range(n_symbols)])
+    for row in data[:window]:
+        engine.push(row)
+
+    t0 = time.perf_counter()
+    for row in data[window:]:
+        engine.push(row)
+        corr = engine.correlation(np.float32)
+    incremental = (time.perf_counter() - t0) / intervals
+
+    t0 = time.perf_counter()
+    for i in range(window, window + intervals):
+        full = np.corrcoef(data[i + 1 - window:i + 1], rowvar=False)
+    recompute = (time.perf_counter() - t0) / intervals
+
+    return {
+        "symbols": n_symbols,
+        "incremental_ms": incremental * 1000,
+        "recompute_ms": recompute * 1000,
+        "max_abs_err": float(np.nanmax(np.abs(corr - full))),
+        "matrix_mb": corr.nbytes / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[50, 100, 250, 500, 1000])
+    parser.add_argument("--window", type=int, default=120, help="intervals in the rolling window")
+    parser.add_argument("--intervals", type=int, default=50, help="timed intervals per size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8}{'incremental ms':>16}{'recompute ms':>14}{'speedup':>9}{'max |err|':>12}{'f32 MB':>8}")
+    for n in args.symbols:
+        r = bench(n, args.window, args.intervals, args.seed)
+        print(
+            f"{r['symbols']:>8}{r['incremental_ms']:>16.2f}{r['recompute_ms']:>14.2f}"
+            f"{r['recompute_ms'] / r['incremental_ms']:>9.1f}{r['max_abs_err']:>12.2e}{r['matrix_mb']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark the incremental indicators as more of them are enabled.
+
+Each row adds indicators to the set and pushes --batches micro-batches of
+--trades trades for each of --symbols symbols through IndicatorSet.update,
+as the stateful UDF does once per symbol and batch. The columns are:
+
+  * incremental ms: per-batch latency (all symbols)
+  * recompute ms: one last batch done by refolding each symbol's whole history
+    from its first trade, which is what a stateless implementation pays
+  * state B: per-symbol state size
+  * max |err|: largest difference between the two results (relative to max(1, |value|))
+
+The first row also times the per-trade Python loop the job used for EMA-9/21.
+
+Run from stream-processing/ (NumPy only, no Spark or Redis needed):
+
+    python -m benchmarks.bench_indicators --symbols 500 --batches 100 --trades 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from indicators import IndicatorSet, parse
+
+SETS = [
+    "ema:9,ema:21",
+    "ema:9,ema:21,rsi:14",
+    "ema:9,ema:21,rsi:14,macd",
+    "ema:9,ema:21,rsi:14,macd,bollinger:20:2",
+    "ema:9,ema:21,rsi:14,macd,bollinger:20:2,obv",
+]
+
+
+def _trades(rng, n_symbols: int, n_batches: int, n_trades: int):
+    steps = rng.normal(0, 0.001, (n_symbols, n_batches * n_trades))
+    prices = 100 * np.exp(np.cumsum(steps, axis=1))
+    volumes = rng.integers(1, 1000, (n_symbols, n_batches * n_trades)).astype(np.float64)
+    return prices, volumes
+
+
+def _legacy_ema(state, prices):
+    ema9, ema21 = state
+    k9 = 2.0 / (9 + 1)
+    k21 = 2.0 / (21 + 1)
+    for p in prices:
+        ema9 = float(p) * k9 + ema9 * (1 - k9)
+        ema21 = float(p) * k21 + ema21 * (1 - k21)
+    return ema9, ema21
+
+
+def bench(spec: str, prices, volumes, n_batches: int, n_trades: int) -> dict:
+    ind = IndicatorSet(parse(spec))
+    n_symbols = prices.shape[0]
+    states = [ind.initial_state(prices[i, 0]) for i in range(n_symbols)]
+    outputs = [None] * n_symbols
+    t0 = time.perf_counter()
+    for b in range(n_batches):
+        lo, hi = b * n_trades, (b + 1) * n_trades
+        for i in range(n_symbols):
+            states[i], outputs[i] = ind.update(states[i], prices[i, lo:hi], volumes[i, lo:hi])
+    incremental = (time.perf_counter() - t0) / n_batches
+
+    t0 = time.perf_counter()
+    full = [ind.update(ind.initial_state(prices[i, 0]), prices[i], volumes[i])[1] for i in range(n_symbols)]
+    recompute = time.perf_counter() - t0
+
+    a, b = np.asarray(outputs), np.asarray(full)
+    return {
+        "outputs": len(ind.outputs),
+        "incremental_ms": incremental * 1000,
+        "recompute_ms": recompute * 1000,
+        "state_bytes": 8 * len(ind.state_fields),
+        "max_abs_err": float(np.max(np.abs(a - b) / np.maximum(1.0, np.abs(b)))),
+    }
+
+
+def bench_legacy(prices, n_batches: int, n_trades: int) -> float:
+    n_symbols = prices.shape[0]
+    states = [(prices[i, 0], prices[i, 0]) for i in range(n_symbols)]
+    t0 = time.perf_counter()
+    for b in range(n_batches):
+        for i in range(n_symbols):
+            states[i] = _legacy_ema(states[i], prices[i, b * n_trades:(b + 1) * n_trades])
+    return (time.perf_counter() - t0) / n_batches * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--batches", type=int, default=100)
+    parser.add_argument("--trades", type=int, default=50, help="trades per symbol per batch")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    prices, volumes = _trades(np.random.default_rng(args.seed), args.symbols, args.batches, args.trades)
+    print(f"# {args.symbols} symbols x {args.trades} trades per batch, {args.batches} batches of history")
+    print(f"legacy EMA-9/21 loop: {bench_legacy(prices, args.batches, args.trades):.2f} ms/batch")
+    print(f"{'indicators':<45}{'outputs':>8}{'incremental ms':>16}{'recompute ms':>14}{'state B':>9}{'max |err|':>11}")
+    for spec in SETS:
+        r = bench(spec, prices, volumes, args.batches, args.trades)
+        print(
+            f"{spec:<45}{r['outputs']:>8}{r['incremental_ms']:>16.2f}{r['recompute_ms']:>14.2f}"
+            f"{r['state_bytes']:>9}{r['max_abs_err']:>11.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Sweep trigger policies against trade-to-Redis latency and throughput.
+
+Two modes:
+
+  simulate  Replays Poisson trade arrivals through one query's micro-batch
+            loop. Spark's processingTime semantics apply: the next batch
+            starts at the next interval boundary, or at once if the last one
+            overran, and it takes everything that has arrived up to
+            --max-offsets. Each batch costs --overhead-ms + --per-trade-us * rows.
+            Fixed intervals are compared with pacing.AdaptiveTrigger. Each
+            trade's latency is the end of its batch minus its arrival.
+            Calibrate the two costs from the Spark UI (batch duration vs
+            input rows).
+
+  live      Produces synthetic BENCH* trades to trades-raw at each --rates
+            rate against a running stack, and tails their
+            trades:stream:{symbol} entries. Latency is the Redis entry id
+            (server ms at XADD) minus the entry's "ts", which is the newest
+            trade in that update. Start the streaming job once per policy
+            (STREAM_LATENCY_MODE / STREAM_TRIGGER_MS ...) and label each run.
+
+Run from stream-processing/:
+
+    python -m benchmarks.bench_trigger simulate --rates 50 500 2000 5000
+    python -m benchmarks.bench_trigger live --label adaptive --rates 50 500 2000 --duration 60
+"""
+import argparse
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+from pacing import AdaptiveTrigger
+
+
+class _SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, s: float):
+        self.now += s
+
+
+def simulate(arrivals: np.ndarray, policy: str, args) -> dict:
+    """Latencies (s) and batch stats for one policy: "fixed:<ms>" or "adaptive"."""
+    clock = _SimClock()
+    if policy == "adaptive":
+        interval = args.min_ms / 1000
+        pacer = AdaptiveTrigger(args.min_ms / 1000, args.max_ms / 1000, args.utilization, clock=clock, sleep=clock.sleep)
+    else:
+        interval = int(policy.split(":")[1]) / 1000
+        pacer = None
+    overhead, per_trade = args.overhead_ms / 1000, args.per_trade_us / 1e6
+    max_rows = args.max_offsets or len(arrivals)
+
+    latencies = np.empty(len(arrivals))
+    done = 0
+    busy = 0.0
+    batches = 0
+    while done < len(arrivals):
+        start = clock.now
+        next_trigger = (math.floor(start / interval) + 1) * interval
+        rows = min(int(np.searchsorted(arrivals, start, side="right")) - done, max_rows)
+        if rows > 0:
+            cost = overhead + per_trade * rows
+
+            def batch():
+                clock.sleep(cost)
+                latencies[done:done + rows] = clock.now - arrivals[done:done + rows]
+
+            if pacer is not None:
+                pacer.run(batch)
+            else:
+                batch()
+            done += rows
+            busy += cost
+            batches += 1
+        # Spark waits for the next boundary, or starts at once when the batch overran it
+        clock.now = max(clock.now, next_trigger)
+
+    span = arrivals[-1]
+    return {
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "p99": float(np.percentile(latencies, 99)),
+        "batches_per_s": batches / span,
+        "rows_per_batch": len(arrivals) / batches,
+        "busy": busy / clock.now,
+    }
+
+
+def run_simulate(args):
+    rng = np.random.default_rng(args.seed)
+    policies = [f"fixed:{ms}" for ms in args.fixed_ms] + ["adaptive"]
+    print(
+        f"# overhead {args.overhead_ms:g} ms + {args.per_trade_us:g} us/trade per batch; "
+        f"adaptive {args.min_ms}-{args.max_ms} ms at utilization {args.utilization:g}"
+    )
+    print(f"{'rate/s':>7}  {'policy':<12}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'batch/s':>9}{'rows/batch':>12}{'busy':>7}")
+    for rate in args.rates:
+        arrivals = np.cumsum(rng.exponential(1.0 / rate, int(rate * args.duration)))
+        for policy in policies:
+            r = simulate(arrivals, policy, args)
+            print(
+                f"{rate:>7}  {policy:<12}{r['p50']:>8.2f}{r['p95']:>8.2f}{r['p99']:>8.2f}"
+                f"{r['batches_per_s']:>9.2f}{r['rows_per_batch']:>12.0f}{r['busy']:>7.0%}"
+            )
+
+
+def run_live(args):
+    import redis
+    from confluent_kafka import Producer
+
+    symbols = [f"BENCH{i:03d}" for i in range(args.symbols)]
+    r = redis.Redis(host=args.redis_host, port=args.redis_port, decode_responses=True)
+    producer = Producer({"bootstrap.servers": args.bootstrap, "linger.ms": 5})
+    rng = np.random.default_rng(args.seed)
+    print(f"# {args.label}: {args.symbols} symbols, {args.duration}s per rate")
+    print(f"{'label':<12}{'rate/s':>7}{'sent/s':>8}{'updates/s':>10}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}")
+    for rate in args.rates:
+        latencies = []
+        stop = threading.Event()
+        start_id = f"{int(time.time() * 1000)}-0"
+
+        def tail():
+            ids = {f"trades:stream:{s}": start_id for s in symbols}
+            while not stop.is_set():
+                for stream, entries in r.xread(ids, block=500) or []:
+                    for entry_id, fields in entries:
+                        ids[stream] = entry_id
+                        latencies.append(int(entry_id.split("-")[0]) - int(fields["ts"]))
+
+        thread = threading.Thread(target=tail, daemon=True)
+        thread.start()
+        n = int(rate * args.duration)
+        t0 = time.time()
+        for i in range(n):
+            delay = t0 + i / rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            payload = {
+                "symbol": symbols[i % len(symbols)],
+                "price": round(100 + float(rng.normal(0, 1)), 4),
+                "volume": int(rng.integers(1, 1000)),
+                "timestamp": int(time.time() * 1000),
+                "conditions": None,
+            }
+            producer.produce("trades-raw", key=payload["symbol"].encode(), value=json.dumps(payload).encode())
+            producer.poll(0)
+        producer.flush()
+        sent_s = time.time() - t0
+        time.sleep(args.drain)
+        stop.set()
+        thread.join()
+        ms = np.array(latencies) / 1000 if latencies else np.array([np.nan])
+        print(
+            f"{args.label:<12}{rate:>7}{n / sent_s:>8.0f}{len(latencies) / (sent_s + args.drain):>10.1f}"
+            f"{np.percentile(ms, 50):>8.2f}{np.percentile(ms, 95):>8.2f}{np.percentile(ms, 99):>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    sim = sub.add_parser("simulate")
+    sim.add_argument("--rates", type=int, nargs="+", default=[50, 500, 2000, 5000], help="trades/s")
+    sim.add_argument("--duration", type=float, default=120, help="seconds of arrivals per rate")
+    sim.add_argument("--fixed-ms", type=int, nargs="+", default=[5000, 1000, 250])
+    sim.add_argument("--min-ms", type=int, default=250)
+    sim.add_argument("--max-ms", type=int, default=5000)
+    sim.add_argument("--utilization", type=float, default=0.5)
+    sim.add_argument("--overhead-ms", type=float, default=250, help="fixed cost per micro-batch")
+    sim.add_argument("--per-trade-us", type=float, default=50, help="marginal cost per trade")
+    sim.add_argument("--max-offsets", type=int, default=0, help="maxOffsetsPerTrigger (0: unbounded)")
+    sim.add_argument("--seed", type=int, default=42)
+
+    live = sub.add_parser("live")
+    live.add_argument("--label", default="run", help="name of the streaming job's trigger config")
+    live.add_argument("--rates", type=int, nargs="+", default=[50, 500, 2000])
+    live.add_argument("--duration", type=float, default=60, help="seconds of producing per rate")
+    live.add_argument("--drain", type=float, default=10, help="seconds to keep tailing after the last trade")
+    live.add_argument("--symbols", type=int, default=20)
+    live.add_argument("--bootstrap", default="localhost:9092")
+    live.add_argument("--redis-host", default="localhost")
+    live.add_argument("--redis-port", type=int, default=6379)
+    live.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.mode == "simulate":
+        run_simulate(args)
+    else:
+        run_live(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Incremental rolling cross-symbol correlation over fixed-interval returns.
+
+IntervalSampler turns the trade stream into synchronized per-interval log
+returns: each symbol's last price in an interval is its close, symbols that
+did not trade carry their previous close forward (a zero return), and
+intervals in which nothing traded are skipped. RollingCorrelation keeps the
+last `window` return vectors in a (window x symbols) NumPy ring buffer along
+with running sums and cross-products, so each new interval costs one rank-2
+update (add the new row, subtract the evicted one) instead of a full
+O(window * symbols^2) recomputation. The sums are rebuilt from the buffer
+every `recompute_every` pushes to stop floating-point drift.
+"""
+import math
+
+import numpy as np
+
+
+class RollingCorrelation:
+    """Rolling covariance/correlation of the last `window` return vectors."""
+
+    def __init__(self, window: int, symbols=(), recompute_every: int | None = None):
+        self.window = int(window)
+        self.recompute_every = int(recompute_every or window)
+        self.symbols: list[str] = []
+        self.index: dict[str, int] = {}
+        self.buf = np.zeros((self.window, 0))
+        self.sum = np.zeros(0)
+        self.cross = np.zeros((0, 0))
+        self._scratch = np.empty((0, 0))
+        self.n = 0
+        self.pos = 0
+        self._since_recompute = 0
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols) -> None:
+        """Append unseen symbols; their history so far counts as zero returns."""
+        new = [s for s in dict.fromkeys(symbols) if s not in self.index]
+        if not new:
+            return
+        for s in new:
+            self.index[s] = len(self.symbols)
+            self.symbols.append(s)
+        k = len(new)
+        self.buf = np.pad(self.buf, ((0, 0), (0, k)))
+        self.sum = np.pad(self.sum, (0, k))
+        self.cross = np.pad(self.cross, ((0, k), (0, k)))
+        self._scratch = np.empty_like(self.cross)
+
+    def push(self, returns: np.ndarray) -> None:
+        """Add one interval's returns, aligned with self.symbols."""
+        row = np.asarray(returns, dtype=np.float64)
+        if self.n == self.window:
+            # Rank-2 update in one small GEMM: cross += row row^T - old old^T
+            old = self.buf[self.pos].copy()
+            self.sum += row - old
+            np.matmul(np.stack([row, old]).T, np.stack([row, -old]), out=self._scratch)
+        else:
+            self.n += 1
+            self.sum += row
+            np.outer(row, row, out=self._scratch)
+        self.cross += self._scratch
+        self.buf[self.pos] = row
+        self.pos = (self.pos + 1) % self.window
+        self._since_recompute += 1
+        if self._since_recompute >= self.recompute_every:
+            self.recompute()
+
+    def push_dict(self, returns: dict) -> None:
+        self.add_symbols(returns)
+        row = np.zeros(len(self.symbols))
+        for s, r in returns.items():
+            row[self.index[s]] = r
+        self.push(row)
+
+    def recompute(self) -> None:
+        """Rebuild the running sums from the ring buffer."""
+        x = self.buf if self.n == self.window else self.buf[: self.n]
+        self.sum = x.sum(axis=0)
+        self.cross = x.T @ x
+        self._since_recompute = 0
+
+    def covariance(self) -> np.ndarray:
+        if self.n < 2:
+            return np.full_like(self.cross, np.nan)
+        return (self.cross - np.outer(self.sum, self.sum / self.n)) / (self.n - 1)
+
+    def correlation(self, dtype=np.float64) -> np.ndarray:
+        """Pearson correlation matrix; NaN where a symbol's returns have zero variance.
+
+        The 1/(n-1) factors cancel, so the centered cross-products are scaled
+        in place by their inverse root diagonal and cast once to `dtype`.
+        """
+        if self.n < 2:
+            return np.full(self.cross.shape, np.nan, dtype=dtype)
+        centered = np.outer(self.sum, self.sum / self.n, out=self._scratch)
+        np.subtract(self.cross, centered, out=centered)
+        d = np.diag(centered).copy()
+        with np.errstate(divide="ignore"):
+            inv = np.where(d > 0, 1.0 / np.sqrt(d), np.nan)
+        centered *= inv[:, None]
+        centered *= inv
+        corr = centered.astype(dtype)
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, np.where(d > 0, 1.0, np.nan))
+        return corr
+
+
+class IntervalSampler:
+    """Closes fixed-width intervals from (symbol, price, ts) ticks and yields their log returns."""
+
+    def __init__(self, interval_ms: int):
+        self.interval_ms = int(interval_ms)
+        self.current = None
+        self.closes: dict[str, float] = {}
+        self.pending: dict[str, float] = {}
+        self.late = 0
+
+    def feed(self, ticks):
+        """Consume time-ordered ticks; returns one {symbol: log_return} dict per interval closed."""
+        out = []
+        for symbol, price, ts in ticks:
+            iv = int(ts) // self.interval_ms
+            if self.current is None:
+                self.current = iv
+            if iv < self.current:
+                self.late += 1
+                continue
+            if iv > self.current:
+                out.append(self._close())
+                self.current = iv
+            if price > 0:
+                self.pending[symbol] = float(price)
+        return [r for r in out if r]
+
+    def _close(self) -> dict:
+        returns = {}
+        for symbol, price in self.pending.items():
+            prev = self.closes.get(symbol)
+            returns[symbol] = math.log(price / prev) if prev else 0.0
+            self.closes[symbol] = price
+        self.pending = {}
+        return returns
@@ -0,0 +1,263 @@
+"""
+Incremental technical indicators for the stateful metrics stream.
+
+Each indicator folds a micro-batch of one symbol's trades (prices and volumes,
+oldest first) into a small, fixed tuple of state fields. Per-symbol state and
+per-trade cost are therefore constant however long the symbol has been
+streaming, and nothing is recomputed from history.
+
+streaming_job builds these from the enabled set (INDICATORS):
+- the GroupState schema
+- the UDF output columns
+- the Redis hash / stream fields
+
+    ema:9,ema:21,rsi:14,macd:12:26:9,bollinger:20:2,obv
+
+New indicators subclass Indicator and are registered with @register("kind").
+The recursions are all first-order ("y = a*x + (1-a)*y"), so ema_series()
+evaluates them over a whole batch in NumPy rather than trade by trade.
+"""
+import numpy as np
+
+# Closed-form block length for ema_series; keeps (1-a)^-j well inside float64 range
+_BLOCK = 64
+
+INDICATORS: dict[str, type] = {}
+
+
+def register(kind: str):
+    def decorate(cls):
+        cls.kind = kind
+        INDICATORS[kind] = cls
+        return cls
+    return decorate
+
+
+def ema_series(x, alpha: float, y0: float) -> np.ndarray:
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1], with y[-1] = y0, for every t."""
+    x = np.asarray(x, dtype=np.float64)
+    if alpha >= 1.0:
+        # No memory: every (1-a)^j is 0, so the closed form below would divide by zero
+        return x.copy()
+    out = np.empty_like(x)
+    # powers[j] = (1-a)^(j+1), so (1-a)^(j-i) = powers[j] / powers[i] within a block
+    powers = (1.0 - alpha) ** np.arange(1, _BLOCK + 1)
+    y = float(y0)
+    for start in range(0, len(x), _BLOCK):
+        chunk = x[start:start + _BLOCK]
+        p = powers[:len(chunk)]
+        block = p * (y + alpha * np.cumsum(chunk / p))
+        out[start:start + len(chunk)] = block
+        y = float(block[-1])
+    return out
+
+
+def ema_last(x, alpha: float, y0: float) -> float:
+    """Last value of ema_series(x, alpha, y0) as one weighted sum."""
+    n = len(x)
+    if n == 0:
+        return float(y0)
+    beta = 1.0 - alpha
+    weights = beta ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    return float(beta ** n * y0 + alpha * np.dot(weights, x))
+
+
+def _period(value, what="period") -> int:
+    period = int(value)
+    if period < 2:
+        raise ValueError(f"{what} must be at least 2, got {period}")
+    return period
+
+
+def _deltas(prev: float, prices: np.ndarray) -> np.ndarray:
+    return np.diff(prices, prepend=prev)
+
+
+class Indicator:
+    """One incremental indicator.
+
+    state_fields are named as "{name}_{field}" in the GroupState schema; every
+    state field is a double unless listed in long_fields. outputs are double
+    columns / Redis fields, and price_outputs those in price units (encoded at
+    the symbol's scale under PRICE_ENCODING=fixed).
+    """
+    kind = ""
+    name = ""
+    state_fields: tuple = ()
+    long_fields: tuple = ()
+    outputs: tuple = ()
+    price_outputs: tuple = ()
+
+    def initial_state(self, price: float) -> tuple:
+        raise NotImplementedError
+
+    def update(self, state: tuple, prices: np.ndarray, volumes: np.ndarray) -> tuple[tuple, tuple]:
+        """(new state, outputs) after folding in the batch."""
+        raise NotImplementedError
+
+
+@register("ema")
+class EMA(Indicator):
+    state_fields = ("value",)
+
+    def __init__(self, period=9):
+        self.period = _period(period)
+        self.alpha = 2.0 / (self.period + 1)
+        self.name = f"ema{self.period}"
+        self.outputs = self.price_outputs = (self.name,)
+
+    def initial_state(self, price):
+        return (price,)
+
+    def update(self, state, prices, volumes):
+        ema = ema_last(prices, self.alpha, state[0])
+        return (ema,), (ema,)
+
+
+@register("rsi")
+class RSI(Indicator):
+    """Wilder's RSI: simple averages over the first `period` moves, then smoothing by 1/period."""
+    state_fields = ("prev", "avg_gain", "avg_loss", "moves")
+    long_fields = ("moves",)
+
+    def __init__(self, period=14):
+        self.period = _period(period)
+        self.name = f"rsi{self.period}"
+        self.outputs = (self.name,)
+
+    def initial_state(self, price):
+        return (price, 0.0, 0.0, 0)
+
+    def update(self, state, prices, volumes):
+        prev, avg_gain, avg_loss, moves = state
+        deltas = _deltas(prev, prices)
+        gains = np.maximum(deltas, 0.0)
+        losses = np.maximum(-deltas, 0.0)
+        seed = min(len(deltas), max(0, self.period - moves))
+        if seed:
+            avg_gain = (avg_gain * moves + gains[:seed].sum()) / (moves + seed)
+            avg_loss = (avg_loss * moves + losses[:seed].sum()) / (moves + seed)
+        avg_gain = ema_last(gains[seed:], 1.0 / self.period, avg_gain)
+        avg_loss = ema_last(losses[seed:], 1.0 / self.period, avg_loss)
+        moves += len(deltas)
+        if avg_loss > 0:
+            rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        else:
+            rsi = 100.0 if avg_gain > 0 else 50.0
+        return (float(prices[-1]), float(avg_gain), float(avg_loss), int(moves)), (rsi,)
+
+
+@register("macd")
+class MACD(Indicator):
+    state_fields = ("fast", "slow", "signal")
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = _period(fast, "fast"), _period(slow, "slow"), _period(signal, "signal")
+        self.name = "macd" if (self.fast, self.slow, self.signal) == (12, 26, 9) else f"macd{self.fast}_{self.slow}_{self.signal}"
+        self.outputs = (self.name, f"{self.name}_signal", f"{self.name}_hist")
+
+    def initial_state(self, price):
+        return (price, price, 0.0)
+
+    def update(self, state, prices, volumes):
+        fast = ema_series(prices, 2.0 / (self.fast + 1), state[0])
+        slow = ema_series(prices, 2.0 / (self.slow + 1), state[1])
+        macd = fast - slow
+        signal = ema_last(macd, 2.0 / (self.signal + 1), state[2])
+        return (float(fast[-1]), float(slow[-1]), signal), (float(macd[-1]), signal, float(macd[-1]) - signal)
+
+
+@register("bollinger")
+class Bollinger(Indicator):
+    """Bands at k standard deviations around an exponentially weighted mean (the EW variance keeps state to two numbers)."""
+    state_fields = ("mean", "var")
+
+    def __init__(self, period=20, k=2.0):
+        self.period = _period(period)
+        self.k = float(k)
+        self.alpha = 2.0 / (self.period + 1)
+        self.name = f"bb{self.period}"
+        self.outputs = self.price_outputs = (f"{self.name}_mid", f"{self.name}_upper", f"{self.name}_lower")
+
+    def initial_state(self, price):
+        return (price, 0.0)
+
+    def update(self, state, prices, volumes):
+        means = ema_series(prices, self.alpha, state[0])
+        # var[t] = (1-a) * (var[t-1] + a * d[t]^2) with d[t] = x[t] - mean[t-1]
+        d = prices - np.concatenate(([state[0]], means[:-1]))
+        beta = 1.0 - self.alpha
+        var = ema_last(beta * d * d, self.alpha, state[1])
+        mean = float(means[-1])
+        band = self.k * float(np.sqrt(var))
+        return (mean, var), (mean, mean + band, mean - band)
+
+
+@register("obv")
+class OBV(Indicator):
+    state_fields = ("prev", "value")
+
+    def __init__(self):
+        self.name = "obv"
+        self.outputs = ("obv",)
+
+    def initial_state(self, price):
+        return (price, 0.0)
+
+    def update(self, state, prices, volumes):
+        obv = state[1] + float(np.dot(np.sign(_deltas(state[0], prices)), volumes))
+        return (float(prices[-1]), obv), (obv,)
+
+
+def parse(spec: str) -> list[Indicator]:
+    """"ema:9,rsi:14,macd" -> indicator instances, one per kind[:param...] entry."""
+    out = []
+    seen = set()
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kind, *params = item.split(":")
+        cls = INDICATORS.get(kind.strip().lower())
+        if cls is None:
+            raise ValueError(f"Unknown indicator {kind!r} (known: {', '.join(sorted(INDICATORS))})")
+        indicator = cls(*params)
+        clash = seen.intersection(indicator.outputs)
+        if clash:
+            raise ValueError(f"Indicator {item!r} repeats outputs {sorted(clash)}")
+        seen.update(indicator.outputs)
+        out.append(indicator)
+    return out
+
+
+class IndicatorSet:
+    """The enabled indicators as one flat state tuple and one flat output tuple."""
+
+    def __init__(self, indicators: list[Indicator]):
+        self.indicators = indicators
+        self.state_fields = [
+            (f"{ind.name}_{field}", "long" if field in ind.long_fields else "double")
+            for ind in indicators
+            for field in ind.state_fields
+        ]
+        self.outputs = tuple(o for ind in indicators for o in ind.outputs)
+        self.price_outputs = tuple(o for ind in indicators for o in ind.price_outputs)
+        self._slices = []
+        start = 0
+        for ind in indicators:
+            self._slices.append(slice(start, start + len(ind.state_fields)))
+            start += len(ind.state_fields)
+
+    def initial_state(self, price: float) -> tuple:
+        return tuple(v for ind in self.indicators for v in ind.initial_state(float(price)))
+
+    def update(self, state: tuple, prices: np.ndarray, volumes: np.ndarray) -> tuple[tuple, tuple]:
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        new_state = []
+        outputs = []
+        for ind, part in zip(self.indicators, self._slices):
+            s, o = ind.update(tuple(state[part]), prices, volumes)
+            new_state.extend(s)
+            outputs.extend(o)
+        return tuple(new_state), tuple(outputs)
@@ -0,0 +1,63 @@
+"""
+Latency-adaptive micro-batch pacing for the streaming queries.
+
+STREAM_LATENCY_MODE=fixed runs every query on a processingTime trigger of
+STREAM_TRIGGER_MS, which defaults to the old 5 s. In adaptive mode, queries
+trigger every STREAM_TRIGGER_MIN_MS. Each foreachBatch sink is wrapped in
+its own AdaptiveTrigger. After a batch, the trigger holds the query so that
+the next batch starts `interval` after this one started:
+
+    interval = clamp(ewma(batch seconds) / STREAM_TARGET_UTILIZATION, min, max)
+
+- Idle: batches are short and the interval sits at the minimum, so a trade
+  waits only about STREAM_TRIGGER_MIN_MS before a batch picks it up.
+- Under load (the open, a burst): batches get longer and the interval grows
+  with them.
+  - The fixed per-batch cost (planning, offset commits, Redis and PostgreSQL
+    round trips) is spread over more trades.
+  - Each query stays busy for at most the target share of its time. The
+    queries share two local cores, so this leaves the others headroom.
+- The wait comes after the sink has written, so it delays only the next
+  batch.
+
+The batch time is measured around the foreachBatch body. That body runs the
+batch's whole plan (Kafka read, stateful UDF) through collect().
+"""
+import time
+
+
+class AdaptiveTrigger:
+    def __init__(
+        self,
+        min_s: float,
+        max_s: float,
+        utilization: float = 0.5,
+        smoothing: float = 0.3,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.min_s = min_s
+        self.max_s = max(min_s, max_s)
+        self.utilization = min(1.0, max(0.05, utilization))
+        self.smoothing = smoothing
+        self.clock = clock
+        self.sleep = sleep
+        self.busy_s = None
+        self.interval_s = min_s
+
+    def observe(self, busy_s: float) -> float:
+        """Fold one batch's duration into the average; returns the interval before the next batch."""
+        self.busy_s = busy_s if self.busy_s is None else self.smoothing * busy_s + (1 - self.smoothing) * self.busy_s
+        self.interval_s = min(self.max_s, max(self.min_s, self.busy_s / self.utilization))
+        return self.interval_s
+
+    def run(self, fn, *args):
+        """Call fn(*args), then wait out the rest of the interval."""
+        started = self.clock()
+        try:
+            return fn(*args)
+        finally:
+            busy = self.clock() - started
+            wait = self.observe(busy) - busy
+            if wait > 0:
+                self.sleep(wait)
@@ -1,21 +1,59 @@
 """
 Spark Structured Streaming: consume trades-raw, compute VWAP (1m/5m/15m),
-EMA-9/EMA-21 (stateful), rolling 10-min volatility, volume anomaly.
-Write metrics to Redis (HSET + Pub/Sub) and alerts to PostgreSQL + trades-alerts.
+incremental indicators (stateful; indicators.py, EMA-9/EMA-21 by default),
+rolling 10-min volatility, volume anomaly.
+Write metrics to Redis (HSET + a capped per-symbol Stream trades:stream:{symbol}
+that /ws/live replays and tails) and alerts to PostgreSQL + trades-alerts.
+Alerts are emitted exactly once (alert_sink.py): a bulk ON CONFLICT insert tied
+to the Spark batch_id and query id, then a transactional producer draining an
+outbox; set ALERTS_CHECKPOINT_DIR so batch ids and offsets survive restarts.
+
+The metrics state also carries each symbol's UTC-day open/high/low/volume.
+Every micro-batch ranks updated symbols in per-day Redis sorted sets
+(leaderboard:{YYYY-MM-DD}:{pct_change|range_pct|volume}); % change is vs the
+previous close in ohlcv_daily, falling back to the day's first trade.
+
+With PRICE_ENCODING=fixed, raw_trades rows are written as price_fx and the
+price fields of the Redis hash / stream as integers at the symbol's
+registered scale (symbol_scales, plus a "scale" field); the API converts them
+to floats. Kafka payloads may carry either price or price_fx + scale.
+
+A fourth query feeds per-interval closes to an incremental rolling
+correlation engine (correlation.py) on the driver and publishes the matrix
+to the Redis hash correlation:latest after every closed interval.
+
+Queries trigger every STREAM_TRIGGER_MS (fixed) or pace themselves between
+STREAM_TRIGGER_MIN_MS and STREAM_TRIGGER_MAX_MS by batch duration
+(STREAM_LATENCY_MODE=adaptive, pacing.py); MAX_OFFSETS_PER_TRIGGER bounds
+each batch at the open.
+
+Sinks, their collect() calls and Redis/PostgreSQL round trips, and the
+concat/sort and indicator update in the stateful UDF are wrapped in opt-in
+profiling timers (profiling.py; PROFILE_TIMERS / PROFILE_CAPTURE).
 """
 import os
 import json
 import logging
+import math
+import threading
 from typing import Iterator
-from datetime import datetime
+from datetime import datetime, timezone
 
 from pyspark.sql import SparkSession
 from pyspark.sql.types import (
-    StructType, StructField, StringType, DoubleType, LongType,
+    StructType, StructField, StringType, DoubleType, LongType, IntegerType,
+)
+from pyspark.sql.functions import (
+    col, coalesce, from_json, from_unixtime, window, sum as spark_sum, stddev, mean, max_by, max as spark_max, pow as spark_pow,
 )
-from pyspark.sql.functions import col, from_json, from_unixtime, window, sum as spark_sum, stddev, mean
 from pyspark.sql.streaming.state import GroupState, GroupStateTimeout
 
+import profiling
+from alert_sink import AlertSink
+from correlation import IntervalSampler, RollingCorrelation
+from indicators import IndicatorSet, parse as parse_indicators
+from pacing import AdaptiveTrigger
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -28,10 +66,74 @@ PG_DB = os.environ.get("PG_DATABASE", "stock_analytics")
 PG_USER = os.environ.get("PG_USER", "stock")
 PG_PASSWORD = os.environ.get("PG_PASSWORD", "stock")
 REDIS_TTL = 120
+# "fixed": processingTime trigger of STREAM_TRIGGER_MS; "adaptive": paced between the min and max by batch duration
+STREAM_LATENCY_MODE = os.environ.get("STREAM_LATENCY_MODE", "fixed")
+STREAM_TRIGGER_MS = int(os.environ.get("STREAM_TRIGGER_MS", "5000"))
+STREAM_TRIGGER_MIN_MS = int(os.environ.get("STREAM_TRIGGER_MIN_MS", "250"))
+STREAM_TRIGGER_MAX_MS = int(os.environ.get("STREAM_TRIGGER_MAX_MS", "5000"))
+STREAM_TARGET_UTILIZATION = float(os.environ.get("STREAM_TARGET_UTILIZATION", "0.5"))
+# Admission control: Kafka offsets per micro-batch per query (empty: unbounded)
+MAX_OFFSETS_PER_TRIGGER = os.environ.get("MAX_OFFSETS_PER_TRIGGER", "")
+# Rows per Arrow batch into the stateful UDF; it concatenates a symbol's chunks anyway,
+# so by default one admitted batch of a symbol fits in one Arrow batch
+ARROW_MAX_RECORDS_PER_BATCH = int(os.environ.get("ARROW_MAX_RECORDS_PER_BATCH") or max(10_000, int(MAX_OFFSETS_PER_TRIGGER or 0)))
+# Approximate cap per metrics stream (~2.8h at one update per 5s trigger, less with faster triggers) and idle expiry
+METRICS_STREAM_MAXLEN = int(os.environ.get("METRICS_STREAM_MAXLEN", "2000"))
+METRICS_STREAM_TTL = 24 * 3600
+# "decimal" writes NUMERIC prices and float strings; "fixed" writes int64 price * 10^scale (see symbol_scales)
+PRICE_ENCODING = os.environ.get("PRICE_ENCODING", "decimal")
+PRICE_SCALE_DEFAULT = int(os.environ.get("PRICE_SCALE_DEFAULT", "4"))
+PRICE_SCALES = {
+    symbol.strip(): int(scale)
+    for symbol, _, scale in (item.partition(":") for item in os.environ.get("PRICE_SCALES", "").split(","))
+    if symbol.strip() and scale
+}
+# Enabled indicators, kind[:param...] (indicators.py); they generate the state, output and Redis fields
+INDICATORS = os.environ.get("INDICATORS", "ema:9,ema:21")
+_indicators = IndicatorSet(parse_indicators(INDICATORS))
+# Metrics hash / stream fields that hold prices (vol stays a float string)
+PRICE_FIELDS = ("price", "vwap_1m", "vwap_5m", "vwap_15m") + _indicators.price_outputs
 ANOMALY_VOLUME_MULTIPLIER = 2.0
 
 TRADES_RAW_TOPIC = "trades-raw"
 TRADES_ALERTS_TOPIC = "trades-alerts"
+ALERTS_CHANNEL = os.environ.get("ALERTS_CHANNEL", "alerts:live")
+ALERTS_TRANSACTIONAL_ID = os.environ.get("ALERTS_TRANSACTIONAL_ID", "stock-streaming-alerts")
+# Checkpoint of the alerts query; empty starts from latest offsets with batch ids from 0
+ALERTS_CHECKPOINT_DIR = os.environ.get("ALERTS_CHECKPOINT_DIR", "")
+LEADERBOARD_KEY_PREFIX = "leaderboard"
+# Per-day leaderboard keys outlive their day so the API can still read them just after midnight UTC
+LEADERBOARD_TTL = 2 * 24 * 3600
+DAY_MS = 86_400_000
+
+# Driver-side cache of the previous session's close per symbol, reloaded when the UTC day changes
+_prev_close_cache = {"day": None, "closes": {}}
+# Driver-side cache of symbol_scales; a registered scale never changes
+_symbol_scales: dict[str, int] = {}
+# Driver-side alerts sink: pooled PostgreSQL connections and one transactional producer for the process
+_alert_sink = AlertSink(
+    pg={"host": PG_HOST, "port": PG_PORT, "dbname": PG_DB, "user": PG_USER, "password": PG_PASSWORD},
+    bootstrap_servers=KAFKA_BOOTSTRAP,
+    topic=TRADES_ALERTS_TOPIC,
+    transactional_id=ALERTS_TRANSACTIONAL_ID,
+    redis_host=REDIS_HOST,
+    redis_port=REDIS_PORT,
+    channel=ALERTS_CHANNEL,
+)
+# Set once the alerts query has started and its id (the sink's run_id) is known
+_alerts_query_started = threading.Event()
+
+# Rolling correlation: return interval, intervals kept, and full rebuild cadence (intervals)
+CORRELATION_INTERVAL_MS = int(os.environ.get("CORRELATION_INTERVAL_MS", "60000"))
+CORRELATION_WINDOW = int(os.environ.get("CORRELATION_WINDOW", "120"))
+CORRELATION_RECOMPUTE_EVERY = int(os.environ.get("CORRELATION_RECOMPUTE_EVERY", str(CORRELATION_WINDOW)))
+CORRELATION_KEY = "correlation:latest"
+_correlation_sampler = IntervalSampler(CORRELATION_INTERVAL_MS)
+_correlation_engine = RollingCorrelation(
+    CORRELATION_WINDOW,
+    [s.strip() for s in os.environ.get("TICKERS", "").split(",") if s.strip()],
+    recompute_every=CORRELATION_RECOMPUTE_EVERY,
+)
 
 
 def main():
@@ -39,29 +141,40 @@ def main():
         SparkSession.builder.appName("stock-streaming")
         .config("spark.sql.streaming.metricsEnabled", "true")
         .config("spark.sql.shuffle.partitions", "5")
+        .config("spark.sql.execution.arrow.maxRecordsPerBatch", str(ARROW_MAX_RECORDS_PER_BATCH))
         .getOrCreate()
     )
     spark.sparkContext.setLogLevel("WARN")
+    # The stateful UDF imports profiling and indicators on the Python workers
+    for module in ("profiling.py", "indicators.py"):
+        spark.sparkContext.addPyFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), module))
 
     schema = StructType([
         StructField("symbol", StringType(), False),
-        StructField("price", DoubleType(), False),
+        StructField("price", DoubleType(), True),
+        StructField("price_fx", LongType(), True),
+        StructField("scale", IntegerType(), True),
         StructField("volume", LongType(), False),
         StructField("timestamp", LongType(), False),
         StructField("conditions", StringType(), True),
     ])
 
-    df = (
+    reader = (
         spark.readStream.format("kafka")
         .option("kafka.bootstrap.servers", KAFKA_BOOTSTRAP)
         .option("subscribe", TRADES_RAW_TOPIC)
         .option("startingOffsets", "latest")
-        .load()
     )
+    if MAX_OFFSETS_PER_TRIGGER:
+        # Bounds every query's batch at the open; the rest waits for the next trigger
+        reader = reader.option("maxOffsetsPerTrigger", MAX_OFFSETS_PER_TRIGGER)
+    df = reader.load()
 
     trades = (
         df.select(from_json(col("value").cast("string"), schema).alias("data"))
         .select("data.*")
+        # Analytics run on float prices whichever encoding the producer used
+        .withColumn("price", coalesce(col("price"), col("price_fx") / spark_pow(10.0, col("scale"))))
         .withColumn(
             "event_time",
             from_unixtime(col("timestamp") / 1000.0).cast("timestamp"),
@@ -78,6 +191,8 @@ def main():
         GroupStateTimeout.NoTimeout,
     )
 
+    trigger = f"{STREAM_TRIGGER_MIN_MS if STREAM_LATENCY_MODE == 'adaptive' else STREAM_TRIGGER_MS} milliseconds"
+
     # Alerts: compute in foreachBatch from raw trades
     def write_metrics(batch_df, batch_id):
         if batch_df.isEmpty():
@@ -85,6 +200,8 @@ def main():
         _write_metrics_batch(batch_df, batch_id)
 
     def write_alerts_from_trades(batch_df, batch_id):
+        # The first batch can begin before start() has returned the query id
+        _alerts_query_started.wait()
         if batch_df.isEmpty():
             return
         _compute_and_write_alerts(batch_df, batch_id)
@@ -94,37 +211,75 @@ def main():
             return
         _write_raw_trades_batch(batch_df)
 
+    def update_correlation(batch_df, batch_id):
+        if batch_df.isEmpty():
+            return
+        _update_correlation_batch(batch_df, batch_id)
+
     query_metrics = (
         metrics_stream.writeStream
-        .foreachBatch(write_metrics)
+        .foreachBatch(_paced(write_metrics))
         .outputMode("update")
-        .trigger(processingTime="5 seconds")
+        .trigger(processingTime=trigger)
         .start()
     )
 
-    query_alerts = (
+    alerts_writer = (
         trades.writeStream
-        .foreachBatch(write_alerts_from_trades)
+        .foreachBatch(_paced(write_alerts_from_trades))
         .outputMode("append")
-        .trigger(processingTime="5 seconds")
-        .start()
+        .trigger(processingTime=trigger)
     )
+    if ALERTS_CHECKPOINT_DIR:
+        # A restart replays the uncommitted batch under the same batch_id instead of skipping to latest
+        alerts_writer = alerts_writer.option("checkpointLocation", ALERTS_CHECKPOINT_DIR)
+    query_alerts = alerts_writer.start()
+    _alert_sink.run_id = str(query_alerts.id)
+    _alerts_query_started.set()
 
     query_raw = (
         trades.writeStream
-        .foreachBatch(write_raw_trades_batch)
+        .foreachBatch(_paced(write_raw_trades_batch))
+        .outputMode("append")
+        .trigger(processingTime=trigger)
+        .start()
+    )
+
+    query_correlation = (
+        trades.writeStream
+        .foreachBatch(_paced(update_correlation))
         .outputMode("append")
-        .trigger(processingTime="5 seconds")
+        .trigger(processingTime=trigger)
         .start()
     )
 
     spark.streams.awaitAnyTermination()
 
 
+def _paced(sink):
+    """The foreachBatch function as is, or (adaptive mode) run under its own AdaptiveTrigger."""
+    if STREAM_LATENCY_MODE != "adaptive":
+        return sink
+    pacer = AdaptiveTrigger(
+        STREAM_TRIGGER_MIN_MS / 1000,
+        STREAM_TRIGGER_MAX_MS / 1000,
+        utilization=STREAM_TARGET_UTILIZATION,
+    )
+
+    def run(batch_df, batch_id):
+        pacer.run(sink, batch_df, batch_id)
+        logger.debug("%s batch %s: busy %.3fs, next interval %.3fs", sink.__name__, batch_id, pacer.busy_s, pacer.interval_s)
+    return run
+
+
 def _metrics_state_schema():
     return StructType([
-        StructField("ema9", DoubleType()),
-        StructField("ema21", DoubleType()),
+        *(StructField(name, LongType() if kind == "long" else DoubleType()) for name, kind in _indicators.state_fields),
+        StructField("day_idx", LongType()),
+        StructField("day_open", DoubleType()),
+        StructField("day_high", DoubleType()),
+        StructField("day_low", DoubleType()),
+        StructField("day_volume", LongType()),
     ])
 
 
@@ -136,9 +291,13 @@ def _metrics_output_schema():
         StructField("vwap_1m", DoubleType()),
         StructField("vwap_5m", DoubleType()),
         StructField("vwap_15m", DoubleType()),
-        StructField("ema9", DoubleType()),
-        StructField("ema21", DoubleType()),
+        *(StructField(name, DoubleType()) for name in _indicators.outputs),
         StructField("vol", DoubleType()),
+        StructField("day_idx", LongType()),
+        StructField("day_open", DoubleType()),
+        StructField("day_high", DoubleType()),
+        StructField("day_low", DoubleType()),
+        StructField("day_volume", LongType()),
     ])
 
 
@@ -154,29 +313,37 @@ def _metrics_stateful(
     dfs = list(values)
     if not dfs:
         return
-    pdf = pd.concat(dfs, ignore_index=True)
-    pdf = pdf.sort_values("timestamp")
+    with profiling.timer("metrics_state.concat_sort"):
+        pdf = pd.concat(dfs, ignore_index=True)
+        pdf = pdf.sort_values("timestamp")
     prices = pdf["price"].values
     volumes = pdf["volume"].values
     timestamps = pdf["timestamp"].values
     if len(prices) == 0:
         return
 
-    # State: EMA9, EMA21
+    # State: the indicators' fields, then the running UTC-day open/high/low/volume
+    n_ind = len(_indicators.state_fields)
+    day_idx = int(timestamps[-1] // DAY_MS)
     if state.exists:
         s = state.get
-        ema9 = float(s[0])
-        ema21 = float(s[1])
+        ind_state = tuple(s[:n_ind])
+        day = s[n_ind:]
+        same_day = day[0] == day_idx
     else:
-        ema9 = float(prices[0])
-        ema21 = float(prices[0])
+        ind_state = _indicators.initial_state(prices[0])
+        same_day = False
 
-    k9 = 2.0 / (9 + 1)
-    k21 = 2.0 / (21 + 1)
-    for p in prices:
-        ema9 = float(p) * k9 + ema9 * (1 - k9)
-        ema21 = float(p) * k21 + ema21 * (1 - k21)
-    state.update((ema9, ema21))
+    with profiling.timer("metrics_state.indicators"):
+        ind_state, ind_values = _indicators.update(ind_state, prices, volumes)
+
+    today = timestamps // DAY_MS == day_idx
+    day_prices = prices[today]
+    day_open = float(day[1]) if same_day else float(day_prices[0])
+    day_high = max(float(day[2]), float(day_prices.max())) if same_day else float(day_prices.max())
+    day_low = min(float(day[3]), float(day_prices.min())) if same_day else float(day_prices.min())
+    day_volume = (int(day[4]) if same_day else 0) + int(volumes[today].sum())
+    state.update(ind_state + (day_idx, day_open, day_high, day_low, day_volume))
 
     # VWAP and volatility from last 1/5/15/10 minutes of data in batch
     one_min = 60 * 1000
@@ -203,18 +370,24 @@ def _metrics_stateful(
         "vwap_1m": vwap_1m,
         "vwap_5m": vwap_5m,
         "vwap_15m": vwap_15m,
-        "ema9": ema9,
-        "ema21": ema21,
+        **dict(zip(_indicators.outputs, ind_values)),
         "vol": vol,
+        "day_idx": day_idx,
+        "day_open": day_open,
+        "day_high": day_high,
+        "day_low": day_low,
+        "day_volume": day_volume,
     }])
     yield out
 
 
+@profiling.timed("sink.alerts")
 def _compute_and_write_alerts(batch_df, batch_id):
     """From a batch of trades, compute 1m volume and 10m avg per symbol; emit alerts if vol_1m > 2*avg_10m."""
     import pandas as pd
 
-    rows = batch_df.collect()
+    with profiling.timer("sink.alerts.collect"):
+        rows = batch_df.collect()
     if not rows:
         return
     pdf = pd.DataFrame([r.asDict() for r in rows])
@@ -240,11 +413,26 @@ def _compute_and_write_alerts(batch_df, batch_id):
     )
     alerts_df = merged[merged["vol_1m"] > ANOMALY_VOLUME_MULTIPLIER * merged["avg_vol_10m"]]
 
-    if alerts_df.empty:
-        return
+    # A batch without alerts is still recorded against batch_id
+    alerts = [
+        (
+            row.symbol,
+            "volume_spike",
+            "high",
+            float(row.vol_1m / row.avg_vol_10m) if row.avg_vol_10m else 0,
+            row.window_1m.isoformat(),
+        )
+        for row in alerts_df.itertuples(index=False)
+    ]
+    inserted = _alert_sink.write_batch(batch_id, alerts)
+    if alerts:
+        logger.info("Wrote %d of %d alerts batch %s", inserted, len(alerts), batch_id)
 
-    # Write to PostgreSQL
+
+@profiling.timed("sink.raw_trades")
+def _write_raw_trades_batch(batch_df):
     import psycopg2
+    from psycopg2.extras import execute_batch
     conn = psycopg2.connect(
         host=PG_HOST,
         port=PG_PORT,
@@ -253,64 +441,108 @@ def _compute_and_write_alerts(batch_df, batch_id):
         password=PG_PASSWORD,
     )
     cur = conn.cursor()
-    for _, row in alerts_df.iterrows():
-        ts_str = row["window_1m"].isoformat()
-        value = float(row["vol_1m"] / row["avg_vol_10m"]) if row["avg_vol_10m"] else 0
-        cur.execute(
-            "INSERT INTO alerts (ticker, alert_type, severity, value, ts) VALUES (%s, %s, %s, %s, %s)",
-            (row["symbol"], "volume_spike", "high", value, ts_str),
-        )
-    conn.commit()
+    with profiling.timer("sink.raw_trades.collect"):
+        rows = batch_df.collect()
+    with profiling.timer("sink.raw_trades.postgres"):
+        if PRICE_ENCODING == "fixed":
+            scales = _scales_for(r["symbol"] for r in rows)
+            for r in rows:
+                cur.execute(
+                    "INSERT INTO raw_trades (symbol, price_fx, volume, trade_ts) VALUES (%s, %s, %s, %s)",
+                    (r["symbol"], _trade_price_fx(r, scales[r["symbol"]]), int(r["volume"]), int(r["timestamp"])),
+                )
+        else:
+            for r in rows:
+                cur.execute(
+                    "INSERT INTO raw_trades (symbol, price, volume, trade_ts) VALUES (%s, %s, %s, %s)",
+                    (r["symbol"], float(r["price"]), int(r["volume"]), int(r["timestamp"])),
+                )
+        conn.commit()
     cur.close()
     conn.close()
 
-    # Optionally produce to trades-alerts (Kafka)
-    try:
-        from kafka import KafkaProducer
-        prod = KafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP)
-        for _, row in alerts_df.iterrows():
-            msg = json.dumps({
-                "ticker": row["symbol"],
-                "type": "volume_spike",
-                "severity": "high",
-                "value": float(row["vol_1m"] / row["avg_vol_10m"]) if row["avg_vol_10m"] else 0,
-                "ts": row["window_1m"].isoformat(),
-            }).encode()
-            prod.send(TRADES_ALERTS_TOPIC, key=row["symbol"].encode(), value=msg)
-        prod.flush()
-        prod.close()
-    except Exception as e:
-        logger.warning("Kafka alert produce failed: %s", e)
-
-    logger.info("Wrote %d alerts batch %s", len(alerts_df), batch_id)
-
 
-def _write_raw_trades_batch(batch_df):
+@profiling.timed("sink.scales")
+def _scales_for(symbols):
+    """Registered scale per symbol; unseen symbols are registered at their PRICE_SCALES / default scale."""
+    missing = sorted({s for s in symbols if s not in _symbol_scales})
+    if missing:
+        import psycopg2
+        from psycopg2.extras import execute_values
+        conn = psycopg2.connect(
+            host=PG_HOST,
+            port=PG_PORT,
+            dbname=PG_DB,
+            user=PG_USER,
+            password=PG_PASSWORD,
+        )
+        with conn, conn.cursor() as cur:
+            execute_values(
+                cur,
+                "INSERT INTO symbol_scales (symbol, scale) VALUES %s ON CONFLICT (symbol) DO NOTHING",
+                [(s, PRICE_SCALES.get(s, PRICE_SCALE_DEFAULT)) for s in missing],
+            )
+            cur.execute("SELECT symbol, scale FROM symbol_scales WHERE symbol = ANY(%s)", (missing,))
+            _symbol_scales.update(cur.fetchall())
+        conn.close()
+    return _symbol_scales
+
+
+def _trade_price_fx(row, scale: int) -> int:
+    """A trade's price as an int at `scale`, rescaling a producer-encoded price_fx if its scale differs."""
+    if row["price_fx"] is None:
+        return round(row["price"] * 10 ** scale)
+    shift = scale - row["scale"]
+    return row["price_fx"] * 10 ** shift if shift >= 0 else round(row["price_fx"] / 10 ** -shift)
+
+
+@profiling.timed("sink.metrics.prev_closes")
+def _prev_closes(day):
+    """Latest ohlcv_daily close before `day` per symbol; cached until the UTC day changes."""
+    if _prev_close_cache["day"] == day:
+        return _prev_close_cache["closes"]
     import psycopg2
-    from psycopg2.extras import execute_batch
-    conn = psycopg2.connect(
-        host=PG_HOST,
-        port=PG_PORT,
-        dbname=PG_DB,
-        user=PG_USER,
-        password=PG_PASSWORD,
-    )
-    cur = conn.cursor()
-    rows = batch_df.collect()
-    for r in rows:
+    closes = {}
+    try:
+        conn = psycopg2.connect(
+            host=PG_HOST,
+            port=PG_PORT,
+            dbname=PG_DB,
+            user=PG_USER,
+            password=PG_PASSWORD,
+        )
+        cur = conn.cursor()
         cur.execute(
-            "INSERT INTO raw_trades (symbol, price, volume, trade_ts) VALUES (%s, %s, %s, %s)",
-            (r["symbol"], float(r["price"]), int(r["volume"]), int(r["timestamp"])),
+            """
+            SELECT DISTINCT ON (o.symbol) o.symbol, COALESCE(o.close, o.close_fx / 10::numeric ^ s.scale)::float8
+            FROM ohlcv_daily o
+            LEFT JOIN symbol_scales s ON s.symbol = o.symbol
+            WHERE o.date < %s
+            ORDER BY o.symbol, o.date DESC
+            """,
+            (day,),
         )
-    conn.commit()
-    cur.close()
-    conn.close()
+        closes = dict(cur.fetchall())
+        cur.close()
+        conn.close()
+    except Exception as e:
+        # Retry on the next batch; meanwhile % change falls back to the day's open
+        logger.warning("Previous close lookup failed: %s", e)
+        return closes
+    _prev_close_cache.update(day=day, closes=closes)
+    return closes
 
 
+@profiling.timed("sink.metrics")
 def _write_metrics_batch(batch_df, batch_id):
     import redis
+    with profiling.timer("sink.metrics.collect"):
+        rows = batch_df.collect()
     r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-    for row in batch_df.collect():
+    pipe = r.pipeline(transaction=False)
+    boards = {}
+    scales = _scales_for(row["symbol"] for row in rows) if PRICE_ENCODING == "fixed" else None
+    for row in rows:
         symbol = row["symbol"]
         key = f"trades:metrics:{symbol}"
         mapping = {
@@ -319,15 +551,84 @@ def _write_metrics_batch(batch_df, batch_id):
             "vwap_1m": str(row["vwap_1m"]),
             "vwap_5m": str(row["vwap_5m"]),
             "vwap_15m": str(row["vwap_15m"]),
-            "ema9": str(row["ema9"]),
-            "ema21": str(row["ema21"]),
             "vol": str(row["vol"]),
         }
-        r.hset(key, mapping=mapping)
-        r.expire(key, REDIS_TTL)
-        r.publish(f"live:{symbol}", json.dumps(mapping))
+        for field in _indicators.outputs:
+            if row[field] is not None and not math.isnan(row[field]):
+                mapping[field] = str(row[field])
+        if scales is not None:
+            scale = scales[symbol]
+            for field in PRICE_FIELDS:
+                if field in mapping:
+                    mapping[field] = str(round(row[field] * 10 ** scale))
+            mapping["scale"] = str(scale)
+            # Lets the API decode indicator prices without knowing the enabled set
+            mapping["price_fields"] = ",".join(f for f in PRICE_FIELDS if f in mapping)
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, REDIS_TTL)
+        stream = f"trades:stream:{symbol}"
+        pipe.xadd(stream, mapping, maxlen=METRICS_STREAM_MAXLEN, approximate=True)
+        pipe.expire(stream, METRICS_STREAM_TTL)
+
+        day = datetime.fromtimestamp(row["day_idx"] * DAY_MS / 1000, tz=timezone.utc).date()
+        board = boards.setdefault(day, {"pct_change": {}, "range_pct": {}, "volume": {}})
+        ref = _prev_closes(day).get(symbol) or row["day_open"]
+        if ref:
+            board["pct_change"][symbol] = (row["price"] / ref - 1) * 100
+            board["range_pct"][symbol] = (row["day_high"] - row["day_low"]) / ref * 100
+        board["volume"][symbol] = row["day_volume"]
+
+    for day, board in boards.items():
+        for metric, scores in board.items():
+            if scores:
+                key = f"{LEADERBOARD_KEY_PREFIX}:{day.isoformat()}:{metric}"
+                pipe.zadd(key, scores)
+                pipe.expire(key, LEADERBOARD_TTL)
+        updated_key = f"{LEADERBOARD_KEY_PREFIX}:{day.isoformat()}:updated_at"
+        pipe.set(updated_key, datetime.now(timezone.utc).isoformat(), ex=LEADERBOARD_TTL)
+    with profiling.timer("sink.metrics.redis"):
+        pipe.execute()
+    r.close()
+    logger.info("Wrote metrics batch %s to Redis (%d symbols)", batch_id, len(rows))
+
+
+@profiling.timed("sink.correlation")
+def _update_correlation_batch(batch_df, batch_id):
+    """Fold the batch's per-interval closes into the rolling correlation and publish closed intervals."""
+    import base64
+    import numpy as np
+    import redis
+
+    # Only the last trade per (symbol, interval) matters, so reduce in Spark before collecting
+    with profiling.timer("sink.correlation.collect"):
+        closes = (
+            batch_df.withColumn("iv", (col("timestamp") / CORRELATION_INTERVAL_MS).cast("long"))
+            .groupBy("symbol", "iv")
+            .agg(max_by("price", "timestamp").alias("price"), spark_max("timestamp").alias("ts"))
+            .collect()
+        )
+    ticks = sorted(((r["symbol"], r["price"], r["ts"]) for r in closes), key=lambda t: t[2])
+    intervals = _correlation_sampler.feed(ticks)
+    if not intervals:
+        return
+    for returns in intervals:
+        _correlation_engine.push_dict(returns)
+
+    engine = _correlation_engine
+    corr = engine.correlation(np.float32)
+    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    with profiling.timer("sink.correlation.redis"):
+        r.hset(CORRELATION_KEY, mapping={
+            "symbols": json.dumps(engine.symbols),
+            "matrix": base64.b64encode(corr.tobytes()).decode(),
+            "samples": str(engine.n),
+            "window": str(engine.window),
+            "interval_ms": str(CORRELATION_INTERVAL_MS),
+            "as_of": str((_correlation_sampler.current or 0) * CORRELATION_INTERVAL_MS),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
     r.close()
-    logger.info("Wrote metrics batch %s to Redis", batch_id)
+    logger.info("Correlation batch %s: %d interval(s), %d symbols, %d samples", batch_id, len(intervals), len(engine.symbols), engine.n)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,275 @@
+"""AlertSink outbox publishing and crash recovery against stub Kafka and PostgreSQL."""
+import json
+import sys
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+import alert_sink
+from alert_sink import AlertSink, published_id
+
+TS = datetime(2024, 1, 2, 14, 30, tzinfo=timezone.utc)
+
+
+class KafkaError:
+    _PARTITION_EOF = -191
+
+    def __init__(self, code, fatal=False):
+        self._code, self._fatal = code, fatal
+
+    def code(self):
+        return self._code
+
+    def fatal(self):
+        return self._fatal
+
+
+class KafkaException(Exception):
+    pass
+
+
+class TopicPartition:
+    def __init__(self, topic, partition, offset=-1):
+        self.topic, self.partition, self.offset = topic, partition, offset
+
+
+class Message:
+    def __init__(self, partition, value=None, error=None):
+        self._partition, self._value, self._error = partition, value, error
+
+    def partition(self):
+        return self._partition
+
+    def value(self):
+        return self._value
+
+    def error(self):
+        return self._error
+
+
+class Broker:
+    """One topic: committed messages per partition, and what producers did."""
+
+    def __init__(self, partitions=1):
+        self.log = {p: [] for p in range(partitions)}
+        self.calls = []
+        self.fail_commits = 0
+
+    def committed_ids(self):
+        return [published_id(v) for p in self.log.values() for v in p]
+
+
+def kafka_module(broker):
+    class Producer:
+        def __init__(self, config):
+            assert config["transactional.id"]
+            self.pending = []
+
+        def init_transactions(self, timeout):
+            broker.calls.append("init")
+
+        def begin_transaction(self):
+            self.pending = []
+
+        def produce(self, topic, key, value):
+            self.pending.append(value)
+
+        def commit_transaction(self, timeout):
+            if broker.fail_commits:
+                broker.fail_commits -= 1
+                raise KafkaException(KafkaError(1))
+            broker.log[0].extend(self.pending)
+            broker.calls.append("commit")
+
+        def abort_transaction(self, timeout):
+            self.pending = []
+            broker.calls.append("abort")
+
+    class Consumer:
+        def __init__(self, config):
+            assert config["isolation.level"] == "read_committed"
+            self.queue = []
+
+        def list_topics(self, topic, timeout):
+            meta = types.SimpleNamespace(error=None, partitions=dict.fromkeys(broker.log))
+            return types.SimpleNamespace(topics={topic: meta})
+
+        def get_watermark_offsets(self, tp, timeout):
+            return 0, len(broker.log[tp.partition])
+
+        def assign(self, tps):
+            for tp in tps:
+                self.queue += [Message(tp.partition, v) for v in broker.log[tp.partition][tp.offset:]]
+                self.queue.append(Message(tp.partition, error=KafkaError(KafkaError._PARTITION_EOF)))
+
+        def poll(self, timeout):
+            return self.queue.pop(0) if self.queue else None
+
+        def close(self):
+            pass
+
+    return types.SimpleNamespace(
+        Producer=Producer,
+        Consumer=Consumer,
+        KafkaError=KafkaError,
+        KafkaException=KafkaException,
+        TopicPartition=TopicPartition,
+    )
+
+
+class Cursor:
+    """Answers the stream_batches and outbox statements AlertSink issues."""
+
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self.rows = []
+
+    def execute(self, sql, args):
+        before = len(self.db.outbox)
+        if "FROM stream_batches" in sql:
+            self.rows = [self.db.batches[args[0]]] if args[0] in self.db.batches else []
+        elif "INSERT INTO stream_batches" in sql:
+            self.db.batches[args[0]] = (args[1], args[2])
+        elif "FROM alerts_outbox o" in sql:
+            self.rows = [self.db.alerts[i] for i in sorted(self.db.outbox)][:args[0]]
+        elif "alert_id = ANY" in sql:
+            self.db.outbox -= set(args[0])
+        elif "alert_id <=" in sql:
+            self.db.outbox = {i for i in self.db.outbox if i > args[0]}
+        else:
+            raise AssertionError(sql)
+        self.rowcount = before - len(self.db.outbox)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Connection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return Cursor(self.db)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Pool:
+    def __init__(self, db):
+        self.db = db
+
+    def getconn(self):
+        return Connection(self.db)
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = Broker()
+    monkeypatch.setitem(sys.modules, "confluent_kafka", kafka_module(broker))
+    return broker
+
+
+def insert_alerts(cur, sql, rows, page_size, fetch):
+    """Stands in for execute_values on INSERT_SQL: inserts and queues every row."""
+    inserted = []
+    for row in rows:
+        alert_id = max(cur.db.alerts, default=0) + 1
+        cur.db.alerts[alert_id] = (alert_id, *row)
+        cur.db.outbox.add(alert_id)
+        inserted.append(cur.db.alerts[alert_id])
+    return inserted
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    db = types.SimpleNamespace(
+        alerts={i: (i, "AAPL", "volume_spike", "high", 3.5, TS) for i in range(1, 6)},
+        outbox=set(range(1, 6)),
+        batches={},
+    )
+    monkeypatch.setattr(alert_sink, "execute_values", insert_alerts)
+    sink = AlertSink({}, "kafka:9092", "trades-alerts", "alerts-test", "", 0, "alerts:live", run_id="run-a")
+    sink._pool = Pool(db)
+    sink.db = db
+    return sink
+
+
+def test_retry_of_a_committed_batch_is_skipped(sink):
+    alert = ("MSFT", "volume_spike", "high", 4.0, TS)
+    assert len(sink.insert(7, [alert])) == 1
+    assert sink.insert(7, [alert]) == []
+    assert sink.db.batches["alerts"] == (7, "run-a")
+
+
+def test_same_batch_id_from_a_new_checkpoint_is_not_a_retry(sink):
+    alert = ("MSFT", "volume_spike", "high", 4.0, TS)
+    sink.insert(0, [alert])
+    # A reset checkpoint starts a new query id with batch ids from 0 again
+    sink.run_id = "run-b"
+    assert len(sink.insert(0, [alert])) == 1
+    assert sink.db.batches["alerts"] == (0, "run-b")
+
+
+def test_published_id_ignores_messages_without_an_integer_id():
+    assert published_id(json.dumps({"id": 7, "ticker": "AAPL"}).encode()) == 7
+    assert published_id(json.dumps({"ticker": "AAPL", "type": "volume_spike", "ts": "x"}).encode()) is None
+    assert published_id(json.dumps({"id": "7"}).encode()) is None
+    assert published_id(json.dumps({"id": True}).encode()) is None
+    assert published_id(b"[1, 2]") is None
+    assert published_id(b"not json") is None
+    assert published_id(None) is None
+
+
+def test_outbox_is_published_in_order_and_drained(broker, sink):
+    assert sink.publish_outbox() == 5
+    assert broker.committed_ids() == [1, 2, 3, 4, 5]
+    assert sink.db.outbox == set()
+    assert sink._outbox_pending is False
+
+
+def test_recovery_skips_alerts_already_committed_and_pre_outbox_messages(broker, sink):
+    # A crash after the Kafka commit of 1-3 but before their outbox delete, behind legacy id-less alerts
+    legacy = {"ticker": "AAPL", "type": "volume_spike", "severity": "high", "value": 3.5, "ts": TS.isoformat()}
+    broker.log[0] += [json.dumps(legacy).encode(), None]
+    broker.log[0] += [json.dumps(alert_sink.alert_payload(sink.db.alerts[i])).encode() for i in (1, 2, 3)]
+    broker.log[0].append(json.dumps(legacy).encode())
+
+    assert sink.publish_outbox() == 2
+    assert [i for i in broker.committed_ids() if i is not None] == [1, 2, 3, 4, 5]
+
+
+def test_recovery_with_only_legacy_messages_publishes_everything(broker, sink):
+    broker.log[0] += [json.dumps({"ticker": "AAPL", "type": "volume_spike"}).encode()] * 3
+    assert sink.publish_outbox() == 5
+    assert sink.db.outbox == set()
+
+
+def test_failed_commit_aborts_and_keeps_the_outbox(broker, sink):
+    broker.fail_commits = 1
+    with pytest.raises(KafkaException):
+        sink.publish_outbox()
+    assert broker.calls == ["init", "abort"]
+    assert sink.db.outbox == set(range(1, 6))
+
+    # The same producer retries on the next batch
+    assert sink.publish_outbox() == 5
+    assert broker.calls == ["init", "abort", "commit"]
+    assert broker.committed_ids() == [1, 2, 3, 4, 5]
@@ -0,0 +1,39 @@
+"""Incremental indicators: batch-wise updates match a trade-by-trade fold."""
+import numpy as np
+import pytest
+
+from indicators import IndicatorSet, ema_series, parse
+
+
+def _ema_loop(x, alpha, y):
+    out = []
+    for v in x:
+        y = alpha * v + (1 - alpha) * y
+        out.append(y)
+    return np.array(out)
+
+
+@pytest.mark.parametrize("alpha", [2 / 3, 2 / 22, 1.0])
+def test_ema_series_matches_recursion(alpha):
+    x = 100 + np.cumsum(np.random.default_rng(1).normal(0, 0.1, 300))
+    np.testing.assert_allclose(ema_series(x, alpha, 100.0), _ema_loop(x, alpha, 100.0), rtol=1e-12)
+
+
+@pytest.mark.parametrize("spec", ["ema:1", "rsi:0", "macd:1:26:9", "macd:12:26:1", "bollinger:1"])
+def test_parse_rejects_periods_below_two(spec):
+    with pytest.raises(ValueError, match="at least 2"):
+        parse(spec)
+
+
+def test_split_batches_match_one_batch():
+    ind = IndicatorSet(parse("ema:9,rsi:14,macd,bollinger:20:2,obv"))
+    rng = np.random.default_rng(7)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, 400)))
+    volumes = rng.integers(1, 1000, 400).astype(np.float64)
+
+    state = ind.initial_state(prices[0])
+    for lo in range(0, 400, 37):
+        state, split = ind.update(state, prices[lo:lo + 37], volumes[lo:lo + 37])
+    _, whole = ind.update(ind.initial_state(prices[0]), prices, volumes)
+    np.testing.assert_allclose(split, whole, rtol=1e-9)
+    assert not np.isnan(split).any()
@@ -0,0 +1,24 @@
+"""Sampled stage timers in the shared profiling module."""
+import profiling
+
+
+def test_timers_sample_first_and_every_nth_call(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_EVERY", 10)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_stats", {})
+
+    for _ in range(25):
+        with profiling.timer("stage"):
+            pass
+
+    snap = profiling.snapshot()["stage"]
+    assert (snap["calls"], snap["sampled"]) == (25, 3)  # calls 1, 11 and 21
+    assert snap["mean_ms"] is not None
+
+
+def test_disabled_timer_is_shared_noop(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", False)
+    assert profiling.timer("a") is profiling.timer("b")
+    fn = lambda: None  # noqa: E731
+    assert profiling.timed("x")(fn) is fn